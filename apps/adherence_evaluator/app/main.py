@@ -18,15 +18,23 @@
 Guideline Recommendation Adherence Evaluator Module - FastAPI interface
 """
 
+import asyncio
+import json
 import os
-from typing import Dict, List, Set
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
 
-import requests
+import httpx
 from pathlib import Path
 import pandas as pd
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from cgr_adherence.quantity import Quantity
-from cgr_adherence.evaluator import AdherenceEvaluator
+from cgr_adherence.cache import Plan, PlanCache, recommendation_hash
+from cgr_adherence.pivot import first_values, pivot_first_values
+from transport import ACCEPT_HEADER, decode_response, iter_response_chunks
+from results import read_result, write_result
+from http_client import ServiceClients
 from pydantic import BaseSettings
 
 
@@ -38,10 +46,50 @@ class Settings(BaseSettings):
     guideline_server: str
     patientdata_server: str
     ceosys_data_path: str
+    plan_cache_size: int = 128
+    plan_cache_persist: bool = False
+    run_workers: int = 4
+    request_timeout: float = 300
+    request_retries: int = 3
+    patientdata_stream: bool = True
 
 
+RUN_STATE_FILE = "run_state.json"
+
 app = FastAPI()
 settings = Settings()
+executor = ThreadPoolExecutor(max_workers=settings.run_workers)
+clients = ServiceClients(
+    timeout=settings.request_timeout,
+    retries=settings.request_retries,
+    read_only_posts=[
+        "/recommendation/batch",
+        "/patients/",
+        "/patients/stream",
+        "/patients/changes",
+    ],
+)
+plan_cache = PlanCache(
+    maxsize=settings.plan_cache_size,
+    path=(
+        Path(settings.ceosys_data_path) / "plan_cache"
+        if settings.plan_cache_persist
+        else None
+    ),
+)
+# guideline recommendations retrieved from the guideline interface (ETag, recommendation) by identifier
+recommendations: Dict[str, Tuple[str, Dict]] = {}
+
+
+@app.on_event("shutdown")
+async def close_clients() -> None:
+    """
+    Close the connections of the HTTP clients.
+
+    Returns: None
+
+    """
+    await clients.aclose()
 
 
 @app.get("/")
@@ -55,18 +103,17 @@ async def root() -> Dict:
     return {"message": "Adherence evaluator"}
 
 
-def save_results(
-    res: pd.DataFrame, variable_names: Dict[str, Set[str]], recommendation_id: str
-) -> None:
+def result_frames(
+    res: pd.DataFrame, variable_names: Dict[str, Set[str]]
+) -> Dict[str, pd.DataFrame]:
     """
-    Save results of the guideline recommendations adherence check to a file (to be read by the ui backend).
+    Convert the results of the guideline recommendation adherence check to the frames that are saved.
 
     Args:
         res: Results of the guideline recommendation adherence check
         variable_names: Clinical variable names that were required to evaluate guideline recommendation adherence
-        recommendation_id: Guideline recommendation identifier
 
-    Returns: None
+    Returns: Summary and details of the results and the variable names (by result name)
 
     """
     summary = res[
@@ -84,18 +131,54 @@ def save_results(
         res[variable_names_set].stack("variable_name").reset_index("variable_name")
     )
 
-    summary.to_pickle(
-        Path(settings.ceosys_data_path)
-        / f"guideline_recommendation_{recommendation_id}_results_summary.pkl"
-    )
-    details.to_pickle(
-        Path(settings.ceosys_data_path)
-        / f"guideline_recommendation_{recommendation_id}_results_detail.pkl"
-    )
-    s_variable_names.to_pickle(
-        Path(settings.ceosys_data_path)
-        / f"guideline_recommendation_{recommendation_id}_variable_names.pkl"
-    )
+    return {
+        "results_summary": summary,
+        "results_detail": details,
+        "variable_names": s_variable_names,
+    }
+
+
+def save_results(
+    res: pd.DataFrame, variable_names: Dict[str, Set[str]], recommendation_id: str
+) -> None:
+    """
+    Save results of the guideline recommendations adherence check to the result datasets (to be read by the ui
+    backend).
+
+    Args:
+        res: Results of the guideline recommendation adherence check
+        variable_names: Clinical variable names that were required to evaluate guideline recommendation adherence
+        recommendation_id: Guideline recommendation identifier
+
+    Returns: None
+
+    """
+    for name, df in result_frames(res, variable_names).items():
+        write_result(settings.ceosys_data_path, name, recommendation_id, df)
+
+
+def patch_results(
+    res: pd.DataFrame, variable_names: Dict[str, Set[str]], recommendation_id: str
+) -> None:
+    """
+    Replace the saved results of the patients in the results of a guideline recommendations adherence check.
+
+    The saved results of all other patients are kept.
+
+    Args:
+        res: Results of the guideline recommendation adherence check (for some patients)
+        variable_names: Clinical variable names that were required to evaluate guideline recommendation adherence
+        recommendation_id: Guideline recommendation identifier
+
+    Returns: None
+
+    """
+    for name, df in result_frames(res, variable_names).items():
+        if name != "variable_names":
+            saved = read_result(settings.ceosys_data_path, name, recommendation_id)
+            saved = saved[~saved.index.isin(res.index)]
+            df = pd.concat([saved, df]).sort_index(kind="stable")
+        write_result(settings.ceosys_data_path, name, recommendation_id, df)
 
 
 def flatten(d: Dict[str, Set[str]]) -> List[str]:
@@ -111,8 +194,85 @@ def flatten(d: Dict[str, Set[str]]) -> List[str]:
     return list(set().union(*d.values()))  # type: ignore
 
 
+def flatten_plans(plans: Dict[str, Plan]) -> List[str]:
+    """
+    Get the union of the clinical variable names that are required by a set of guideline recommendations
+
+    Args:
+        plans: Processed guideline recommendations (by guideline recommendation identifier)
+
+    Returns: flattened list of clinical variable names
+
+    """
+    return list(set().union(*[flatten(plan[0]) for plan in plans.values()]))
+
+
+def select_variables(df: pd.DataFrame, variables: List[str]) -> pd.DataFrame:
+    """
+    Select the clinical data of some variables from the clinical data of a run.
+
+    The result equals the clinical data that is returned by request_data for these variables, i.e. only patients with
+    at least one value for any of the variables are included. Variables without any value in the clinical data get
+    columns of missing values, so that their rules evaluate to False (instead of being skipped). Otherwise, the result
+    for a patient would depend on the values of the other patients in the clinical data, e.g. an incremental run (with
+    the clinical data of the changed patients only) could differ from a full run.
+
+    Args:
+        df: Clinical data of all variables required in the run (as returned by request_data or request_changed_data)
+        variables: Clinical variables to select
+
+    Returns: DataFrame with clinical data of the selected variables (without rows if none of the variables has a value)
+
+    """
+    present = [v for v in df.columns.unique(level=0) if v in set(variables)]
+    missing = sorted(set(variables).difference(present))
+    columns = pd.MultiIndex.from_product(
+        [present + missing, df.columns.unique(level=1)], names=df.columns.names
+    )
+    df = df[present]
+    if not present:
+        # no patient has a value of any of the variables
+        return df.iloc[:0].reindex(columns=columns)
+    has_value = df.xs("value", axis=1, level=1).notna().any(axis=1)
+
+    return df.loc[has_value].reindex(columns=columns)
+
+
+class StepTimer:
+    """
+    Measures the time spent on consecutive steps (e.g. of a guideline recommendation evaluation).
+    """
+
+    def __init__(self) -> None:
+        self.timing: Dict[str, float] = {}
+        self._t_start = self._t_step = time.perf_counter()
+
+    def step(self, name: str) -> None:
+        """
+        Record the time spent on a step (since the previous step).
+
+        Args:
+            name: Name of the step
+
+        Returns: None
+
+        """
+        t_now = time.perf_counter()
+        self.timing[name] = t_now - self._t_step
+        self._t_step = t_now
+
+    def total(self) -> float:
+        """
+        Get the time spent on all steps.
+
+        Returns: Time in seconds since the timer was created
+
+        """
+        return time.perf_counter() - self._t_start
+
+
 @app.get("/run")
-async def run() -> str:
+def run() -> str:
     """
     Performs guideline recommendation adherence evaluation.
 
@@ -123,26 +283,420 @@ async def run() -> str:
       are determined
     - (2) create Quantity objects to check the rules defined by the guideline recommendation
 
-    Next, the required clinical variables are requested from the clinical data interface and the Quantity objects are
-    applied to these datasets to determine guideline recommendation adherence.
+    Next, the clinical variables required by any of the guideline recommendations are requested from the clinical data
+    interface (once per run) and the Quantity objects are applied to the clinical data of the variables of each
+    guideline recommendation to determine guideline recommendation adherence.
+
+    Steps (1) and (2) are skipped for guideline recommendations that have not changed since they were last processed
+    (see PlanCache).
+
+    The data version of the clinical data and the guideline recommendations are recorded for /run/incremental.
+
+    A guideline recommendation that cannot be processed or evaluated does not stop the run: all other guideline
+    recommendations are evaluated, the saved results of the failed one are kept and the run is not recorded (the next
+    /run/incremental is a full run). The response is an error (500) that lists the failed guideline recommendations.
 
     Returns: "Success"
 
     """
-    recommendation_ids = get_recommendation_ids()
-
-    for recommendation_id in recommendation_ids:
-        rec = get_recommendation(recommendation_id)
-        variable_names, q_population, q_exposure = AdherenceEvaluator(
-            rec
-        ).process_guideline_recommendation()
-        data = request_data(flatten(variable_names))
-        res = compare(data, q_population, q_exposure)
-        save_results(res, variable_names, recommendation_id)
+    run_full(get_recommendations())
 
     return "Success"
 
 
+def describe_failure(recommendation_id: str, e: Exception) -> str:
+    """
+    Log the failure of the processing or evaluation of a guideline recommendation.
+
+    Args:
+        recommendation_id: Guideline recommendation identifier
+        e: Exception raised by the processing or evaluation
+
+    Returns: Description of the failure
+
+    """
+    message = f"{type(e).__name__}: {str(e)}"
+    print(f"Guideline recommendation {recommendation_id} failed ({message})")
+    return message
+
+
+def check_failures(failed: Dict[str, str]) -> None:
+    """
+    Fail the run if any guideline recommendation could not be processed or evaluated.
+
+    Args:
+        failed: Description of the failure by guideline recommendation identifier
+
+    Returns: None
+
+    Raises:
+        HTTPException: If any guideline recommendation failed (500, with the failed guideline recommendations)
+
+    """
+    if failed:
+        raise HTTPException(status_code=500, detail={"failed": failed})
+
+
+def run_full(recommendations: Dict[str, Dict]) -> int:
+    """
+    Performs guideline recommendation adherence evaluation for all patients (see run) and records the data version
+    and the guideline recommendations.
+
+    Args:
+        recommendations: Guideline recommendations in FHIR format (by guideline recommendation identifier)
+
+    Returns: Data version of the evaluated clinical data
+
+    Raises:
+        HTTPException: If any guideline recommendation failed (see check_failures), the run is not recorded then
+
+    """
+    plans, failed = {}, {}
+    for recommendation_id, recommendation in recommendations.items():
+        try:
+            plans[recommendation_id] = plan_cache.process(recommendation)
+        except Exception as e:
+            failed[recommendation_id] = describe_failure(recommendation_id, e)
+
+    version = get_data_version()
+    data = request_data(flatten_plans(plans))
+
+    for recommendation_id, plan in plans.items():
+        try:
+            evaluate_recommendation(data, recommendation_id, plan)
+        except Exception as e:
+            failed[recommendation_id] = describe_failure(recommendation_id, e)
+
+    check_failures(failed)
+    save_run_state(version, recommendations)
+
+    return version
+
+
+@app.get("/run/incremental")
+def run_incremental() -> Dict:
+    """
+    Performs guideline recommendation adherence evaluation for the patients with new clinical data since the last run.
+
+    The clinical data interface is asked for the patients with values of the required clinical variables that were
+    ingested since the data version (watermark) of the last run (/run or /run/incremental). Only these patients are
+    evaluated and their results replace their saved results, the saved results of all other patients are kept.
+
+    A full run (/run) is performed instead if there is no previous run, if the guideline recommendations changed since
+    the previous run or if the clinical data interface does not know the data version of the previous run. Failed
+    guideline recommendations are handled as in /run.
+
+    Returns: Mode of the run ("incremental" or "full"), data version of the evaluated clinical data and (for
+        incremental runs) the number of evaluated patients per guideline recommendation
+
+    """
+    recommendations = get_recommendations()
+    state = load_run_state()
+
+    if state is None or state["recommendations"] != recommendation_hashes(
+        recommendations
+    ):
+        return {"mode": "full", "version": run_full(recommendations)}
+
+    plans = {
+        recommendation_id: plan_cache.process(recommendation)
+        for recommendation_id, recommendation in recommendations.items()
+    }
+
+    version = get_data_version()
+    data = request_changed_data(flatten_plans(plans), state["version"])
+    if data is None:
+        return {"mode": "full", "version": run_full(recommendations)}
+
+    patients, failed = {}, {}
+    for recommendation_id, plan in plans.items():
+        try:
+            patients[recommendation_id] = update_recommendation(
+                data, recommendation_id, plan
+            )
+        except Exception as e:
+            failed[recommendation_id] = describe_failure(recommendation_id, e)
+
+    check_failures(failed)
+    save_run_state(version, recommendations)
+
+    return {"mode": "incremental", "version": version, "patients": patients}
+
+
+def recommendation_hashes(recommendations: Dict[str, Dict]) -> Dict[str, str]:
+    """
+    Get the content hashes of guideline recommendations.
+
+    Args:
+        recommendations: Guideline recommendations in FHIR format (by guideline recommendation identifier)
+
+    Returns: Content hashes (by guideline recommendation identifier)
+
+    """
+    return {
+        recommendation_id: recommendation_hash(recommendation)
+        for recommendation_id, recommendation in recommendations.items()
+    }
+
+
+def save_run_state(version: int, recommendations: Dict[str, Dict]) -> None:
+    """
+    Record the data version of the clinical data and the guideline recommendations of a run.
+
+    Args:
+        version: Data version of the evaluated clinical data
+        recommendations: Evaluated guideline recommendations in FHIR format (by guideline recommendation identifier)
+
+    Returns: None
+
+    """
+    state = {
+        "version": version,
+        "recommendations": recommendation_hashes(recommendations),
+    }
+    (Path(settings.ceosys_data_path) / RUN_STATE_FILE).write_text(json.dumps(state))
+
+
+def load_run_state() -> Optional[Dict]:
+    """
+    Get the data version of the clinical data and the guideline recommendations of the last run.
+
+    Returns: Data version and content hashes of the guideline recommendations, None if there is no recorded run
+
+    """
+    try:
+        return json.loads(
+            (Path(settings.ceosys_data_path) / RUN_STATE_FILE).read_text()
+        )
+    except (OSError, ValueError):
+        return None
+
+
+def update_recommendation(
+    data: pd.DataFrame, recommendation_id: str, plan: Plan
+) -> int:
+    """
+    Performs guideline recommendation adherence evaluation for a single guideline recommendation for some patients
+    and replaces the saved results of these patients.
+
+    Args:
+        data: Clinical data of some patients (as returned by request_changed_data)
+        recommendation_id: Guideline recommendation identifier
+        plan: Processed guideline recommendation (variable names, population and exposure quantities)
+
+    Returns: Number of evaluated patients
+
+    """
+    if data.empty:
+        return 0
+
+    variable_names, q_population, q_exposure = plan
+
+    df = select_variables(data, flatten(variable_names))
+    if df.empty:
+        return 0
+
+    res = compare(df, q_population, q_exposure)
+    patch_results(res, variable_names, recommendation_id)
+
+    return len(res)
+
+
+def evaluate_recommendation(
+    data: pd.DataFrame, recommendation_id: str, plan: Plan
+) -> Dict[str, float]:
+    """
+    Performs guideline recommendation adherence evaluation for a single (processed) guideline recommendation and
+    saves the results.
+
+    Args:
+        data: Clinical data of all variables required in the run (as returned by request_data)
+        recommendation_id: Guideline recommendation identifier
+        plan: Processed guideline recommendation (variable names, population and exposure quantities)
+
+    Returns: Time in seconds spent on each step of the evaluation
+
+    """
+    timer = StepTimer()
+    variable_names, q_population, q_exposure = plan
+
+    df = select_variables(data, flatten(variable_names))
+    res = compare(df, q_population, q_exposure)
+    timer.step("compare")
+
+    save_results(res, variable_names, recommendation_id)
+    timer.step("save")
+
+    return timer.timing
+
+
+async def run_in_executor(func: Callable, *args: Any) -> Any:
+    """
+    Run a (CPU bound) function in the worker pool without blocking the event loop.
+
+    Args:
+        func: Function to call
+        *args: Arguments of the function
+
+    Returns: Return value of the function
+
+    """
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+
+async def prepare_recommendation(
+    client: httpx.AsyncClient, recommendation_id: str, semaphore: asyncio.Semaphore
+) -> Tuple[Dict, Plan, Dict[str, float]]:
+    """
+    Fetches and processes a single guideline recommendation.
+
+    The network request is performed asynchronously, the processing of the guideline recommendation is run in the
+    worker pool.
+
+    Args:
+        client: HTTP client for the requests to the guideline interface
+        recommendation_id: Guideline recommendation identifier
+        semaphore: Semaphore bounding the number of recommendations that are processed at the same time
+
+    Returns: Guideline recommendation, processed guideline recommendation and the time in seconds spent on each step
+
+    """
+    async with semaphore:
+        timer = StepTimer()
+
+        rec = await get_recommendation_async(client, recommendation_id)
+        timer.step("fetch")
+
+        plan = await run_in_executor(plan_cache.process, rec)
+        timer.step("parse")
+
+    return rec, plan, timer.timing
+
+
+async def run_recommendation_step(
+    recommendation_id: str, step: Awaitable, failed: Dict[str, str]
+) -> Any:
+    """
+    Run a step of the processing or evaluation of a guideline recommendation, recording its failure.
+
+    Args:
+        recommendation_id: Guideline recommendation identifier
+        step: Step (coroutine)
+        failed: Description of the failures by guideline recommendation identifier (updated)
+
+    Returns: Result of the step, None if it failed
+
+    """
+    try:
+        return await step
+    except Exception as e:
+        failed[recommendation_id] = describe_failure(recommendation_id, e)
+        return None
+
+
+async def evaluate_recommendation_async(
+    data: pd.DataFrame,
+    recommendation_id: str,
+    plan: Plan,
+    semaphore: asyncio.Semaphore,
+) -> Dict[str, float]:
+    """
+    Performs guideline recommendation adherence evaluation for a single guideline recommendation in the worker pool.
+
+    Args:
+        data: Clinical data of all variables required in the run (as returned by request_data)
+        recommendation_id: Guideline recommendation identifier
+        plan: Processed guideline recommendation (variable names, population and exposure quantities)
+        semaphore: Semaphore bounding the number of recommendations that are evaluated at the same time
+
+    Returns: Time in seconds spent on each step of the evaluation
+
+    """
+    async with semaphore:
+        return await run_in_executor(
+            evaluate_recommendation, data, recommendation_id, plan
+        )
+
+
+@app.get("/run/concurrent")
+async def run_concurrent() -> Dict:
+    """
+    Performs guideline recommendation adherence evaluation for all guideline recommendations concurrently.
+
+    Same as /run, but up to RUN_WORKERS guideline recommendations are fetched, processed and evaluated at the same
+    time. Requests to the guideline and clinical data interfaces are performed asynchronously and the processing of
+    the guideline recommendations and clinical data is run in a thread pool (so the event loop is not blocked).
+
+    The data version of the clinical data and the guideline recommendations are recorded for /run/incremental.
+    Failed guideline recommendations are handled as in /run.
+
+    Returns: Time in seconds spent on each step of the evaluation, per guideline recommendation, for requesting the
+        clinical data of the run and in total
+
+    """
+    timer = StepTimer()
+    semaphore = asyncio.Semaphore(settings.run_workers)
+    failed: Dict[str, str] = {}
+
+    client = clients.async_client
+    recommendation_ids = await get_recommendation_ids_async(client)
+    prepared = await asyncio.gather(
+        *[
+            run_recommendation_step(
+                recommendation_id,
+                prepare_recommendation(client, recommendation_id, semaphore),
+                failed,
+            )
+            for recommendation_id in recommendation_ids
+        ]
+    )
+    prepared_by_id = {
+        recommendation_id: result
+        for recommendation_id, result in zip(recommendation_ids, prepared)
+        if result is not None
+    }
+    recommendations = {
+        recommendation_id: rec
+        for recommendation_id, (rec, _, _) in prepared_by_id.items()
+    }
+    plans = {
+        recommendation_id: plan
+        for recommendation_id, (_, plan, _) in prepared_by_id.items()
+    }
+    timer.step("recommendations")
+
+    version = await get_data_version_async(client)
+    data = await request_data_async(client, flatten_plans(plans))
+    timer.step("data")
+
+    evaluated = await asyncio.gather(
+        *[
+            run_recommendation_step(
+                recommendation_id,
+                evaluate_recommendation_async(data, recommendation_id, plan, semaphore),
+                failed,
+            )
+            for recommendation_id, plan in plans.items()
+        ]
+    )
+    check_failures(failed)
+
+    timings = {
+        recommendation_id: {**timing_prepare, **timing_evaluate}
+        for (recommendation_id, (_, _, timing_prepare)), timing_evaluate in zip(
+            prepared_by_id.items(), evaluated
+        )
+    }
+
+    save_run_state(version, recommendations)
+
+    return {
+        "recommendations": timings,
+        "data": timer.timing["data"],
+        "total": timer.total(),
+    }
+
+
 def get_recommendation_ids() -> List[str]:
     """
     Get all available guideline recommendation identifier
@@ -150,26 +704,124 @@ def get_recommendation_ids() -> List[str]:
     Returns: List of available guideline recommendation identifier
 
     """
-    r = requests.get(settings.guideline_server + "/recommendation/list")
+    r = clients.client.get(settings.guideline_server + "/recommendation/list")
     return [rec["id"] for rec in r.json()]
 
 
+def get_recommendations() -> Dict[str, Dict]:
+    """
+    Retrieve all available guideline recommendations from the guideline interface.
+
+    The guideline recommendations are retrieved in a single request (instead of one request per guideline
+    recommendation).
+
+    Returns: Guideline recommendations in FHIR format (by guideline recommendation identifier)
+
+    """
+    r = clients.client.post(
+        settings.guideline_server + "/recommendation/batch",
+        json=get_recommendation_ids(),
+    )
+    r.raise_for_status()
+
+    return r.json()
+
+
+def revalidation_headers(recommendation_id: str) -> Dict[str, str]:
+    """
+    Get the headers for a conditional request of a guideline recommendation that was retrieved before.
+
+    Args:
+        recommendation_id: Guideline recommendation identifier
+
+    Returns: If-None-Match header with the ETag of the retrieved guideline recommendation (empty if it was not
+        retrieved before)
+
+    """
+    cached = recommendations.get(recommendation_id)
+    if cached is None:
+        return {}
+
+    return {"If-None-Match": cached[0]}
+
+
+def recommendation_from_response(recommendation_id: str, r: httpx.Response) -> Dict:
+    """
+    Get the guideline recommendation from a (conditional) response of the guideline interface.
+
+    Args:
+        recommendation_id: Guideline recommendation identifier
+        r: Response of the guideline interface
+
+    Returns: Guideline recommendation in FHIR format (JSON), the one retrieved before if it is unchanged (304)
+
+    """
+    if r.status_code == 304 and recommendation_id in recommendations:
+        return recommendations[recommendation_id][1]
+    r.raise_for_status()
+
+    recommendation = r.json()
+    etag = r.headers.get("etag")
+    if etag is not None:
+        recommendations[recommendation_id] = (etag, recommendation)
+
+    return recommendation
+
+
 def get_recommendation(recommendation_id: str) -> Dict:
     """
     Retrieve a specific guideline recommendation from the guideline interface.
 
+    Guideline recommendations that were retrieved before are revalidated (conditional request with their ETag), so
+    unchanged guideline recommendations are not transferred again.
+
     Args:
         recommendation_id: Guideline recommendation identifier
 
     Returns: Guideline recommendation in FHIR format (JSON)
 
     """
-    r_recommendation = requests.get(
-        settings.guideline_server + f"/recommendation/get/{recommendation_id}"
+    r_recommendation = clients.client.get(
+        settings.guideline_server + f"/recommendation/get/{recommendation_id}",
+        headers=revalidation_headers(recommendation_id),
     )
-    recommendation = r_recommendation.json()
 
-    return recommendation
+    return recommendation_from_response(recommendation_id, r_recommendation)
+
+
+async def get_recommendation_ids_async(client: httpx.AsyncClient) -> List[str]:
+    """
+    Get all available guideline recommendation identifier (asynchronous version of get_recommendation_ids)
+
+    Args:
+        client: HTTP client
+
+    Returns: List of available guideline recommendation identifier
+
+    """
+    r = await client.get(settings.guideline_server + "/recommendation/list")
+    return [rec["id"] for rec in r.json()]
+
+
+async def get_recommendation_async(
+    client: httpx.AsyncClient, recommendation_id: str
+) -> Dict:
+    """
+    Retrieve a specific guideline recommendation from the guideline interface (asynchronous version of
+    get_recommendation).
+
+    Args:
+        client: HTTP client
+        recommendation_id: Guideline recommendation identifier
+
+    Returns: Guideline recommendation in FHIR format (JSON)
+
+    """
+    r_recommendation = await client.get(
+        settings.guideline_server + f"/recommendation/get/{recommendation_id}",
+        headers=revalidation_headers(recommendation_id),
+    )
+    return recommendation_from_response(recommendation_id, r_recommendation)
 
 
 def request_data(variables: List[str]) -> pd.DataFrame:
@@ -182,16 +834,162 @@ def request_data(variables: List[str]) -> pd.DataFrame:
     Returns: DataFrame with clinical data
 
     """
-    r = requests.post(settings.patientdata_server + "/patients/", json=variables)
+    if settings.patientdata_stream:
+        return request_data_stream(variables)
 
-    df = pd.DataFrame(r.json())
-    df = (
-        df.sort_values(by="datetime").groupby(["pseudo_fallnr", "variable_name"]).nth(0)
+    r = clients.client.post(
+        settings.patientdata_server + "/patients/",
+        json=variables,
+        headers=ACCEPT_HEADER,
     )
-    df = df.unstack("variable_name")
-    df = df.swaplevel(axis=1).sort_index(axis=1)
 
-    return df
+    return pivot_data(decode_response(r))
+
+
+def request_data_stream(variables: List[str]) -> pd.DataFrame:
+    """
+    Retrieve clinical data from the clinical data interface as a stream of chunks.
+
+    The clinical data is pivoted chunk by chunk while it is received, i.e. only a single chunk of the raw clinical
+    data is held in memory at a time.
+
+    Args:
+        variables: List of clinical variables that are to be retrieved
+
+    Returns: DataFrame with clinical data
+
+    """
+    with clients.client.stream(
+        "POST",
+        settings.patientdata_server + "/patients/stream",
+        json=variables,
+        headers=ACCEPT_HEADER,
+    ) as r:
+        r.raise_for_status()
+        return pivot_data_stream(iter_response_chunks(r))
+
+
+def get_data_version() -> int:
+    """
+    Get the data version of the clinical data interface (increases whenever new clinical data is ingested).
+
+    Returns: Data version
+
+    """
+    r = clients.client.get(settings.patientdata_server + "/version")
+    r.raise_for_status()
+
+    return r.json()["version"]
+
+
+async def get_data_version_async(client: httpx.AsyncClient) -> int:
+    """
+    Get the data version of the clinical data interface (asynchronous version of get_data_version)
+
+    Args:
+        client: HTTP client
+
+    Returns: Data version
+
+    """
+    r = await client.get(settings.patientdata_server + "/version")
+    r.raise_for_status()
+
+    return r.json()["version"]
+
+
+def request_changed_data(variables: List[str], since: int) -> Optional[pd.DataFrame]:
+    """
+    Retrieve clinical data of the patients with new values since a data version from the clinical data interface.
+
+    Args:
+        variables: List of clinical variables that are to be retrieved
+        since: Data version of the last retrieval
+
+    Returns: DataFrame with clinical data (all values of the patients with new values, empty if there are none), None
+        if the clinical data interface does not know the data version
+
+    """
+    r = clients.client.post(
+        settings.patientdata_server + "/patients/changes",
+        params={"since": since},
+        json=variables,
+        headers=ACCEPT_HEADER,
+    )
+    if r.status_code == 409:
+        return None
+    r.raise_for_status()
+
+    df = decode_response(r)
+    if df.empty:
+        return pd.DataFrame()
+
+    return pivot_data(df)
+
+
+async def request_data_async(
+    client: httpx.AsyncClient, variables: List[str]
+) -> pd.DataFrame:
+    """
+    Retrieve clinical data from the clinical data interface (asynchronous version of request_data)
+
+    Args:
+        client: HTTP client
+        variables: List of clinical variables that are to be retrieved
+
+    Returns: DataFrame with clinical data
+
+    """
+    if settings.patientdata_stream:
+        return await run_in_executor(request_data_stream, variables)
+
+    r = await client.post(
+        settings.patientdata_server + "/patients/",
+        json=variables,
+        headers=ACCEPT_HEADER,
+    )
+
+    return await run_in_executor(lambda: pivot_data(decode_response(r)))
+
+
+def pivot_data(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert clinical data as returned by the clinical data interface to a DataFrame with the first value of each
+    variable per patient.
+
+    Args:
+        df: Clinical data (one row per value)
+
+    Returns: DataFrame with clinical data
+
+    """
+    return pivot_first_values(df)
+
+
+def pivot_data_stream(chunks: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Convert clinical data as returned by the clinical data interface in chunks to a DataFrame with the first value of
+    each variable per patient (see pivot_data).
+
+    Each chunk is reduced to the first values per patient and variable before it is merged with the first values of
+    the previous chunks, i.e. memory usage is bounded by the size of a chunk and the size of the result.
+
+    Args:
+        chunks: Clinical data (one row per value) in chunks of rows
+
+    Returns: DataFrame with clinical data
+
+    """
+    df: Optional[pd.DataFrame] = None
+    for chunk in chunks:
+        chunk = first_values(chunk)
+        df = chunk if df is None else first_values(pd.concat([df, chunk]))
+
+    if df is None:
+        columns = ["variable_name", "value", "datetime", "datetime_end"]
+        df = pd.DataFrame(columns=columns + ["pseudo_fallnr"])
+
+    return pivot_first_values(df)
 
 
 def validate(
@@ -221,7 +1019,7 @@ def validate(
                 continue
 
             col_name = (q.variable_name, f"valid_{type_name}")
-            df[col_name] = df[(q.variable_name, "value")].apply(q.valid)
+            df[col_name] = q.valid_array(df[(q.variable_name, "value")])
             col_names_variables.append(col_name)
 
         col_name = (f"valid_{type_name}", group_name)
@@ -0,0 +1,253 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Columnar (Apache Parquet) storage of the results of the guideline recommendation adherence evaluation.
+
+Each result ("results_summary", "results_detail", "variable_names") is a Parquet dataset partitioned by
+recommendation_id, i.e. the results of a guideline recommendation are stored in
+"<path>/results/<name>/recommendation_id=<id>/part-0.parquet". Partitions are replaced atomically, so that readers (the
+ui backend) never see partially written results.
+
+Rows are sorted by patient (pseudo_fallnr) and written in small row groups, so that reading the results of some patients
+only reads the row groups that contain them (predicate pushdown). The mixed "value" column is stored as one typed column
+per value type and a "value_type" column, as in the Arrow transport of the clinical data (see transport).
+"""
+
+import datetime
+import numbers
+import os
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from transport import VALUE_TYPES, decode_arrow_table
+
+RESULTS_DIR = "results"
+RESULTS_FILE = "part-0.parquet"
+RESULTS_ROW_GROUP_SIZE = 10000
+INDEX_COLUMN = "pseudo_fallnr"
+VALUE_ARROW_TYPES = {
+    "float": pa.float64(),
+    "int": pa.int64(),
+    "bool": pa.bool_(),
+    "str": pa.string(),
+}
+
+
+def partition_path(path: Path, name: str, recommendation_id: str) -> Path:
+    """
+    Get the path of the partition of a guideline recommendation in a result dataset.
+
+    Args:
+        path: Data path
+        name: Name of the result ("results_summary", "results_detail" or "variable_names")
+        recommendation_id: Guideline recommendation identifier
+
+    Returns: Partition directory
+
+    """
+    return Path(path) / RESULTS_DIR / name / f"recommendation_id={recommendation_id}"
+
+
+def value_type(value: object) -> Optional[str]:
+    """
+    Get the value type name of a value.
+
+    Args:
+        value: Value
+
+    Returns: Value type name (one of VALUE_TYPES), None for missing values
+
+    """
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return "bool"
+    if isinstance(value, numbers.Integral):
+        return "int"
+    if isinstance(value, numbers.Real):
+        return None if np.isnan(value) else "float"
+    if isinstance(value, (datetime.datetime, np.datetime64)):
+        return "datetime"
+    return "str"
+
+
+def encode_values(values: pd.Series) -> List[pa.Array]:
+    """
+    Split a mixed value column into the value type column and one typed column per value type.
+
+    Args:
+        values: Mixed values
+
+    Returns: Arrays "value_type", "value_float", "value_int", "value_bool", "value_str", "value_datetime"
+
+    """
+    values = values.to_numpy(dtype=object)
+    types = np.array([value_type(v) for v in values], dtype=object)
+    arrays = [pa.array(types, type=pa.string())]
+
+    for tag in VALUE_TYPES:
+        mask = types != tag
+        typed = np.where(mask, None, values)
+        if tag == "datetime":
+            # stored in the timezone of the first datetime value
+            tz = next((pd.Timestamp(v).tz for v in values[~mask]), None)
+            datetimes = pd.to_datetime(pd.Series(typed, dtype=object), utc=True)
+            datetimes = (
+                datetimes.dt.tz_convert(tz) if tz else datetimes.dt.tz_localize(None)
+            )
+            arrays.append(pa.Array.from_pandas(datetimes))
+        elif tag == "str":
+            arrays.append(pa.array([str(v) if v is not None else None for v in typed]))
+        else:
+            arrays.append(pa.array(typed, type=VALUE_ARROW_TYPES[tag]))
+
+    return arrays
+
+
+def encode_table(df: pd.DataFrame) -> pa.Table:
+    """
+    Convert a result frame to an Arrow table.
+
+    Args:
+        df: Result frame
+
+    Returns: Arrow table (with the index pseudo_fallnr as column)
+
+    """
+    if df.index.name == INDEX_COLUMN:
+        df = df.reset_index()
+
+    names = []
+    arrays = []
+    for name in df.columns:
+        if name == "value":
+            names += ["value_type"] + [f"value_{tag}" for tag in VALUE_TYPES]
+            arrays += encode_values(df[name])
+        else:
+            names.append(name)
+            arrays.append(pa.Array.from_pandas(df[name]))
+
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def decode_table(table: pa.Table) -> pd.DataFrame:
+    """
+    Convert an Arrow table of a result to a result frame.
+
+    Args:
+        table: Arrow table (see encode_table)
+
+    Returns: Result frame
+
+    """
+    if "value_type" in table.column_names:
+        df = decode_arrow_table(table)
+    else:
+        df = table.to_pandas()
+
+    if INDEX_COLUMN in df:
+        df = df.set_index(INDEX_COLUMN)
+
+    return df
+
+
+def write_result(
+    path: Path, name: str, recommendation_id: str, df: pd.DataFrame
+) -> None:
+    """
+    Replace the partition of a guideline recommendation in a result dataset atomically.
+
+    The rows are sorted by patient (pseudo_fallnr) before they are written (keeping the order of the rows of each
+    patient), so that reads of some patients can skip the row groups of the other patients.
+
+    Args:
+        path: Data path
+        name: Name of the result ("results_summary", "results_detail" or "variable_names")
+        recommendation_id: Guideline recommendation identifier
+        df: Result frame
+
+    Returns: None
+
+    """
+    if df.index.name == INDEX_COLUMN:
+        df = df.sort_index(kind="stable")
+    elif INDEX_COLUMN in df.columns:
+        df = df.sort_values(INDEX_COLUMN, kind="stable")
+
+    directory = partition_path(path, name, recommendation_id)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".", suffix=".parquet")
+    os.close(fd)
+    try:
+        pq.write_table(
+            encode_table(df),
+            tmp,
+            row_group_size=RESULTS_ROW_GROUP_SIZE,
+            compression="zstd",
+        )
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, directory / RESULTS_FILE)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def read_result(
+    path: Path,
+    name: str,
+    recommendation_id: str,
+    columns: Optional[List[str]] = None,
+    patients: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Read the partition of a guideline recommendation from a result dataset.
+
+    Args:
+        path: Data path
+        name: Name of the result ("results_summary", "results_detail" or "variable_names")
+        recommendation_id: Guideline recommendation identifier
+        columns: Columns to read (None: all columns), the index pseudo_fallnr is always read
+        patients: Patients (pseudo_fallnr) to read (None: all patients)
+
+    Returns: Result frame
+
+    Raises:
+        FileNotFoundError: If there is no result of the guideline recommendation
+
+    """
+    file = partition_path(path, name, recommendation_id) / RESULTS_FILE
+    schema = pq.read_schema(file)
+
+    if columns is not None:
+        columns = [c for c in columns if c != INDEX_COLUMN]
+        if INDEX_COLUMN in schema.names:
+            columns.insert(0, INDEX_COLUMN)
+        if "value" in columns:
+            columns.remove("value")
+            columns += ["value_type"] + [f"value_{tag}" for tag in VALUE_TYPES]
+
+    filters = None
+    if patients is not None:
+        filters = [(INDEX_COLUMN, "in", list(patients))]
+
+    return decode_table(pq.read_table(file, columns=columns, filters=filters))
@@ -0,0 +1,176 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Client for the columnar binary (Apache Arrow IPC) transport of clinical data from the clinical data interface.
+
+The clinical data interface sends clinical data as an Arrow IPC stream if requested by the Accept header. The mixed
+"value" column is transported as one typed column per value type ("value_float", "value_int", "value_bool",
+"value_str", "value_datetime") and a "value_type" column that specifies which of the typed columns holds the value of
+a row.
+"""
+
+import io
+import json
+from typing import Any, Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+ACCEPT_HEADER = {"Accept": f"{ARROW_MEDIA_TYPE}, application/json;q=0.9"}
+VALUE_TYPES = ["float", "int", "bool", "str", "datetime"]
+
+
+def decode_arrow_table(table: pa.Table) -> pd.DataFrame:
+    """
+    Convert clinical data from the Arrow transport format to a DataFrame.
+
+    Args:
+        table: Clinical data in Arrow transport format
+
+    Returns: DataFrame with clinical data (with a single mixed "value" column)
+
+    """
+    value_type = table.column("value_type").to_pandas().to_numpy(dtype=object)
+    value = np.full(table.num_rows, None, dtype=object)
+
+    for tag in VALUE_TYPES:
+        mask = value_type == tag
+        if not mask.any():
+            continue
+        column = table.column(f"value_{tag}").filter(pa.array(mask))
+        if tag == "datetime":
+            value[mask] = column.to_pandas().to_numpy(dtype=object)
+        else:
+            # object arrays hold Python scalars (e.g. bool instead of numpy.bool_), as when decoding JSON
+            value[mask] = column.to_numpy(zero_copy_only=False).astype(object)
+
+    df = pd.DataFrame(index=pd.RangeIndex(table.num_rows))
+    for name in table.column_names:
+        if name == "value_type":
+            df["value"] = value
+        elif not name.startswith("value_"):
+            column = table.column(name).to_pandas()
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                column = column.astype(object)
+            df[name] = column
+
+    return df
+
+
+def decode_arrow(content: bytes) -> pd.DataFrame:
+    """
+    Convert clinical data from an Arrow IPC stream to a DataFrame.
+
+    Args:
+        content: Arrow IPC stream
+
+    Returns: DataFrame with clinical data
+
+    """
+    return decode_arrow_table(pa.ipc.open_stream(content).read_all())
+
+
+def decode_response(r: Any) -> pd.DataFrame:
+    """
+    Convert a response of the clinical data interface to a DataFrame.
+
+    Args:
+        r: Response (requests or httpx) with clinical data as Arrow IPC stream or JSON (dict of lists)
+
+    Returns: DataFrame with clinical data
+
+    """
+    if r.headers.get("content-type", "").startswith(ARROW_MEDIA_TYPE):
+        return decode_arrow(r.content)
+
+    return pd.DataFrame(r.json())
+
+
+class ChunkReader(io.RawIOBase):
+    """
+    Read-only file object over an iterator of byte chunks (e.g. the body of a streamed response).
+
+    Args:
+        chunks: Byte chunks
+    """
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        """
+        Whether the file can be read (always True).
+
+        Returns: True
+
+        """
+        return True
+
+    def readinto(self, b: Any) -> int:
+        """
+        Read bytes into a buffer.
+
+        Args:
+            b: Buffer
+
+        Returns: Number of bytes read (0 at the end of the chunks)
+
+        """
+        while not self._buffer:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._buffer = chunk
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+
+def iter_response_chunks(r: Any, chunk_size: int = 100000) -> Iterator[pd.DataFrame]:
+    """
+    Convert a streamed response of the clinical data interface to DataFrames chunk by chunk.
+
+    Only one chunk of the response is held in memory at a time.
+
+    Args:
+        r: Streamed response (httpx, i.e. requested with Client.stream) with clinical data as Arrow IPC stream or
+            newline delimited JSON
+        chunk_size: Number of records per chunk (for newline delimited JSON, Arrow record batches are returned as sent)
+
+    Returns: Clinical data, one chunk at a time
+
+    """
+    if r.headers.get("content-type", "").startswith(ARROW_MEDIA_TYPE):
+        stream = io.BufferedReader(ChunkReader(r.iter_bytes()))
+        for batch in pa.ipc.open_stream(stream):
+            yield decode_arrow_table(pa.Table.from_batches([batch]))
+        return
+
+    records = []
+    for line in r.iter_lines():
+        if line:
+            records.append(json.loads(line))
+        if len(records) >= chunk_size:
+            yield pd.DataFrame.from_records(records)
+            records = []
+    if records:
+        yield pd.DataFrame.from_records(records)
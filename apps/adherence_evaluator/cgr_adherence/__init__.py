@@ -24,6 +24,8 @@ Quantity objects for each rule in the recommendation that can be applied to the
 """
 import os
 from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Tuple
 import pint
 import pandas as pd
 
@@ -82,5 +84,28 @@ def init_mapping_table() -> pd.DataFrame:
     return df_mapping
 
 
+def init_mapping_index(
+    df_mapping: pd.DataFrame,
+) -> Mapping[Tuple[str, str], Tuple[Mapping[str, Any], ...]]:
+    """
+    Build an immutable index of the mapping table for lookups by (system, code) once for the module.
+
+    Args:
+        df_mapping: Mapping table
+
+    Returns: Read-only mapping from (system, code) to the (read-only) mapping table records of that coding
+
+    """
+    index: Dict[Tuple[str, str], List[Mapping[str, Any]]] = {}
+    for record in df_mapping.to_dict(orient="records"):
+        key = (record["system"], record["code"])
+        index.setdefault(key, []).append(MappingProxyType(record))
+
+    return MappingProxyType({key: tuple(records) for key, records in index.items()})
+
+
 ureg = init_unit_registry()
+# allow pickling / unpickling of quantities with units from this registry (e.g. "percent")
+pint.set_application_registry(ureg)
 mapping_table = init_mapping_table()
+mapping_index = init_mapping_index(mapping_table)
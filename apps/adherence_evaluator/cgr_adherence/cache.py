@@ -0,0 +1,222 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Cache for processed guideline recommendations.
+
+Processing a guideline recommendation (AdherenceEvaluator.process_guideline_recommendation) only depends on the content
+of the FHIR bundle and the mapping table, so its result ("plan") can be reused as long as neither of them (nor the
+format of the plan, see PLAN_CACHE_VERSION) changes.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+import pandas as pd
+
+from . import mapping_table
+from .evaluator import AdherenceEvaluator
+from .quantity import Quantity
+
+Plan = Tuple[Dict[str, Set[str]], Dict[str, List[Quantity]], Dict[str, List[Quantity]]]
+
+# increment when the processing of guideline recommendations or the Plan / Quantity structure changes
+PLAN_CACHE_VERSION = 1
+
+
+def recommendation_hash(rec: Dict) -> str:
+    """
+    Content hash of a guideline recommendation.
+
+    The hash does not depend on the order of keys in the JSON structure.
+
+    Args:
+        rec: Clinical guideline recommendation (json)
+
+    Returns: SHA-256 hex digest of the recommendation
+
+    """
+    content = json.dumps(rec, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def mapping_hash(df_mapping: pd.DataFrame) -> str:
+    """
+    Content hash of the mapping table.
+
+    Args:
+        df_mapping: Mapping table
+
+    Returns: SHA-256 hex digest of the column names and values of the mapping table
+
+    """
+    h = hashlib.sha256(json.dumps(list(df_mapping.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df_mapping, index=True).values.tobytes())
+    return h.hexdigest()
+
+
+class PlanCache:
+    """
+    Cache of processed guideline recommendations, keyed by the content hash of the FHIR bundle, the content hash of the
+    mapping table and PLAN_CACHE_VERSION.
+
+    The plans (variable names, population quantities, exposure quantities) are kept in memory with least recently used
+    eviction and, if a path is given, additionally stored as pickle files so that they survive a restart of the service.
+
+    Args:
+        maxsize: Maximal number of plans kept in memory
+        path: Directory for the on-disk cache (None to only cache in memory)
+        df_mapping: Mapping table the plans are created with (None for the mapping table of the module)
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 128,
+        path: Optional[Union[str, Path]] = None,
+        df_mapping: Optional[pd.DataFrame] = None,
+    ):
+        self.maxsize = maxsize
+        self.path = Path(path) if path is not None else None
+        self.mapping_hash = mapping_hash(
+            mapping_table if df_mapping is None else df_mapping
+        )
+        self._plans: "OrderedDict[str, Plan]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        if self.path is not None:
+            self.path.mkdir(parents=True, exist_ok=True)
+
+    def key(self, rec: Dict) -> str:
+        """
+        Get the cache key of a guideline recommendation.
+
+        Args:
+            rec: Clinical guideline recommendation (json)
+
+        Returns: SHA-256 hex digest of PLAN_CACHE_VERSION, the mapping table hash and the recommendation hash
+
+        """
+        content = f"{PLAN_CACHE_VERSION}:{self.mapping_hash}:{recommendation_hash(rec)}"
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def _fname(self, key: str) -> Path:
+        return self.path / f"plan_{key}.pkl"  # type: ignore
+
+    def _load(self, key: str) -> Optional[Plan]:
+        if self.path is None or not self._fname(key).exists():
+            return None
+        try:
+            with open(self._fname(key), "rb") as f:
+                return pickle.load(f)  # nosec - only reads files written by this cache
+        except Exception:
+            # outdated or corrupted cache file, will be overwritten
+            return None
+
+    def _store(self, key: str, plan: Plan) -> None:
+        if self.path is None:
+            return
+        fname = self._fname(key)
+        fname_tmp = fname.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(fname_tmp, "wb") as f:
+            pickle.dump(plan, f)
+        os.replace(fname_tmp, fname)
+
+    def get(self, key: str) -> Optional[Plan]:
+        """
+        Get a plan from the cache.
+
+        Args:
+            key: Cache key of the guideline recommendation (see key)
+
+        Returns: Cached plan or None if not cached
+
+        """
+        with self._lock:
+            if key in self._plans:
+                self._plans.move_to_end(key)
+                return self._plans[key]
+
+        plan = self._load(key)
+        if plan is not None:
+            self._put_memory(key, plan)
+
+        return plan
+
+    def _put_memory(self, key: str, plan: Plan) -> None:
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.maxsize:
+                self._plans.popitem(last=False)
+
+    def put(self, key: str, plan: Plan) -> None:
+        """
+        Add a plan to the cache.
+
+        Args:
+            key: Cache key of the guideline recommendation (see key)
+            plan: Processed guideline recommendation
+
+        Returns: None
+
+        """
+        self._put_memory(key, plan)
+        self._store(key, plan)
+
+    def process(self, rec: Dict) -> Plan:
+        """
+        Convert guideline recommendation to Quantity objects for population and exposure, using the cached result
+        if the recommendation was already processed.
+
+        Args:
+            rec: Clinical guideline recommendation (json)
+
+        Returns: variable names and quantities for population and exposure
+
+        """
+        key = self.key(rec)
+        plan = self.get(key)
+
+        if plan is None:
+            plan = AdherenceEvaluator(rec).process_guideline_recommendation()
+            self.put(key, plan)
+
+        return plan
+
+    def clear(self) -> None:
+        """
+        Remove all plans from the in-memory cache (on-disk files are kept).
+
+        Returns: None
+
+        """
+        with self._lock:
+            self._plans.clear()
+
+    def __len__(self) -> int:
+        """
+        Get number of plans in the in-memory cache.
+
+        Returns: number of plans in memory
+
+        """
+        return len(self._plans)
@@ -16,8 +16,7 @@
 #  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
 
 from typing import Dict, List, Set, Tuple
-from jsonpath_ng.ext import parse
-from .fhir import find_resource
+from .fhir import BundleIndex, compile_jsonpath
 from .parser import parse_characteristics
 from .quantity import Quantity
 
@@ -32,6 +31,7 @@ class AdherenceEvaluator:
 
     def __init__(self, rec: Dict):
         self.content = rec
+        self.index = BundleIndex(rec)
 
     def _get_group_names(
         self, evidence_identifier: str, evidence_type: str
@@ -57,13 +57,11 @@ class AdherenceEvaluator:
                 f'Invalid key {evidence_type}. Expected "population" or "exposure"'
             )
 
-        entity = find_resource(
-            self.content, resource_name, identifier=evidence_identifier
-        )
+        entity = self.index.find(resource_name, identifier=evidence_identifier)
 
         group_names = [
             m.value
-            for m in parse(
+            for m in compile_jsonpath(
                 f'$.characteristic[?@.{attribute}.type=="Group"].{attribute}.identifier.value'
             ).find(entity)
         ]
@@ -88,7 +86,7 @@ class AdherenceEvaluator:
         quantities = []
 
         for group_name in group_names:
-            resource = find_resource(self.content, "Group", group_name)
+            resource = self.index.find("Group", group_name)
             quantities += parse_characteristics(resource)
 
         return quantities
@@ -118,7 +116,7 @@ class AdherenceEvaluator:
         Returns: name of population and exposure groups
 
         """
-        evidence = find_resource(self.content, "Evidence")
+        evidence = self.index.find("Evidence")
         res = []
         for var in evidence["variableDefinition"]:
             res.append(
@@ -14,12 +14,31 @@
 #
 #  You should have received a copy of the GNU General Public License
 #  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
-from typing import Dict, Optional, Iterator
+from functools import lru_cache
+from typing import Dict, Optional, Iterator, List, Tuple
 
 from jsonpath_ng import jsonpath
 from jsonpath_ng.ext import parse
 
 
+@lru_cache(maxsize=1024)
+def compile_jsonpath(expression: str) -> jsonpath.JSONPath:
+    """
+    Compiles a JSONPath expression once and caches the result for the module.
+
+    Parsing an expression is expensive (jsonpath_ng builds the PLY parser tables on every call to parse), while the
+    compiled expression can be reused for any number of lookups. The cache is keyed by the full expression, i.e. by
+    the expression template together with its parameters.
+
+    Args:
+        expression: JSONPath expression
+
+    Returns: Compiled JSONPath expression
+
+    """
+    return parse(expression)
+
+
 def findall_resources(
     bundle: Dict, resource_type: str, identifier: str = None
 ) -> Iterator[Dict]:
@@ -58,14 +77,85 @@ def find_resource(bundle: Dict, resource_type: str, identifier: str = None) -> D
     try:
         res = next(findall_resources(bundle, resource_type, identifier))
     except StopIteration:
-        if identifier is not None:
-            msg = f'No resource "{resource_type}" with identifier "{identifier}" found'
-        else:
-            msg = f'No resource "{resource_type}" found'
-        raise KeyError(msg) from None
+        raise KeyError(_resource_not_found_msg(resource_type, identifier)) from None
     return res
 
 
+def _resource_not_found_msg(resource_type: str, identifier: Optional[str]) -> str:
+    """
+    Error message for resources that are not found in a bundle.
+
+    Args:
+        resource_type: resource type that was searched for
+        identifier: value of the identifier of the resource that was searched for
+
+    Returns: Error message
+
+    """
+    if identifier is not None:
+        return f'No resource "{resource_type}" with identifier "{identifier}" found'
+    return f'No resource "{resource_type}" found'
+
+
+class BundleIndex:
+    """
+    Index of the resources in a FHIR bundle by resource type and identifier.
+
+    The index is built in a single pass over the bundle entries and allows to find resources in constant time,
+    instead of scanning all entries of the bundle for each lookup (as findall_resources / find_resource do). The
+    order of the resources in the bundle is preserved, i.e. find returns the same resource as find_resource.
+
+    Args:
+        bundle: JSON structure (dict) of the bundle
+    """
+
+    def __init__(self, bundle: Dict):
+        self._by_type: Dict[str, List[Dict]] = {}
+        self._by_identifier: Dict[Tuple[str, str], List[Dict]] = {}
+
+        for entry in bundle["entry"]:
+            resource = entry["resource"]
+            resource_type = resource["resourceType"]
+            self._by_type.setdefault(resource_type, []).append(resource)
+
+            if resource.get("identifier"):
+                key = (resource_type, resource["identifier"][0]["value"])
+                self._by_identifier.setdefault(key, []).append(resource)
+
+    def findall(self, resource_type: str, identifier: str = None) -> Iterator[Dict]:
+        """
+        Find all resources of a given type in the bundle
+
+        Args:
+            resource_type: resource type to search for
+            identifier: value of the identifier of the resource (to locate specific resources)
+
+        Returns: One resource of given type at a time
+
+        """
+        if identifier is None:
+            yield from self._by_type.get(resource_type, [])
+        else:
+            yield from self._by_identifier.get((resource_type, identifier), [])
+
+    def find(self, resource_type: str, identifier: str = None) -> Dict:
+        """
+        Finds first resource of a given type in the bundle.
+
+        Args:
+            resource_type: resource type to search for
+            identifier: value of the identifier of the resource (to locate specific resources)
+
+        Returns: First resource of given type
+
+        """
+        try:
+            res = next(self.findall(resource_type, identifier))
+        except StopIteration:
+            raise KeyError(_resource_not_found_msg(resource_type, identifier)) from None
+        return res
+
+
 def find_characteristic(
     resource: Dict, system: str, code: str
 ) -> Optional[jsonpath.DatumInContext]:
@@ -82,7 +172,7 @@ def find_characteristic(
     Returns: A single characteristic if found as specified, or None
 
     """
-    res = parse(
+    res = compile_jsonpath(
         f'$.characteristic[*].code.coding[?(system=="{system}") & (code=="{code}")]'
     ).find(resource)
     if len(res) > 1:
@@ -19,7 +19,7 @@ from typing import Dict, List
 
 import pandas as pd
 
-from . import mapping_table
+from . import mapping_index
 
 
 def codeable_concepts_to_clinical_variable(codeable_concept: Dict) -> List[Dict]:
@@ -43,12 +43,13 @@ def codeable_concepts_to_clinical_variable(codeable_concept: Dict) -> List[Dict]
         Returns: Mapping information from mapping table
 
         """
-        system = coding["system"].rstrip("/").strip()  # noqa
-        code = coding["code"].strip()  # noqa
-        res = mapping_table.query("(code==@code) & (system==@system)")
-        if len(res) == 0:
+        system = coding["system"].rstrip("/").strip()
+        code = coding["code"].strip()
+        res = mapping_index.get((system, code))
+        if not res:
             raise ValueError(f"Could not find mapping for code {coding}")
-        return res.to_dict(orient="records")
+        # return copies, the indexed records are shared and read-only
+        return [dict(record) for record in res]
 
     mappings: List[Dict] = []
 
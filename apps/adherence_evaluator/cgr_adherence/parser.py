@@ -18,10 +18,9 @@
 from typing import Dict, List, Any, Optional
 
 import pint
-from jsonpath_ng.ext import parse
 
 from . import ureg
-from .fhir import find_characteristic
+from .fhir import compile_jsonpath, find_characteristic
 from .mapping import (
     unique_codeable_concept_mapping,
     codeable_concepts_to_clinical_variable,
@@ -61,7 +60,7 @@ def parse_characteristics(resource: Dict) -> List[Quantity]:
     Returns: List of Quantity objects.
 
     """
-    characteristics = parse("$.characteristic[*]").find(resource)
+    characteristics = compile_jsonpath("$.characteristic[*]").find(resource)
     quantities = []
 
     if len(characteristics) == 1:
@@ -0,0 +1,130 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Pivot of clinical data to the first value of each variable per patient.
+
+Clinical data is returned by the clinical data interface with one row per value. For the evaluation, it is converted
+to a wide DataFrame with one row per patient and the fields ("value", "datetime", ...) of the first (earliest) value of
+each variable as columns (variable_name, field).
+
+Patients and variables are factorized to integer codes, the rows are sorted once (stable) by datetime and the first row
+of each (patient, variable) code pair is found with a hash based duplicate check. The fields of these rows are then
+scattered into the wide layout column by column, without any intermediate long (multi-indexed) frames.
+"""
+
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+
+INDEX_COLUMNS = ["pseudo_fallnr", "variable_name"]
+
+
+def datetime_order(datetimes: pd.Series) -> np.ndarray:
+    """
+    Get the (stable) order of clinical data rows by datetime, missing datetimes last.
+
+    Args:
+        datetimes: Datetimes of the rows
+
+    Returns: Row positions in ascending order of the datetimes
+
+    """
+    if pd.api.types.is_datetime64_any_dtype(datetimes.dtype):
+        # UTC nanoseconds, NaT (minimum int64) is moved to the end
+        keys = datetimes.to_numpy(dtype="datetime64[ns]").view(np.int64).copy()
+        keys[datetimes.isna().to_numpy()] = np.iinfo(np.int64).max
+        return np.argsort(keys, kind="stable")
+
+    return (
+        datetimes.reset_index(drop=True)
+        .sort_values(kind="stable", na_position="last")
+        .index.to_numpy()
+    )
+
+
+def first_rows(df: pd.DataFrame) -> Tuple[np.ndarray, pd.Index, pd.Index]:
+    """
+    Find the first (earliest) row of each variable per patient.
+
+    Rows with equal datetimes are kept in their original order, i.e. the first of them is taken.
+
+    Args:
+        df: Clinical data (one row per value)
+
+    Returns: Position of the first row of each (patient, variable) as array of shape (patients, variables) (-1 if the
+        patient has no value of the variable), sorted unique patients and variables
+
+    """
+    patient_codes, patients = pd.factorize(df["pseudo_fallnr"], sort=True)
+    variable_codes, variables = pd.factorize(df["variable_name"], sort=True)
+    keys = patient_codes.astype(np.int64) * len(variables) + variable_codes
+
+    order = datetime_order(df["datetime"])
+    rows = order[~pd.Series(keys[order]).duplicated().to_numpy()]
+
+    positions = np.full((len(patients), len(variables)), -1, dtype=np.int64)
+    positions[patient_codes[rows], variable_codes[rows]] = rows
+
+    return positions, pd.Index(patients), pd.Index(variables)
+
+
+def first_values(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reduce clinical data to the first value of each variable per patient.
+
+    Args:
+        df: Clinical data (one row per value)
+
+    Returns: Clinical data with one row per patient and variable
+
+    """
+    positions, _, _ = first_rows(df)
+    rows = positions[positions >= 0]
+    return df.take(np.sort(rows))
+
+
+def pivot_first_values(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert clinical data as returned by the clinical data interface to a DataFrame with the first value of each
+    variable per patient.
+
+    Args:
+        df: Clinical data (one row per value) with the columns "pseudo_fallnr", "variable_name", "datetime" and the
+            fields of the values (e.g. "value", "datetime_end")
+
+    Returns: DataFrame with one row per patient (index "pseudo_fallnr") and columns (variable_name, field), missing
+        values are filled with NA (integer and boolean fields are converted to float and object, respectively)
+
+    """
+    positions, patients, variables = first_rows(df)
+    fields = sorted(c for c in df.columns if c not in INDEX_COLUMNS)
+
+    columns = {}
+    for j, variable in enumerate(variables):
+        for field in fields:
+            columns[(variable, field)] = take(
+                df[field].array, positions[:, j], allow_fill=True
+            )
+
+    result = pd.DataFrame(columns, index=patients.rename("pseudo_fallnr"))
+    result.columns = pd.MultiIndex.from_tuples(
+        list(columns), names=["variable_name", None]
+    )
+
+    return result
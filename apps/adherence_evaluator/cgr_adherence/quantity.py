@@ -17,10 +17,65 @@
 
 from typing import Union, Optional, Type, Any
 import numbers
+import numpy as np
+import pandas as pd
 import pint
 from . import ureg
 
 
+def _to_array(values: Union[pd.Series, np.ndarray]) -> np.ndarray:
+    """
+    Converts a Series or array-like to a NumPy array with the element types seen by Series.apply.
+
+    Extension arrays (e.g. categorical, nullable integer or timezone-aware datetime columns) are converted to object
+    arrays, so that the element-wise semantics of the vectorized validators equal those of the scalar validators.
+
+    Args:
+        values: Values to convert
+
+    Returns: NumPy array of the values
+
+    """
+    if isinstance(values, pd.Series):
+        if pd.api.types.is_extension_array_dtype(values.dtype):
+            return values.to_numpy(dtype=object)
+        return values.to_numpy()
+    return np.asarray(values)
+
+
+def _type_mask(values: np.ndarray, datatype: Type) -> np.ndarray:
+    """
+    Determines element-wise whether the elements of an object array are exactly of the given type.
+
+    Args:
+        values: Object array
+        datatype: Type to test for (subclasses do not match)
+
+    Returns: Boolean array, True where the element is of the given type
+
+    """
+    return np.fromiter(
+        (type(v) is datatype for v in values), dtype=bool, count=len(values)
+    )
+
+
+def _number_mask(values: np.ndarray) -> np.ndarray:
+    """
+    Determines element-wise whether the elements of an object array are numbers.
+
+    Args:
+        values: Object array
+
+    Returns: Boolean array, True where the element is a number
+
+    """
+    return np.fromiter(
+        (isinstance(v, numbers.Number) for v in values),
+        dtype=bool,
+        count=len(values),
+    )
+
+
 class Quantity:
     """
     Specification of a value or value range of a quantity.
@@ -175,6 +230,56 @@ class Quantity:
 
         return valid
 
+    def _str_validator_array(self, values: np.ndarray) -> np.ndarray:
+        if values.dtype.kind == "U":
+            return values == self.value
+        if values.dtype.kind != "O":
+            return np.zeros(len(values), dtype=bool)
+
+        valid = _type_mask(values, str)
+        valid[valid] = values[valid] == self.value
+        return valid
+
+    def _bool_validator_array(self, values: np.ndarray) -> np.ndarray:
+        if values.dtype.kind == "b":
+            return values == self.value
+        if values.dtype.kind != "O":
+            return np.zeros(len(values), dtype=bool)
+
+        valid = _type_mask(values, bool)
+        valid[valid] = values[valid].astype(bool) == self.value
+        return valid
+
+    def _numeric_validator_array(self, values: np.ndarray) -> np.ndarray:
+        if values.dtype.kind == "O":
+            valid = _number_mask(values)
+            try:
+                numbers_ = values[valid].astype(float)
+            except (TypeError, ValueError):
+                # numbers without float representation (e.g. complex) - compare one by one
+                return np.fromiter(
+                    (self._numeric_validator(v) for v in values),
+                    dtype=bool,
+                    count=len(values),
+                )
+            valid[valid] = self._numeric_validator_array(numbers_)
+            return valid
+
+        if values.dtype.kind not in "biuf":
+            return np.zeros(len(values), dtype=bool)
+
+        if self.value is not None:
+            return values == self.value
+
+        valid = np.ones(len(values), dtype=bool)
+        if self.value_low is not None:
+            valid &= values >= self.value_low
+
+        if self.value_high is not None:
+            valid &= values <= self.value_high
+
+        return valid
+
     @property
     def unit(self) -> Optional[pint.Quantity]:
         """
@@ -209,6 +314,30 @@ class Quantity:
 
         return validators[self.datatype](value)  # type: ignore
 
+    def valid_array(self, values: Union[pd.Series, np.ndarray]) -> np.ndarray:
+        """
+        Determines element-wise if the given values are compliant with (i.e. match) the value or value range of the
+        quantity specification.
+
+        This is the vectorized equivalent of :meth:`valid` - the result for each element equals the result of
+        :meth:`valid` for that element, but the comparisons are performed on whole NumPy arrays. Object (mixed type)
+        arrays are split into type masks first, e.g. strings never match numeric quantities.
+
+        Args:
+            values: Values to compare (Series or array)
+
+        Returns: Boolean array, True where the value is compliant with quantity specification
+
+        """
+        validators = {
+            bool: self._bool_validator_array,
+            str: self._str_validator_array,
+            int: self._numeric_validator_array,
+            float: self._numeric_validator_array,
+        }
+
+        return np.asarray(validators[self.datatype](_to_array(values)), dtype=bool)  # type: ignore
+
     def __repr__(self) -> str:
         """
         Get string representation of defined quantity.
@@ -285,6 +414,20 @@ class Medication(Quantity):
         # TODO implement proper check
         return value > 0
 
+    def valid_array(self, values: Union[pd.Series, np.ndarray]) -> np.ndarray:
+        """
+        Determines element-wise if the given values are compliant with (i.e. match) the specified medication.
+
+        Args:
+            values: Values to compare (Series or array)
+
+        Returns: Boolean array, True where the value is compliant with quantity specification
+
+        """
+        # TODO implement proper check
+        with np.errstate(invalid="ignore"):
+            return np.asarray(_to_array(values) > 0, dtype=bool)
+
     def __repr__(self) -> str:
         """
         Get string representation of defined medication.
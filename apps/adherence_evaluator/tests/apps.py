@@ -0,0 +1,82 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Import of the modules of the other apps (the ui backend and the clinical data interface), which share the data formats
+and copies of some modules with the adherence evaluator.
+
+Each app is a separate image with its modules at the top level, so modules of different apps have the same names (e.g.
+"transport"). The modules are imported with the modules of their own app and removed from sys.modules again.
+"""
+
+import ast
+import importlib
+import sys
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, List
+
+import pytest
+
+APPS_PATH = Path(__file__).parents[2]
+
+
+def import_app_modules(app: str, names: List[str]) -> List[ModuleType]:
+    """
+    Import modules of an app.
+
+    Args:
+        app: App (directory name)
+        names: Module names, in the order of their dependencies
+
+    Returns: Modules (skips the test if the app is not available)
+
+    """
+    path = APPS_PATH / app / "app"
+    if not path.exists():
+        pytest.skip(f"{app} not available")
+
+    saved = {name: sys.modules.pop(name) for name in names if name in sys.modules}
+    sys.path.insert(0, str(path))
+    try:
+        return [importlib.import_module(name) for name in names]
+    finally:
+        sys.path.remove(str(path))
+        for name in names:
+            sys.modules.pop(name, None)
+        sys.modules.update(saved)
+
+
+def definitions(path: Path) -> Dict[str, str]:
+    """
+    Get the top-level definitions of a module (to compare copies of a module in different apps).
+
+    Args:
+        path: Module file
+
+    Returns: Dump of the syntax tree of each function, class and assignment (by name)
+
+    """
+    tree = ast.parse(path.read_text())
+    names = {}
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            names[node.name] = ast.dump(node)
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                names[ast.unparse(target)] = ast.dump(node)
+    return names
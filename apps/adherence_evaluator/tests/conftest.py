@@ -0,0 +1,42 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+
+from pathlib import Path
+
+import pytest
+
+APP_PATH = Path(__file__).parents[1] / "app"
+
+
+@pytest.fixture
+def main(tmp_path, monkeypatch):
+    """
+    The FastAPI app module of the adherence evaluator, saving its results in a temporary directory.
+    """
+    for name, value in [
+        ("GUIDELINE_SERVER", "http://guideline-interface"),
+        ("PATIENTDATA_SERVER", "http://clinical-data-interface"),
+        ("CEOSYS_DATA_PATH", str(tmp_path)),
+    ]:
+        monkeypatch.setenv(name, value)
+    monkeypatch.syspath_prepend(str(APP_PATH))
+    pytest.importorskip("fastapi")
+
+    import main
+
+    monkeypatch.setattr(main.settings, "ceosys_data_path", str(tmp_path))
+    return main
@@ -0,0 +1,89 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Micro-benchmark of the guideline recommendation parsing with and without the compiled JSONPath expression cache.
+
+The benchmark is opt-in, run with "CEOSYS_BENCHMARK=1 pytest -s" to see the parse times per recommendation.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+from jsonpath_ng.ext import parse
+
+from cgr_adherence import evaluator, fhir, parser
+from cgr_adherence.evaluator import AdherenceEvaluator
+
+FHIR_PATH = Path(__file__).parents[2] / "guideline_interface" / "FHIR"
+N_REPEAT = 5
+
+benchmark = pytest.mark.skipif(
+    not os.getenv("CEOSYS_BENCHMARK"), reason="set CEOSYS_BENCHMARK=1 to run"
+)
+RECOMMENDATIONS = pytest.mark.parametrize(
+    "fname",
+    sorted(FHIR_PATH.glob("Recommendation_MA*.fhir.json")),
+    ids=lambda f: f.name,
+)
+
+
+def parse_time(rec: dict) -> float:
+    t_start = time.perf_counter()
+    for _ in range(N_REPEAT):
+        AdherenceEvaluator(rec).process_guideline_recommendation()
+    return (time.perf_counter() - t_start) / N_REPEAT
+
+
+@RECOMMENDATIONS
+def test_compile_jsonpath_cached(fname):
+    with open(fname) as f:
+        rec = json.load(f)
+
+    fhir.compile_jsonpath.cache_clear()
+    AdherenceEvaluator(rec).process_guideline_recommendation()
+    first = fhir.compile_jsonpath.cache_info()
+    AdherenceEvaluator(rec).process_guideline_recommendation()
+    second = fhir.compile_jsonpath.cache_info()
+
+    # the second run compiles no expression and reuses the compiled ones
+    assert second.misses == first.misses
+    assert second.hits > first.hits
+    assert fhir.compile_jsonpath("$.entry[*]") is fhir.compile_jsonpath("$.entry[*]")
+
+
+@benchmark
+@RECOMMENDATIONS
+def test_benchmark_parse_recommendation(fname, monkeypatch):
+    with open(fname) as f:
+        rec = json.load(f)
+
+    with monkeypatch.context() as m:
+        for module in [evaluator, fhir, parser]:
+            m.setattr(module, "compile_jsonpath", parse)
+        t_uncached = parse_time(rec)
+
+    fhir.compile_jsonpath.cache_clear()
+    t_cached = parse_time(rec)
+
+    print(
+        f"\n{fname.name}: {t_uncached * 1000:.1f} ms (uncached) -> "
+        f"{t_cached * 1000:.1f} ms (cached) per recommendation"
+    )
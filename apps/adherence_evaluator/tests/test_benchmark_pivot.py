@@ -0,0 +1,95 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Micro-benchmark of the first-value pivot of clinical data against the groupby().nth(0) / unstack pivot on a generated
+dataset of 10k patients.
+
+The benchmark is opt-in, run with "CEOSYS_BENCHMARK=1 pytest -s" to see the pivot times.
+"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cgr_adherence.pivot import pivot_first_values
+
+N_PATIENTS = 10000
+N_VARIABLES = 10
+N_VALUES = 500000
+
+pytestmark = pytest.mark.skipif(
+    not os.getenv("CEOSYS_BENCHMARK"), reason="set CEOSYS_BENCHMARK=1 to run"
+)
+
+
+@pytest.fixture(scope="module")
+def df():
+    rng = np.random.default_rng(0)
+    patients = rng.integers(0, N_PATIENTS, N_VALUES)
+    variables = rng.integers(0, N_VARIABLES, N_VALUES)
+
+    value = pd.Series(rng.normal(size=N_VALUES), dtype=object)
+    value[variables == 0] = "ICU"
+    value[variables == 1] = True
+    datetime = pd.Timestamp("2021-01-01", tz="Europe/Berlin") + pd.to_timedelta(
+        rng.integers(0, 90 * 24 * 3600, N_VALUES), unit="s"
+    )
+
+    return pd.DataFrame(
+        {
+            "pseudo_fallnr": pd.Series(patients).map("{:05d}".format),
+            "variable_name": pd.Series(variables).map("variable_{}".format),
+            "value": value,
+            "datetime": datetime,
+            "datetime_end": pd.Series(pd.NaT, index=range(N_VALUES)).dt.tz_localize(
+                "Europe/Berlin"
+            ),
+        }
+    )
+
+
+def pivot_groupby(df: pd.DataFrame) -> pd.DataFrame:
+    df = (
+        df.sort_values(by="datetime", kind="stable")
+        .groupby(["pseudo_fallnr", "variable_name"])
+        .nth(0)
+    )
+    df = df.unstack("variable_name")
+    df = df.swaplevel(axis=1).sort_index(axis=1)
+
+    return df
+
+
+def test_benchmark_pivot(df):
+    t_start = time.perf_counter()
+    expected = pivot_groupby(df)
+    t_groupby = time.perf_counter() - t_start
+
+    t_start = time.perf_counter()
+    pivot = pivot_first_values(df)
+    t_pivot = time.perf_counter() - t_start
+
+    print(
+        f"\n{len(df)} values of {N_PATIENTS} patients: {t_groupby * 1000:.0f} ms "
+        f"(groupby) -> {t_pivot * 1000:.0f} ms (first-value pivot)"
+    )
+
+    pd.testing.assert_frame_equal(pivot, expected)
@@ -0,0 +1,86 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+from pathlib import Path
+
+import pytest
+from cgr_adherence import mapping_table
+from cgr_adherence.cache import PlanCache, recommendation_hash
+
+FHIR_PATH = Path(__file__).parents[2] / "guideline_interface" / "FHIR"
+
+
+@pytest.fixture
+def rec():
+    fname = FHIR_PATH / "Recommendation_MA69591.fhir.json"
+    if not fname.exists():
+        pytest.skip("guideline recommendation not available")
+    with open(fname) as f:
+        return json.load(f)
+
+
+def test_recommendation_hash():
+    assert recommendation_hash({"a": 1, "b": [1, 2]}) == recommendation_hash(
+        {"b": [1, 2], "a": 1}
+    )
+    assert recommendation_hash({"a": 1}) != recommendation_hash({"a": 2})
+
+
+def test_plan_cache_lru():
+    cache = PlanCache(maxsize=2)
+    for key in ["a", "b", "c"]:
+        cache.put(key, ({}, {key: []}, {}))
+    assert len(cache) == 2
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+
+    cache.put("d", ({}, {}, {}))
+    assert cache.get("b") is not None
+    assert cache.get("c") is None
+
+
+def test_plan_cache_process(rec):
+    cache = PlanCache()
+    plan = cache.process(rec)
+    assert cache.process(rec) is plan
+    assert len(cache) == 1
+
+
+def test_plan_cache_persist(rec, tmp_path):
+    plan = PlanCache(path=tmp_path).process(rec)
+    assert len(list(tmp_path.glob("plan_*.pkl"))) == 1
+
+    cache = PlanCache(path=tmp_path)
+    cached = cache.get(cache.key(rec))
+    assert cached is not None
+    assert cached[0] == plan[0]
+    for q_cached, q in zip(cached[1:], plan[1:]):
+        assert q_cached.keys() == q.keys()
+        for key in q:
+            assert q_cached[key] == q[key]
+
+
+def test_plan_cache_mapping_changed(rec, tmp_path):
+    PlanCache(path=tmp_path).process(rec)
+    assert PlanCache(path=tmp_path).get(PlanCache().key(rec)) is not None
+
+    df_mapping = mapping_table.copy()
+    df_mapping.loc[0, "variable_name"] = "changed"
+    cache = PlanCache(path=tmp_path, df_mapping=df_mapping)
+    assert cache.key(rec) != PlanCache().key(rec)
+    assert cache.get(cache.key(rec)) is None
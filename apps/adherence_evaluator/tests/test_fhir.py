@@ -0,0 +1,69 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+
+import pytest
+from cgr_adherence.fhir import BundleIndex, find_resource, findall_resources
+
+bundle = {
+    "resourceType": "Bundle",
+    "entry": [
+        {"resource": {"resourceType": "Evidence", "id": "e1"}},
+        {"resource": {"resourceType": "Group", "identifier": [{"value": "g1"}]}},
+        {"resource": {"resourceType": "Group", "identifier": [{"value": "g2"}]}},
+        {"resource": {"resourceType": "Group", "identifier": [{"value": "g1"}]}},
+        {
+            "resource": {
+                "resourceType": "EvidenceVariable",
+                "identifier": [{"value": "g1"}],
+            }
+        },
+    ],
+}
+
+
+@pytest.mark.parametrize(
+    "resource_type,identifier",
+    [
+        ("Evidence", None),
+        ("Group", None),
+        ("Group", "g1"),
+        ("Group", "g2"),
+        ("EvidenceVariable", "g1"),
+        ("EvidenceVariable", "g2"),
+        ("Composition", None),
+    ],
+)
+def test_bundle_index_equals_scan(resource_type, identifier):
+    index = BundleIndex(bundle)
+
+    expected = list(findall_resources(bundle, resource_type, identifier))
+    found = list(index.findall(resource_type, identifier))
+    assert len(found) == len(expected)
+    assert all(f is e for f, e in zip(found, expected))
+
+    if expected:
+        assert index.find(resource_type, identifier) is find_resource(
+            bundle, resource_type, identifier
+        )
+
+
+def test_bundle_index_not_found():
+    index = BundleIndex(bundle)
+    with pytest.raises(KeyError, match='No resource "Group" with identifier "g3"'):
+        index.find("Group", "g3")
+    with pytest.raises(KeyError, match='No resource "Composition" found'):
+        index.find("Composition")
@@ -0,0 +1,134 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from .apps import APPS_PATH, definitions, import_app_modules
+
+httpx = pytest.importorskip("httpx")
+
+COPIES = [
+    APPS_PATH / app / "app" / "http_client.py"
+    for app in ["ui_backend", "guideline_interface"]
+]
+
+
+@pytest.fixture
+def http_client(monkeypatch):
+    monkeypatch.syspath_prepend(str(APPS_PATH / "adherence_evaluator" / "app"))
+    import http_client
+
+    return http_client
+
+
+def flaky_transport(calls):
+    def handler(request):
+        calls.append(request.url.path)
+        if len(calls) == 1:
+            return httpx.Response(503)
+        return httpx.Response(200)
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.parametrize(
+    "method, path, retried",
+    [
+        ("GET", "/recommendation/list", True),
+        ("POST", "/patients/changes", True),
+        ("POST", "/patient/P1", True),
+        ("POST", "/ingest", False),
+        ("POST", "/patients/changes/delete", False),
+    ],
+)
+def test_retry_idempotent_only(http_client, method, path, retried):
+    read_only_posts = ["/patients/changes", "/patient/*"]
+
+    calls = []
+    transport = http_client.RetryTransport(
+        flaky_transport(calls), 2, 0, read_only_posts
+    )
+    r = httpx.Client(transport=transport).request(method, "http://server" + path)
+    assert r.status_code == (200 if retried else 503)
+    assert len(calls) == (2 if retried else 1)
+
+    calls = []
+    transport = http_client.AsyncRetryTransport(
+        flaky_transport(calls), 2, 0, read_only_posts
+    )
+
+    async def request():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.request(method, "http://server" + path)
+
+    r = asyncio.run(request())
+    assert r.status_code == (200 if retried else 503)
+    assert len(calls) == (2 if retried else 1)
+
+
+@pytest.mark.parametrize("copy", COPIES, ids=lambda p: p.parts[-3])
+def test_copies_match(copy):
+    """
+    The apps that only need the asynchronous client have a reduced copy of the module, which must not diverge.
+    """
+    if not copy.exists():
+        pytest.skip(f"{copy} not available")
+    original = definitions(APPS_PATH / "adherence_evaluator" / "app" / "http_client.py")
+    reduced = definitions(copy)
+
+    for name in ["RETRY_STATUS_CODES", "RETRY_EXCEPTIONS", "IDEMPOTENT_METHODS"]:
+        assert reduced[name] == original[name]
+    for name in ["backoff_delay", "retryable", "AsyncRetryTransport"]:
+        assert reduced[name] == original[name], name
+
+
+@pytest.mark.parametrize(
+    "app", ["adherence_evaluator", "ui_backend", "guideline_interface"]
+)
+def test_clients_created_once(app, monkeypatch):
+    (http_client,) = import_app_modules(app, ["http_client"])
+    clients = http_client.ServiceClients()
+    properties = ["async_client"]
+    if hasattr(http_client.ServiceClients, "client"):
+        properties.append("client")
+
+    for name, transport in [
+        ("HTTPTransport", httpx.HTTPTransport),
+        ("AsyncHTTPTransport", httpx.AsyncHTTPTransport),
+    ]:
+        # slow creation of the clients, to let all threads see a missing client
+        def slow(*args, transport=transport, **kwargs):
+            time.sleep(0.05)
+            return transport(*args, **kwargs)
+
+        monkeypatch.setattr(httpx, name, slow)
+
+    for name in properties:
+        barrier = threading.Barrier(8)
+
+        def get(_):
+            barrier.wait()
+            return getattr(clients, name)
+
+        with ThreadPoolExecutor(8) as executor:
+            created = list(executor.map(get, range(8)))
+        assert all(client is created[0] for client in created), name
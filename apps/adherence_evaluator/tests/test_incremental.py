@@ -0,0 +1,127 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+from cgr_adherence.quantity import Quantity
+
+
+def clinical_data(rows):
+    return pd.DataFrame(
+        rows, columns=["pseudo_fallnr", "variable_name", "datetime", "value"]
+    ).assign(datetime=lambda df: pd.to_datetime(df["datetime"]))
+
+
+@pytest.fixture
+def plan():
+    variable_names = {"population": {"A", "B"}, "exposure": {"C"}}
+    q_population = {
+        "group": [
+            Quantity(int, value_low=1, variable_name="A"),
+            Quantity(int, value_low=1, variable_name="B"),
+        ]
+    }
+    q_exposure = {"group": [Quantity(int, value_low=1, variable_name="C")]}
+    return variable_names, q_population, q_exposure
+
+
+def test_select_variables_missing_variable(main):
+    df = main.pivot_data(clinical_data([["P1", "A", "2021-01-01", 1]]))
+    selected = main.select_variables(df, ["A", "B"])
+    assert list(selected.columns.unique(level=0)) == ["A", "B"]
+    assert selected[("B", "value")].isna().all()
+
+
+def test_evaluate_variables_absent(main, plan):
+    # only values of variables of other guideline recommendations
+    data = main.pivot_data(clinical_data([["P1", "D", "2021-01-01", 1]]))
+    selected = main.select_variables(data, ["A", "B", "C"])
+    assert selected.empty
+    assert list(selected.columns.unique(level=0)) == ["A", "B", "C"]
+
+    main.evaluate_recommendation(data, "1", plan)
+    summary = main.read_result(main.settings.ceosys_data_path, "results_summary", "1")
+    assert summary.empty
+    assert list(summary.columns) == [
+        "valid_exposure",
+        "valid_population",
+        "valid_treatment",
+    ]
+
+
+def test_incremental_equals_full(main, plan):
+    before = [
+        ["P1", "A", "2021-01-01", 1],
+        ["P1", "B", "2021-01-01", 1],
+        ["P1", "C", "2021-01-01", 1],
+        ["P2", "C", "2021-01-01", 1],
+    ]
+    # the changed patient has no value of B, which was required by the guideline recommendation
+    changed = [["P2", "A", "2021-01-02", 1]]
+
+    main.evaluate_recommendation(main.pivot_data(clinical_data(before)), "1", plan)
+    # incremental runs get all values of the changed patients
+    data = clinical_data(before + changed)
+    data = data[data["pseudo_fallnr"] == "P2"]
+    main.update_recommendation(main.pivot_data(data), "1", plan)
+    incremental = main.read_result(
+        main.settings.ceosys_data_path, "results_summary", "1"
+    )
+
+    main.evaluate_recommendation(
+        main.pivot_data(clinical_data(before + changed)), "1", plan
+    )
+    full = main.read_result(main.settings.ceosys_data_path, "results_summary", "1")
+
+    pdt.assert_frame_equal(incremental, full)
+    assert not full.loc["P2", "valid_population"]
+
+
+def test_incremental_variables_absent(main, plan):
+    before = [
+        ["P1", "A", "2021-01-01", 1],
+        ["P1", "B", "2021-01-01", 1],
+        ["P1", "C", "2021-01-01", 1],
+    ]
+    main.evaluate_recommendation(main.pivot_data(clinical_data(before)), "1", plan)
+    full = main.read_result(main.settings.ceosys_data_path, "results_summary", "1")
+
+    # the changed patient only has values of variables of other guideline recommendations
+    changed = main.pivot_data(clinical_data([["P2", "D", "2021-01-02", 1]]))
+    assert main.update_recommendation(changed, "1", plan) == 0
+
+    incremental = main.read_result(
+        main.settings.ceosys_data_path, "results_summary", "1"
+    )
+    pdt.assert_frame_equal(incremental, full)
+
+
+def test_variable_absent_for_all_patients(main, plan):
+    """
+    Rules of variables without any value in the clinical data are not fulfilled (they are not skipped).
+    """
+    data = [
+        ["P1", "A", "2021-01-01", 1],
+        ["P1", "C", "2021-01-01", 1],
+        ["P2", "A", "2021-01-01", 1],
+    ]
+    main.evaluate_recommendation(main.pivot_data(clinical_data(data)), "1", plan)
+    summary = main.read_result(main.settings.ceosys_data_path, "results_summary", "1")
+
+    assert not summary["valid_population"].any()
+    assert summary["valid_treatment"].all()
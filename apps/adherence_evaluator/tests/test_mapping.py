@@ -0,0 +1,49 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+
+import pytest
+from cgr_adherence import mapping_table
+from cgr_adherence.mapping import (
+    codeable_concepts_to_clinical_variable,
+    unique_codeable_concept_mapping,
+)
+
+
+def test_mapping_lookup_equals_table_query():
+    for system, code in mapping_table[["system", "code"]].itertuples(index=False):
+        concept = {"coding": [{"system": system + "/", "code": f" {code} "}]}
+        expected = mapping_table[
+            (mapping_table["system"] == system) & (mapping_table["code"] == code)
+        ].to_dict(orient="records")
+        mappings = codeable_concepts_to_clinical_variable(concept)
+        assert len(mappings) == len(expected)
+        for m, e in zip(mappings, expected):
+            assert m.keys() == e.keys()
+            assert all(m[k] == e[k] or (m[k] != m[k] and e[k] != e[k]) for k in m)
+
+
+def test_mapping_lookup_not_found():
+    concept = {"coding": [{"system": "https://snomed.info/sct", "code": "unknown"}]}
+    with pytest.raises(ValueError, match="Could not find mapping"):
+        codeable_concepts_to_clinical_variable(concept)
+
+
+def test_mapping_lookup_returns_copies():
+    concept = {"coding": [{"system": "https://snomed.info/sct", "code": "40199007"}]}
+    mapping = unique_codeable_concept_mapping(concept)
+    mapping["value"] = "prone"
+    assert unique_codeable_concept_mapping(concept)["value"] == "supine"
@@ -0,0 +1,81 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+
+import pandas as pd
+import pytest
+
+from cgr_adherence.pivot import first_values, pivot_first_values
+
+
+@pytest.fixture
+def df():
+    t = pd.Timestamp("2021-03-01 12:00", tz="Europe/Berlin")
+    h = pd.Timedelta(hours=1)
+    return pd.DataFrame(
+        {
+            "pseudo_fallnr": ["P2", "P1", "P1", "P2", "P1", "P2"],
+            "variable_name": ["sO2", "sO2", "sO2", "ward", "ward", "sO2"],
+            "value": [95.0, 88.0, 91.0, "ICU", "ICU", 90.0],
+            "datetime": [t + 2 * h, t + h, t, t, t, t + 2 * h],
+            "datetime_end": pd.Series([pd.NaT] * 6, dtype="datetime64[ns, UTC]"),
+        }
+    )
+
+
+def test_first_values(df):
+    first = first_values(df)
+    # earliest value per patient and variable, the first of equal datetimes
+    assert list(first.index) == [0, 2, 3, 4]
+
+
+def test_pivot_first_values(df):
+    pivot = pivot_first_values(df)
+
+    assert list(pivot.index) == ["P1", "P2"]
+    assert pivot.index.name == "pseudo_fallnr"
+    assert list(pivot.columns) == [
+        ("sO2", "datetime"),
+        ("sO2", "datetime_end"),
+        ("sO2", "value"),
+        ("ward", "datetime"),
+        ("ward", "datetime_end"),
+        ("ward", "value"),
+    ]
+    assert list(pivot[("sO2", "value")]) == [91.0, 95.0]
+    assert list(pivot[("ward", "value")]) == ["ICU", "ICU"]
+    assert pivot[("sO2", "datetime")].dtype == df["datetime"].dtype
+
+
+def test_pivot_first_values_missing(df):
+    pivot = pivot_first_values(df[(df["pseudo_fallnr"] == "P2") | (df.index == 2)])
+
+    assert pd.isna(pivot.loc["P1", ("ward", "value")])
+    assert pd.isna(pivot.loc["P1", ("ward", "datetime")])
+    assert pivot.loc["P2", ("ward", "value")] == "ICU"
+
+
+def test_pivot_first_values_groupby(df):
+    expected = (
+        df.sort_values(by="datetime", kind="stable")
+        .groupby(["pseudo_fallnr", "variable_name"])
+        .nth(0)
+        .unstack("variable_name")
+        .swaplevel(axis=1)
+        .sort_index(axis=1)
+    )
+
+    pd.testing.assert_frame_equal(pivot_first_values(df), expected)
@@ -15,8 +15,10 @@
 #  You should have received a copy of the GNU General Public License
 #  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
 
+import numpy as np
+import pandas as pd
 import pytest
-from comparator.quantity import Quantity
+from cgr_adherence.quantity import Quantity, Medication
 
 
 def test_quantity_str():
@@ -109,6 +111,78 @@ def test_quantity_construct():
             Quantity(datatype)
 
 
+mixed_values = [
+    "ssdf",
+    "hallo",
+    101,
+    101.0,
+    100,
+    100.99999,
+    110,
+    -5,
+    np.nan,
+    None,
+    True,
+    False,
+    np.int64(101),
+    np.float32(100.5),
+    pd.Timestamp("2021-01-01"),
+]
+
+
+@pytest.mark.parametrize(
+    "q",
+    [
+        Quantity(str, "hallo"),
+        Quantity(bool, True),
+        Quantity(bool, False),
+        Quantity(int, 101),
+        Quantity(int, value_low=101),
+        Quantity(int, value_high=101),
+        Quantity(int, value_low=100, value_high=101),
+        Quantity(float, value_low=-1, value_high=0),
+    ],
+)
+def test_quantity_valid_array_mixed(q):
+    expected = [q.valid(v) for v in mixed_values]
+
+    values = pd.Series(mixed_values, dtype=object)
+    np.testing.assert_array_equal(q.valid_array(values), expected)
+    np.testing.assert_array_equal(
+        q.valid_array(np.array(mixed_values, dtype=object)), expected
+    )
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        pd.Series([99.0, 100.0, 100.5, 101.0, 101.1, np.nan]),
+        pd.Series([99, 100, 101, 102]),
+        pd.Series([True, False, True]),
+        pd.Series(["hallo", "ssdf"]),
+        pd.Series(["hallo", "ssdf", None], dtype="category"),
+        pd.Series([100, None, 101], dtype="Int64"),
+        pd.Series(pd.date_range("2021-01-01", periods=3)),
+        pd.Series(pd.date_range("2021-01-01", periods=3, tz="Europe/Berlin")),
+    ],
+)
+def test_quantity_valid_array_typed(values):
+    for q in [
+        Quantity(str, "hallo"),
+        Quantity(bool, True),
+        Quantity(int, 101),
+        Quantity(int, value_low=100, value_high=101),
+    ]:
+        expected = [q.valid(v) for v in values]
+        np.testing.assert_array_equal(q.valid_array(values), expected)
+
+
+def test_medication_valid_array():
+    q = Medication(drug=Quantity(float, 6.0), dose=Quantity(int, 6))
+    values = pd.Series([0, 1, 6.0, np.nan, -1], dtype=object)
+    np.testing.assert_array_equal(q.valid_array(values), values.apply(q.valid))
+
+
 test_quantity_str()
 test_quantity_bool()
 test_quantity_int_value()
@@ -0,0 +1,122 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pandas.testing as pdt
+import pytest
+
+from .apps import import_app_modules
+
+
+@pytest.fixture
+def evaluator_results():
+    return import_app_modules("adherence_evaluator", ["transport", "results"])[-1]
+
+
+@pytest.fixture
+def ui_results():
+    return import_app_modules("ui_backend", ["transport", "results"])[-1]
+
+
+@pytest.fixture
+def results(tmp_path, evaluator_results):
+    t = pd.Timestamp("2021-03-01 12:00", tz="Europe/Berlin")
+    summary = pd.DataFrame(
+        {
+            "valid_exposure": [True, False, True],
+            "valid_population": [True, True, False],
+            "valid_treatment": [True, False, False],
+        },
+        index=pd.Index(["P1", "P2", "P3"], name="pseudo_fallnr"),
+    )
+    detail = pd.DataFrame(
+        {
+            "variable_name": ["sO2", "ward", "sO2", "ventilated", "age"],
+            "value": [91.5, "ICU", None, True, 64],
+            "datetime": [t, t, t, pd.NaT, t],
+            "valid_value": [True, True, False, False, True],
+        },
+        index=pd.Index(["P1", "P1", "P2", "P3", "P3"], name="pseudo_fallnr"),
+    )
+
+    for name, df in [("results_summary", summary), ("results_detail", detail)]:
+        evaluator_results.write_result(tmp_path, name, "1", df)
+
+    return summary, detail
+
+
+def test_read_evaluator_results(tmp_path, results, evaluator_results, ui_results):
+    """
+    The ui backend reads the results as written by the adherence evaluator.
+    """
+    summary, detail = results
+    assert ui_results.partition_path(
+        tmp_path, "results_detail", "1"
+    ) == evaluator_results.partition_path(tmp_path, "results_detail", "1")
+
+    for name, df in [("results_summary", summary), ("results_detail", detail)]:
+        read = ui_results.read_result(tmp_path, name, "1")
+        pdt.assert_frame_equal(read, evaluator_results.read_result(tmp_path, name, "1"))
+        pdt.assert_index_equal(read.index, df.index)
+        assert read.columns.tolist() == df.columns.tolist()
+
+    read = ui_results.read_result(
+        tmp_path, "results_detail", "1", columns=["value"], patients=["P1", "P3"]
+    )
+    assert read.index.tolist() == ["P1", "P1", "P3", "P3"]
+    assert read["value"].tolist() == [91.5, "ICU", True, 64]
+
+
+def test_result_index(tmp_path, results, ui_results):
+    index = ui_results.ResultIndex(
+        ui_results.read_result(tmp_path, "results_summary", "1").reset_index(),
+        ui_results.read_result(tmp_path, "results_detail", "1").reset_index(),
+    )
+    summary, detail, cursor = index.page(limit=2)
+
+    assert summary["pseudo_fallnr"].tolist() == ["P1", "P2"]
+    assert detail["variable_name"].tolist() == ["sO2", "ward", "sO2"]
+    assert cursor == "P2"
+
+
+def test_write_sorted(tmp_path, evaluator_results, ui_results, monkeypatch):
+    monkeypatch.setattr(evaluator_results, "RESULTS_ROW_GROUP_SIZE", 2)
+    detail = pd.DataFrame(
+        {"variable_name": ["a", "a", "b", "c", "b", "c"], "value": [1, 2, 3, 4, 5, 6]},
+        index=pd.Index(["P3", "P1", "P2", "P1", "P3", "P2"], name="pseudo_fallnr"),
+    )
+    evaluator_results.write_result(tmp_path, "results_detail", "1", detail)
+
+    # one row group per patient, in the order of the patients
+    file = evaluator_results.partition_path(tmp_path, "results_detail", "1")
+    metadata = pq.ParquetFile(file / evaluator_results.RESULTS_FILE).metadata
+    column = metadata.schema.names.index("pseudo_fallnr")
+    statistics = [
+        metadata.row_group(i).column(column).statistics
+        for i in range(metadata.num_row_groups)
+    ]
+    assert [(s.min, s.max) for s in statistics] == [
+        ("P1", "P1"),
+        ("P2", "P2"),
+        ("P3", "P3"),
+    ]
+
+    for results in [evaluator_results, ui_results]:
+        read = results.read_result(tmp_path, "results_detail", "1", patients=["P3"])
+        assert read.index.tolist() == ["P3", "P3"]
+        assert read["value"].tolist() == [1, 5]
@@ -0,0 +1,146 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+
+import pandas.testing as pdt
+import pytest
+from cgr_adherence.quantity import Quantity
+
+httpx = pytest.importorskip("httpx")
+
+DATA = [
+    ("P1", "A", 1),
+    ("P1", "B", 0),
+    ("P1", "C", 1),
+    ("P2", "A", 1),
+    ("P2", "D", 1),
+    ("P3", "B", 1),
+    ("P3", "D", 0),
+]
+PLANS = {
+    "1": ("A", "C"),
+    "2": ("B", "D"),
+}
+RESULTS = ["results_summary", "results_detail", "variable_names"]
+
+
+def process(rec):
+    """
+    Processed guideline recommendation of the test recommendations (a population and an exposure variable).
+    """
+    if rec["id"] not in PLANS:
+        raise ValueError(f"Could not find mapping for recommendation {rec['id']}")
+    population, exposure = PLANS[rec["id"]]
+    return (
+        {"population": {population}, "exposure": {exposure}},
+        {"group": [Quantity(int, value_low=1, variable_name=population)]},
+        {"group": [Quantity(int, value_low=1, variable_name=exposure)]},
+    )
+
+
+def handler(request):
+    """
+    Guideline interface and clinical data interface with the test recommendations (3 cannot be processed) and data.
+    """
+    ids = ["1", "2", "3"]
+    path = request.url.path
+    if path == "/recommendation/list":
+        return httpx.Response(200, json=[{"id": i} for i in ids])
+    if path == "/recommendation/batch":
+        requested = [str(i) for i in json.loads(request.content)]
+        return httpx.Response(200, json={i: {"id": i} for i in requested})
+    if path.startswith("/recommendation/get/"):
+        return httpx.Response(200, json={"id": path.rsplit("/", 1)[-1]})
+    if path == "/version":
+        return httpx.Response(200, json={"version": 0})
+    if path == "/patients/stream":
+        variables = json.loads(request.content)
+        lines = [
+            json.dumps(
+                {
+                    "pseudo_fallnr": patient,
+                    "variable_name": variable,
+                    "value": value,
+                    "datetime": "2021-03-01T12:00:00+01:00",
+                    "datetime_end": "",
+                }
+            )
+            for patient, variable, value in DATA
+            if variable in variables
+        ]
+        return httpx.Response(
+            200,
+            content="".join(line + "\n" for line in lines),
+            headers={"content-type": "application/x-ndjson"},
+        )
+    return httpx.Response(404)
+
+
+@pytest.fixture
+def client(main, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    transport = httpx.MockTransport(handler)
+    monkeypatch.setattr(main.clients, "_client", httpx.Client(transport=transport))
+    monkeypatch.setattr(
+        main.clients, "_async_client", httpx.AsyncClient(transport=transport)
+    )
+    monkeypatch.setattr(main.plan_cache, "process", process)
+    monkeypatch.setattr(main, "recommendations", {})
+    return TestClient(main.app)
+
+
+def test_concurrent_equals_sequential(main, client, tmp_path, monkeypatch):
+    responses = {}
+    for mode, endpoint in [("sequential", "/run"), ("concurrent", "/run/concurrent")]:
+        path = tmp_path / mode
+        path.mkdir()
+        monkeypatch.setattr(main.settings, "ceosys_data_path", str(path))
+        responses[mode] = client.get(endpoint)
+
+    # the failed recommendation does not stop the run, but the run is not recorded
+    for r in responses.values():
+        assert r.status_code == 500
+        assert list(r.json()["detail"]["failed"]) == ["3"]
+    for mode in responses:
+        assert not (tmp_path / mode / main.RUN_STATE_FILE).exists()
+        with pytest.raises(FileNotFoundError):
+            main.read_result(tmp_path / mode, "results_summary", "3")
+
+    for recommendation_id in PLANS:
+        for name in RESULTS:
+            pdt.assert_frame_equal(
+                main.read_result(tmp_path / "concurrent", name, recommendation_id),
+                main.read_result(tmp_path / "sequential", name, recommendation_id),
+            )
+
+    summary = main.read_result(tmp_path / "concurrent", "results_summary", "1")
+    assert summary["valid_population"].to_dict() == {"P1": True, "P2": True}
+    assert summary["valid_exposure"].to_dict() == {"P1": True, "P2": False}
+
+
+def test_run_recorded(main, client, tmp_path, monkeypatch):
+    monkeypatch.setitem(PLANS, "3", ("C", "D"))
+
+    assert client.get("/run").json() == "Success"
+    assert (tmp_path / main.RUN_STATE_FILE).exists()
+
+    (tmp_path / main.RUN_STATE_FILE).unlink()
+    r = client.get("/run/concurrent")
+    assert sorted(r.json()["recommendations"]) == ["1", "2", "3"]
+    assert (tmp_path / main.RUN_STATE_FILE).exists()
@@ -0,0 +1,107 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from .apps import APPS_PATH, definitions, import_app_modules
+
+SHARED = [
+    "ARROW_MEDIA_TYPE",
+    "ACCEPT_HEADER",
+    "VALUE_TYPES",
+    "decode_arrow_table",
+    "decode_arrow",
+    "decode_response",
+]
+
+
+@pytest.fixture
+def clinical_data():
+    t = pd.Timestamp("2021-03-01 12:00", tz="Europe/Berlin")
+    return pd.DataFrame(
+        {
+            "variable_name": ["sO2", "ward", "ventilated", "age", "admission"],
+            "value": [91.5, "ICU", True, 64, t],
+            "datetime": [t, t, t, t, t],
+            "datetime_end": pd.Series([pd.NaT] * 5, dtype="datetime64[ns, UTC]"),
+            "pseudo_fallnr": ["P1", "P1", "P2", "P2", "P3"],
+        }
+    )
+
+
+@pytest.fixture
+def arrow_stream(clinical_data):
+    """
+    Clinical data as sent by the clinical data interface.
+    """
+    pytest.importorskip("fastapi")
+    transport, store = import_app_modules(
+        "clinical_data_interface", ["transport", "store"]
+    )
+    patient_data = store.PatientDataStore.from_frame(clinical_data)
+    rows = patient_data.rows(clinical_data["variable_name"])
+    return transport.to_arrow(patient_data.table(rows)), patient_data.frame(rows)
+
+
+def test_decode_clinical_data(arrow_stream):
+    """
+    The adherence evaluator and the ui backend decode the clinical data alike.
+    """
+    content, expected = arrow_stream
+    (evaluator,) = import_app_modules("adherence_evaluator", ["transport"])
+    (ui,) = import_app_modules("ui_backend", ["transport"])
+
+    df = evaluator.decode_arrow(content)
+    pdt.assert_frame_equal(ui.decode_arrow(content), df)
+    assert df["value"].tolist() == expected["value"].tolist()
+    for name in ["variable_name", "pseudo_fallnr", "datetime"]:
+        assert df[name].tolist() == expected[name].tolist()
+
+
+def test_decode_results(tmp_path):
+    """
+    Results written by the adherence evaluator are decoded alike by both copies.
+    """
+    evaluator, results = import_app_modules(
+        "adherence_evaluator", ["transport", "results"]
+    )
+    (ui,) = import_app_modules("ui_backend", ["transport"])
+    df = pd.DataFrame(
+        {"pseudo_fallnr": ["P1", "P1", "P2"], "value": [91.5, "ICU", None]}
+    )
+    table = results.encode_table(df)
+
+    pdt.assert_frame_equal(
+        ui.decode_arrow_table(table), evaluator.decode_arrow_table(table)
+    )
+
+
+def test_copies_match():
+    """
+    The ui backend has a reduced copy of the module (without streaming), which must not diverge.
+    """
+    copy = APPS_PATH / "ui_backend" / "app" / "transport.py"
+    if not copy.exists():
+        pytest.skip(f"{copy} not available")
+    original = definitions(APPS_PATH / "adherence_evaluator" / "app" / "transport.py")
+    reduced = definitions(copy)
+
+    for name in SHARED:
+        assert reduced[name] == original[name], name
@@ -19,12 +19,34 @@ Mock implementation of the clinical data interface.
 
 Uses generated data to provide a patient list for downstream services.
 """
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional, Union
+import datetime
 import os
+import re
 from pathlib import Path
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException, Response
+from fastapi.responses import StreamingResponse
+import numpy as np
 import pandas as pd
-from pydantic import BaseSettings
+from pydantic import (
+    BaseModel,
+    BaseSettings,
+    StrictBool,
+    StrictFloat,
+    StrictInt,
+    StrictStr,
+    validator,
+)
+from pydantic.datetime_parse import parse_datetime
+from store import PatientDataStore, read_snapshot_source, snapshot_source
+from transport import (
+    ARROW_MEDIA_TYPE,
+    NDJSON_MEDIA_TYPE,
+    accepts_arrow,
+    iter_arrow_stream,
+    iter_ndjson,
+    to_arrow,
+)
 
 
 class Settings(BaseSettings):
@@ -33,11 +55,75 @@ class Settings(BaseSettings):
     """
 
     ceosys_base_path: str
+    stream_batch_size: int = 100000
+    snapshot: bool = True
 
 
 app = FastAPI()
 settings = Settings()
-data = {}
+data: Dict[str, PatientDataStore] = {}
+
+# date and time of an ISO 8601 timestamp, other strings (e.g. numbers) are values on their own
+ISO_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}")
+
+
+class Observation(BaseModel):
+    """
+    Clinical observation of a patient (for ingestion)
+    """
+
+    pseudo_fallnr: str
+    variable_name: str
+    datetime: datetime.datetime
+    value: Union[StrictBool, StrictInt, StrictFloat, StrictStr, datetime.datetime]
+    datetime_end: Optional[datetime.datetime] = None
+
+    @validator("value")
+    def parse_timestamp(cls, value):
+        """
+        Parse ISO 8601 timestamps, keep all other strings (e.g. "5") as they are.
+
+        Args:
+            value: Value of the observation
+
+        Returns: Value, as datetime if it is an ISO 8601 timestamp
+
+        """
+        if isinstance(value, str) and ISO_TIMESTAMP.match(value):
+            return parse_datetime(value)
+        return value
+
+
+def load_data() -> PatientDataStore:
+    """
+    Load the mocked patient data.
+
+    If SNAPSHOT is enabled, the data is memory-mapped from a snapshot of the store, which is created from the mocked
+    patient data if it does not exist or is outdated.
+
+    Returns: Clinical data store
+
+    """
+    data_path = Path(settings.ceosys_base_path) / "data"
+    data_file = data_path / "sample_data_shuffle_large.pkl.gz"
+    snapshot_path = data_path / "snapshot"
+    source = snapshot_source(data_file)
+
+    if settings.snapshot and read_snapshot_source(snapshot_path) == source:
+        return PatientDataStore.load(snapshot_path)
+
+    df = pd.read_pickle(data_file).dropna(subset=["value"])
+    store = PatientDataStore.from_frame(df)
+
+    if settings.snapshot:
+        try:
+            store.save(snapshot_path, source)
+        except OSError as e:
+            print(f"Could not save snapshot of the patient data: {e}")
+        else:
+            store = PatientDataStore.load(snapshot_path)
+
+    return store
 
 
 @app.on_event("startup")
@@ -48,9 +134,7 @@ async def startup_event() -> None:
     Returns: None
 
     """
-    data["patients"] = pd.read_pickle(
-        Path(settings.ceosys_base_path) / "data" / "sample_data_shuffle_large.pkl.gz"
-    ).dropna(subset=["value"])
+    data["patients"] = load_data()
 
 
 @app.get("/")
@@ -64,51 +148,211 @@ async def root() -> Dict:
     return {"message": "Patient Data Server"}
 
 
-@app.get("/patients/list")
-async def get_patient_list() -> Dict:
+def current_store() -> PatientDataStore:
+    """
+    Get the clinical data store, including data ingested by other worker processes.
+
+    Returns: Clinical data store
+
+    """
+    data["patients"] = data["patients"].refresh()
+    return data["patients"]
+
+
+def respond(
+    store: PatientDataStore, rows: np.ndarray, accept: Optional[str]
+) -> Union[Dict, Response]:
+    """
+    Create the response for clinical data in the format requested by the client.
+
+    Args:
+        store: Clinical data store
+        rows: Row positions of the clinical data in the store
+        accept: Accept header of the request
+
+    Returns: Arrow IPC stream response if the client accepts it, otherwise dict of lists (JSON)
+
+    """
+    if accepts_arrow(accept):
+        return Response(
+            content=to_arrow(store.table(rows)), media_type=ARROW_MEDIA_TYPE
+        )
+
+    return store.frame(rows).fillna("").to_dict(orient="list")
+
+
+@app.get("/patients/list", response_model=None)
+async def get_patient_list(
+    accept: Optional[str] = Header(None),
+) -> Union[Dict, Response]:
     """
     Get list of patients with their ward, birth date and admission date
 
+    Args:
+        accept: Accept header (clinical data is returned as Arrow IPC stream if accepted)
+
     Returns: List of patients
 
     """
-    df = data["patients"]
+    store = current_store()
     variable_names = ["ward", "birth_date", "admission_hospitalisation"]
 
-    return (
-        df[df["variable_name"].isin(variable_names)].fillna("").to_dict(orient="list")
-    )
+    return respond(store, store.rows(variable_names), accept)
 
 
-@app.post("/patients/")
-async def get_data(variable_name: List[str]) -> Dict:
+@app.post("/patients/", response_model=None)
+async def get_data(
+    variable_name: List[str], accept: Optional[str] = Header(None)
+) -> Union[Dict, Response]:
     """
     Get clinical data for all patients.
 
     Args:
         variable_name: List of clinical variable names to return for the patients.
+        accept: Accept header (clinical data is returned as Arrow IPC stream if accepted)
 
     Returns: List of all available values for the requested variables.
 
     """
-    df = data["patients"]
+    store = current_store()
 
-    return df[df["variable_name"].isin(variable_name)].fillna("").to_dict(orient="list")
+    return respond(store, store.rows(variable_name), accept)
 
 
-@app.post("/patient/{patient_id}")
-async def get_patient_data(patient_id: str, variable_name: List[str]) -> Dict:
+@app.post("/patients/stream", response_model=None)
+async def get_data_stream(
+    variable_name: List[str], accept: Optional[str] = Header(None)
+) -> StreamingResponse:
+    """
+    Get clinical data for all patients as a stream of bounded chunks.
+
+    In contrast to /patients/, the response is never built in memory as a whole: the requested rows are serialized and
+    sent in chunks of at most STREAM_BATCH_SIZE rows.
+
+    Args:
+        variable_name: List of clinical variable names to return for the patients.
+        accept: Accept header (clinical data is streamed as Arrow IPC stream with one record batch per chunk if
+            accepted, as newline delimited JSON records otherwise)
+
+    Returns: All available values for the requested variables.
+
+    """
+    store = current_store()
+    idx = store.rows(variable_name)
+    batch_size = settings.stream_batch_size
+
+    def chunks() -> Iterator[np.ndarray]:
+        """
+        Get the requested rows in chunks of at most STREAM_BATCH_SIZE rows (at least one, possibly empty, chunk).
+
+        Returns: Row positions of one chunk at a time
+
+        """
+        for start in range(0, max(len(idx), 1), batch_size):
+            yield idx[start : start + batch_size]
+
+    if accepts_arrow(accept):
+        return StreamingResponse(
+            iter_arrow_stream(store.table(rows) for rows in chunks()),
+            media_type=ARROW_MEDIA_TYPE,
+        )
+
+    return StreamingResponse(
+        iter_ndjson(store.frame(rows) for rows in chunks()),
+        media_type=NDJSON_MEDIA_TYPE,
+    )
+
+
+@app.post("/patients/changes", response_model=None)
+async def get_changed_data(
+    variable_name: List[str], since: int, accept: Optional[str] = Header(None)
+) -> Union[Dict, Response]:
+    """
+    Get clinical data of the patients with new values since a data version.
+
+    For each patient with values of the requested variables ingested after version "since", all available values of
+    the requested variables are returned (not only the new ones), i.e. derived results of these patients can be
+    recomputed from the response alone. Patients whose values were ingested earlier may be included.
+
+    To not miss any changes, clients should get the data version (/version) before requesting the data and use it as
+    "since" for the next request.
+
+    Args:
+        variable_name: List of clinical variable names to return for the patients.
+        since: Data version (watermark) of the last request
+        accept: Accept header (clinical data is returned as Arrow IPC stream if accepted)
+
+    Returns: List of all available values for the requested variables for the changed patients.
+
+    """
+    store = current_store()
+    if since > store.version:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Unknown data version {since} (current version {store.version})",
+        )
+
+    patients = store.changed_patients(variable_name, since)
+
+    return respond(store, store.rows(variable_name, patients), accept)
+
+
+@app.post("/patient/{patient_id}", response_model=None)
+async def get_patient_data(
+    patient_id: str, variable_name: List[str], accept: Optional[str] = Header(None)
+) -> Union[Dict, Response]:
     """
     Get clinical data for a specific patient.
 
     Args:
         patient_id: Patient identifier
         variable_name: List of clinical variable names to return for the patients.
+        accept: Accept header (clinical data is returned as Arrow IPC stream if accepted)
 
     Returns: List of all available values for the requested variables for the specified patient.
 
     """
-    df = data["patients"]
-    df = df[df["pseudo_fallnr"] == patient_id]
+    store = current_store()
+
+    return respond(store, store.rows(variable_name, [patient_id]), accept)
+
+
+@app.post("/ingest")
+async def ingest(observations: List[Observation]) -> Dict:
+    """
+    Append new clinical observations.
+
+    The observations are appended to the clinical data store without rebuilding it, each (non-empty) batch increases
+    the data version by one.
+
+    Args:
+        observations: Clinical observations (naive datetimes are taken to be in the timezone of the stored data)
 
-    return df[df["variable_name"].isin(variable_name)].fillna("").to_dict(orient="list")
+    Returns: Data version after the ingestion and the number of ingested observations
+
+    """
+    store = current_store()
+
+    if observations:
+        df = pd.DataFrame(
+            {
+                field: pd.Series(
+                    [getattr(o, field) for o in observations], dtype=object
+                )
+                for field in Observation.__fields__
+            }
+        )
+        store = data["patients"] = store.append(df)
+
+    return {"version": store.version, "ingested": len(observations)}
+
+
+@app.get("/version")
+async def get_version() -> Dict:
+    """
+    Get the version of the clinical data (increases whenever new observations are ingested).
+
+    Returns: Data version
+
+    """
+    return {"version": current_store().version}
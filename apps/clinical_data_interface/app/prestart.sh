@@ -0,0 +1,3 @@
+#! /usr/bin/env sh
+# Create the snapshot of the patient data once, before the worker processes are started (they memory-map it)
+python -c "import main; main.load_data()"
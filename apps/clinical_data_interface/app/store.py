@@ -0,0 +1,864 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Compact in-memory store of the clinical data, partitioned by clinical variable and patient.
+
+The clinical data is held as plain NumPy columns instead of a DataFrame of Python objects:
+
+- "variable_name", "pseudo_fallnr" and "value_str" are categorical (int32 codes into a sorted array of categories,
+  -1 for missing values)
+- the mixed "value" column is split into typed columns ("value_float", "value_int", "value_bool", "value_str",
+  "value_datetime") and a "value_type" column (int8 code into VALUE_TYPES) that specifies which of the typed columns
+  holds the value of a row
+- "value_datetime", "datetime" and "datetime_end" are int64 nanoseconds since the epoch (UTC, NAT for missing values),
+  the timezone of each of these columns is kept separately
+
+The rows are sorted by variable name and patient identifier, so that the values of each variable form a contiguous
+block of rows, in which the values of each patient again form a contiguous block. Lookups by variable (and patient)
+are then dictionary lookups and binary searches instead of scans over the whole table, i.e. their cost depends on the
+number of rows returned rather than on the size of the table. Only the returned rows are converted to the transport
+formats.
+
+The store can be saved as snapshot directory (one .npy file per column and the categories and timezones as JSON) that
+is memory-mapped read-only when it is loaded. Loading a snapshot does not depend on the number of rows and multiple
+worker processes share the same (page cache) copy of the columns.
+
+New clinical data is appended as segments: each ingested batch is encoded (new categories are appended to the
+categories, i.e. existing codes never change) and sorted on its own, the existing data is not touched. Each segment has
+a version number; the version of the store is the version of its most recent segment (0 for the initial data). For a
+store loaded from a snapshot, the segments are saved in the "segments" directory of the snapshot, so that all worker
+processes (and restarts) see the same data and versions. Small segments are merged in memory if there are more than
+MAX_SEGMENTS of them.
+"""
+
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from transport import VALUE_ARROW_TYPES, VALUE_TYPES, value_type
+
+NAT = np.iinfo(np.int64).min
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_META = "store.json"
+SEGMENTS_DIR = "segments"
+SEGMENTS_LOCK = "segments.lock"
+MAX_SEGMENTS = 16
+
+
+def encode_categorical(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Encode values as categorical.
+
+    Args:
+        values: Values (missing values are encoded as -1)
+
+    Returns: Codes (int32) and sorted categories
+
+    """
+    codes, categories = pd.factorize(values, sort=True)
+    return codes.astype(np.int32), np.asarray(categories, dtype=object)
+
+
+def decode_categorical(codes: np.ndarray, categories: np.ndarray) -> np.ndarray:
+    """
+    Decode categorical values.
+
+    Args:
+        codes: Codes (-1 for missing values)
+        categories: Categories
+
+    Returns: Values (NaN for missing values)
+
+    """
+    values = np.full(len(codes), np.nan, dtype=object)
+    mask = codes >= 0
+    values[mask] = categories[codes[mask]]
+    return values
+
+
+def encode_datetime(values: pd.Series) -> Tuple[np.ndarray, Optional[str]]:
+    """
+    Encode datetime values as nanoseconds since the epoch.
+
+    Args:
+        values: Datetime values (timezone aware or naive)
+
+    Returns: Nanoseconds since the epoch (UTC for timezone aware values, NAT for missing values) and the timezone of
+        the values (None for naive values)
+
+    """
+    values = pd.to_datetime(values)
+    tz = values.dt.tz
+    if tz is not None:
+        values = values.dt.tz_convert("UTC").dt.tz_localize(None)
+        tz = str(tz)
+
+    return values.to_numpy(dtype="datetime64[ns]").view(np.int64), tz
+
+
+def decode_datetime(values: np.ndarray, tz: Optional[str]) -> pd.Series:
+    """
+    Decode datetime values from nanoseconds since the epoch.
+
+    Args:
+        values: Nanoseconds since the epoch (UTC for timezone aware values, NAT for missing values)
+        tz: Timezone of the values (None for naive values)
+
+    Returns: Datetime values
+
+    """
+    s = pd.Series(values.view("datetime64[ns]"))
+    if tz is not None:
+        s = s.dt.tz_localize("UTC").dt.tz_convert(tz)
+    return s
+
+
+def encode_timestamps(values: Iterable[Any], tz: Optional[str]) -> np.ndarray:
+    """
+    Encode datetime values (with possibly different timezones) as nanoseconds since the epoch.
+
+    Args:
+        values: Datetime values (naive values are taken to be in timezone tz)
+        tz: Timezone of the column the values are stored in (None for naive columns)
+
+    Returns: Nanoseconds since the epoch (UTC if tz is given, NAT for missing values)
+
+    """
+    encoded = []
+    for value in values:
+        t = pd.Timestamp(value)
+        if pd.isna(t):
+            encoded.append(NAT)
+            continue
+        if t.tzinfo is None and tz is not None:
+            t = t.tz_localize(tz)
+        elif t.tzinfo is not None and tz is None:
+            t = t.tz_convert("UTC").tz_localize(None)
+        encoded.append(t.value)
+
+    return np.array(encoded, dtype=np.int64)
+
+
+def encode_values(
+    values: pd.Series,
+) -> Tuple[Dict[str, np.ndarray], np.ndarray, Optional[str]]:
+    """
+    Split a mixed value column into typed columns.
+
+    Args:
+        values: Values of arbitrary types
+
+    Returns: Typed columns ("value_type" and one column per value type; "value_str" as categorical codes), the
+        categories of "value_str" and the timezone of "value_datetime"
+
+    """
+    types = values.map(type)
+    tags = types.map({t: value_type(t) for t in types.unique()}).to_numpy()
+    n = len(values)
+
+    columns = {"value_type": np.zeros(n, dtype=np.int8)}
+    str_categories = np.array([], dtype=object)
+    tz = None
+
+    for code, tag in enumerate(VALUE_TYPES):
+        mask = tags == tag
+        columns["value_type"][mask] = code
+
+        if tag == "float":
+            arr = np.full(n, np.nan)
+            arr[mask] = values[mask].astype(float)
+        elif tag == "int":
+            arr = np.zeros(n, dtype=np.int64)
+            arr[mask] = values[mask].astype(np.int64)
+        elif tag == "bool":
+            arr = np.zeros(n, dtype=bool)
+            arr[mask] = values[mask].astype(bool)
+        elif tag == "str":
+            arr = np.full(n, -1, dtype=np.int32)
+            arr[mask], str_categories = encode_categorical(values[mask].astype(str))
+        else:
+            arr = np.full(n, NAT, dtype=np.int64)
+            if mask.any():
+                # keep the timezone of the values (e.g. dates must not shift to the previous day)
+                value_tz = getattr(values[mask].iloc[0], "tzinfo", None)
+                tz = str(value_tz) if value_tz is not None else None
+                dt = pd.to_datetime(values[mask], utc=True).dt.tz_localize(None)
+                arr[mask] = dt.to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+        columns[f"value_{tag}"] = arr
+
+    return columns, str_categories, tz
+
+
+def save_columns(
+    path: Path, columns: Dict[str, np.ndarray], meta: Dict[str, Any]
+) -> None:
+    """
+    Save columns (one .npy file per column) and metadata (as JSON) to a directory.
+
+    The directory is written to a temporary directory first and then moved to its place, i.e. it is always complete.
+
+    Args:
+        path: Directory (replaced if it exists)
+        columns: Columns
+        meta: Metadata
+
+    Returns: None
+
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix=f".{path.name}.", dir=path.parent))
+    os.chmod(tmp, 0o755)
+
+    try:
+        for col, arr in columns.items():
+            np.save(tmp / f"{col}.npy", arr)
+
+        meta = {**meta, "format": SNAPSHOT_FORMAT, "columns": list(columns)}
+        (tmp / SNAPSHOT_META).write_text(json.dumps(meta))
+
+        if path.exists():
+            shutil.rmtree(path)
+        os.replace(tmp, path)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def load_columns(path: Path) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """
+    Load columns and metadata saved with save_columns. The columns are memory-mapped read-only.
+
+    Args:
+        path: Directory
+
+    Returns: Columns and metadata
+
+    """
+    meta = json.loads((path / SNAPSHOT_META).read_text())
+    columns = {
+        col: np.load(path / f"{col}.npy", mmap_mode="r") for col in meta["columns"]
+    }
+
+    return columns, meta
+
+
+class Segment:
+    """
+    Clinical data of one or more ingested batches (or of the initial data), sorted by variable and patient.
+
+    Args:
+        columns: Columns of the segment (see module documentation), sorted by variable name and patient codes
+        version: Version of the (most recent) data in the segment
+
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], version: int) -> None:
+        self.columns = columns
+        self.version = version
+
+        codes = columns["variable_name"]
+        n_codes = int(codes[-1]) + 1 if len(codes) > 0 else 0
+        self._bounds = np.searchsorted(codes, np.arange(n_codes + 1), side="left")
+
+    @classmethod
+    def sorted(cls, columns: Dict[str, np.ndarray], version: int) -> "Segment":
+        """
+        Create a segment from unsorted columns.
+
+        Args:
+            columns: Columns of the segment (see module documentation)
+            version: Version of the (most recent) data in the segment
+
+        Returns: Segment
+
+        """
+        # lexsort is stable, i.e. the original order of the values of a patient and variable is kept
+        order = np.lexsort((columns["pseudo_fallnr"], columns["variable_name"]))
+        return cls({col: arr[order] for col, arr in columns.items()}, version)
+
+    @classmethod
+    def merge(cls, segments: List["Segment"]) -> "Segment":
+        """
+        Merge segments into a single segment.
+
+        Args:
+            segments: Segments (in version order)
+
+        Returns: Segment with the version of the most recent segment
+
+        """
+        columns = {
+            col: np.concatenate([segment.columns[col] for segment in segments])
+            for col in segments[0].columns
+        }
+        return cls.sorted(columns, max(segment.version for segment in segments))
+
+    def __len__(self) -> int:
+        return len(self.columns["variable_name"])
+
+    def rows(
+        self, variable_code: int, patient_codes: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Get the positions of the rows of a variable (and optionally of some patients).
+
+        Args:
+            variable_code: Variable name code
+            patient_codes: Sorted patient identifier codes (all patients if None)
+
+        Returns: Row positions in the segment (ordered by patient)
+
+        """
+        if variable_code + 1 >= len(self._bounds):
+            return np.arange(0)
+
+        start = int(self._bounds[variable_code])
+        stop = int(self._bounds[variable_code + 1])
+        if patient_codes is None:
+            return np.arange(start, stop)
+
+        codes = self.columns["pseudo_fallnr"][start:stop]
+        lo = start + np.searchsorted(codes, patient_codes, side="left")
+        hi = start + np.searchsorted(codes, patient_codes, side="right")
+
+        # concatenated ranges lo[i]:hi[i]
+        lengths = hi - lo
+        ends = np.cumsum(lengths)
+        return np.arange(ends[-1] if len(ends) else 0) + np.repeat(
+            lo - ends + lengths, lengths
+        )
+
+    def patients(self, variable_code: int) -> np.ndarray:
+        """
+        Get the patients with values of a variable.
+
+        Args:
+            variable_code: Variable name code
+
+        Returns: Sorted patient identifier codes
+
+        """
+        return np.unique(self.columns["pseudo_fallnr"][self.rows(variable_code)])
+
+
+class PatientDataStore:
+    """
+    Compact clinical data store, partitioned by clinical variable and patient.
+
+    Stores are not modified once created: appending data (and loading data appended by other processes) creates a new
+    store that shares the existing segments, i.e. a store can be used while new data is appended.
+
+    Args:
+        segments: Segments of the store (in version order, the first segment holds the initial data)
+        categories: Categories of the categorical columns
+        tz: Timezones of the datetime columns
+        path: Snapshot directory the store was loaded from (appended segments are saved there), None if the store is
+            not saved
+
+    """
+
+    def __init__(
+        self,
+        segments: List[Segment],
+        categories: Dict[str, np.ndarray],
+        tz: Dict[str, Optional[str]],
+        path: Optional[Path] = None,
+    ) -> None:
+        self.segments = segments
+        self.categories = categories
+        self.tz = tz
+        self.path = path
+
+        self._codes: Dict[str, Dict[str, int]] = {
+            col: {c: i for i, c in enumerate(values)}
+            for col, values in categories.items()
+        }
+        self._offsets = np.cumsum([0] + [len(segment) for segment in segments])
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "PatientDataStore":
+        """
+        Build the store from clinical data.
+
+        Args:
+            df: Clinical data (columns variable_name, value, datetime, datetime_end, pseudo_fallnr)
+
+        Returns: Clinical data store
+
+        """
+        columns, categories, tz = {}, {}, {}
+
+        for col in ["variable_name", "pseudo_fallnr"]:
+            columns[col], categories[col] = encode_categorical(df[col])
+        for col in ["datetime", "datetime_end"]:
+            columns[col], tz[col] = encode_datetime(df[col])
+
+        values, categories["value_str"], tz["value_datetime"] = encode_values(
+            df["value"]
+        )
+        columns.update(values)
+
+        return cls([Segment.sorted(columns, 0)], categories, tz)
+
+    @classmethod
+    def load(cls, path: Path) -> "PatientDataStore":
+        """
+        Load the store (including the appended segments) from a snapshot directory. The columns are memory-mapped
+        read-only.
+
+        Args:
+            path: Snapshot directory
+
+        Returns: Clinical data store
+
+        """
+        columns, meta = load_columns(path)
+        categories = {
+            col: np.array(values, dtype=object)
+            for col, values in meta["categories"].items()
+        }
+        store = cls([Segment(columns, 0)], categories, meta["tz"], path)
+
+        return store.refresh()
+
+    def save(self, path: Path, source: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Save the initial data of the store as snapshot directory (without appended segments).
+
+        Args:
+            path: Snapshot directory (replaced if it exists, including its appended segments)
+            source: Description of the data the store was built from (see snapshot_source)
+
+        Returns: None
+
+        """
+        meta = {
+            "source": source,
+            "categories": {
+                col: values.tolist() for col, values in self.categories.items()
+            },
+            "tz": self.tz,
+        }
+        save_columns(path, self.segments[0].columns, meta)
+
+    @property
+    def version(self) -> int:
+        """
+        Get the version of the data in the store.
+
+        Returns: Version of the most recent segment (0 for the initial data)
+
+        """
+        return self.segments[-1].version
+
+    def _with_segment(
+        self, segment: Segment, new_categories: Dict[str, List[str]]
+    ) -> "PatientDataStore":
+        """
+        Create a store with an additional segment.
+
+        Args:
+            segment: Segment (with a version above the version of the store)
+            new_categories: Categories introduced by the segment (appended to the categories of the store)
+
+        Returns: Clinical data store
+
+        """
+        categories = {
+            col: np.concatenate(
+                [values, np.array(new_categories.get(col, []), dtype=object)]
+            )
+            for col, values in self.categories.items()
+        }
+
+        segments = self.segments + [segment]
+        if len(segments) - 1 > MAX_SEGMENTS:
+            segments = [segments[0], Segment.merge(segments[1:])]
+
+        return PatientDataStore(segments, categories, self.tz, self.path)
+
+    def refresh(self) -> "PatientDataStore":
+        """
+        Load the segments that were appended to the snapshot directory (by any process) since the store was loaded.
+
+        Returns: Clinical data store with all appended segments (the store itself if there are no new segments)
+
+        """
+        if self.path is None or not (self.path / SEGMENTS_DIR).is_dir():
+            return self
+
+        store = self
+        for name in sorted(os.listdir(self.path / SEGMENTS_DIR)):
+            if name.startswith(".") or int(name) <= store.version:
+                continue
+            columns, meta = load_columns(self.path / SEGMENTS_DIR / name)
+            store = store._with_segment(
+                Segment(columns, meta["version"]), meta["categories"]
+            )
+
+        return store
+
+    def _recode(
+        self,
+        col: str,
+        codes: np.ndarray,
+        categories: np.ndarray,
+        new_categories: Dict[str, List[str]],
+    ) -> np.ndarray:
+        """
+        Convert categorical codes of a batch to the categories of the store.
+
+        Args:
+            col: Column name
+            codes: Codes into the categories of the batch (-1 for missing values)
+            categories: Categories of the batch
+            new_categories: Categories not yet in the store (extended by the categories of the batch that are unknown)
+
+        Returns: Codes into the categories of the store
+
+        """
+        known = self._codes[col]
+        added = new_categories.setdefault(col, [])
+
+        mapping = np.empty(len(categories), dtype=np.int32)
+        for i, category in enumerate(categories):
+            code = known.get(category)
+            if code is None:
+                code = len(known) + len(added)
+                added.append(category)
+            mapping[i] = code
+
+        recoded = np.full(len(codes), -1, dtype=np.int32)
+        recoded[codes >= 0] = mapping[codes[codes >= 0]]
+
+        return recoded
+
+    def _encode(
+        self, df: pd.DataFrame, version: int
+    ) -> Tuple[Segment, Dict[str, List[str]]]:
+        """
+        Encode clinical data as segment of the store.
+
+        Args:
+            df: Clinical data (columns variable_name, value, datetime, datetime_end, pseudo_fallnr)
+            version: Version of the segment
+
+        Returns: Segment and the categories introduced by the segment
+
+        """
+        new_categories: Dict[str, List[str]] = {}
+        columns = {}
+
+        for col in ["variable_name", "pseudo_fallnr"]:
+            columns[col] = self._recode(
+                col, *encode_categorical(df[col]), new_categories
+            )
+        for col in ["datetime", "datetime_end"]:
+            columns[col] = encode_timestamps(df[col], self.tz[col])
+
+        values, str_categories, _ = encode_values(df["value"])
+        values["value_str"] = self._recode(
+            "value_str", values["value_str"], str_categories, new_categories
+        )
+        is_datetime = values["value_type"] == VALUE_TYPES.index("datetime")
+        values["value_datetime"][is_datetime] = encode_timestamps(
+            df["value"][is_datetime], self.tz["value_datetime"]
+        )
+        columns.update(values)
+
+        return Segment.sorted(columns, version), new_categories
+
+    def append(self, df: pd.DataFrame) -> "PatientDataStore":
+        """
+        Append clinical data to the store (as new segment with the next version).
+
+        For a store loaded from a snapshot directory, the segment is saved to the snapshot directory. Appending is
+        serialized between processes by a lock file, the segments appended by other processes are loaded first.
+
+        Args:
+            df: Clinical data (columns variable_name, value, datetime, datetime_end, pseudo_fallnr)
+
+        Returns: Clinical data store with the appended data
+
+        """
+        if self.path is None:
+            return self._with_segment(*self._encode(df, self.version + 1))
+
+        with open(self.path / SEGMENTS_LOCK, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+            store = self.refresh()
+            segment, new_categories = store._encode(df, store.version + 1)
+            save_columns(
+                self.path / SEGMENTS_DIR / f"{segment.version:010d}",
+                segment.columns,
+                {"version": segment.version, "categories": new_categories},
+            )
+
+            return store._with_segment(segment, new_categories)
+
+    def rows(
+        self, variable_names: Iterable[str], patient_ids: Optional[Iterable[str]] = None
+    ) -> np.ndarray:
+        """
+        Get the positions of the rows of some variables (and optionally of some patients).
+
+        Args:
+            variable_names: Clinical variable names (unknown variable names are ignored)
+            patient_ids: Patient identifiers (all patients if None, unknown patient identifiers are ignored)
+
+        Returns: Row positions in the store (ordered by variable name, then by segment and patient)
+
+        """
+        patient_codes = None
+        if patient_ids is not None:
+            known = self._codes["pseudo_fallnr"]
+            patient_codes = np.unique(
+                np.array([known[p] for p in patient_ids if p in known], dtype=np.int32)
+            )
+
+        variable_codes = self._codes["variable_name"]
+        blocks = [np.arange(0)]
+        for variable_name in sorted(set(variable_names) & variable_codes.keys()):
+            for offset, segment in zip(self._offsets, self.segments):
+                rows = segment.rows(variable_codes[variable_name], patient_codes)
+                blocks.append(offset + rows)
+
+        return np.concatenate(blocks)
+
+    def changed_patients(self, variable_names: Iterable[str], since: int) -> List[str]:
+        """
+        Get the patients with values of some variables that were appended after a version.
+
+        The result may include patients whose values were appended in earlier versions, if their segment was merged
+        with a segment of a later version (i.e. it is a superset of the changed patients).
+
+        Args:
+            variable_names: Clinical variable names (unknown variable names are ignored)
+            since: Version
+
+        Returns: Patient identifiers
+
+        """
+        variable_codes = self._codes["variable_name"]
+        codes = [np.arange(0)]
+        for segment in self.segments:
+            if segment.version <= since:
+                continue
+            for variable_name in set(variable_names) & variable_codes.keys():
+                codes.append(segment.patients(variable_codes[variable_name]))
+
+        patient_codes = np.unique(np.concatenate(codes)).astype(np.int64)
+        patient_codes = patient_codes[patient_codes >= 0]
+
+        return self.categories["pseudo_fallnr"][patient_codes].tolist()
+
+    def _take(self, col: str, rows: np.ndarray) -> np.ndarray:
+        """
+        Get a column of some rows.
+
+        Args:
+            col: Column name
+            rows: Row positions
+
+        Returns: Column values
+
+        """
+        if len(self.segments) == 1:
+            return self.segments[0].columns[col][rows]
+
+        index = np.searchsorted(self._offsets, rows, side="right") - 1
+        values = np.empty(len(rows), dtype=self.segments[0].columns[col].dtype)
+        for i, segment in enumerate(self.segments):
+            mask = index == i
+            if mask.any():
+                values[mask] = segment.columns[col][rows[mask] - self._offsets[i]]
+
+        return values
+
+    def _values(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Get the (mixed) values of some rows.
+
+        Args:
+            rows: Row positions
+
+        Returns: Values as Python objects
+
+        """
+        tags = self._take("value_type", rows)
+        values = np.empty(len(rows), dtype=object)
+
+        for code, tag in enumerate(VALUE_TYPES):
+            mask = tags == code
+            if not mask.any():
+                continue
+            column = self._take(f"value_{tag}", rows[mask])
+            if tag == "str":
+                values[mask] = decode_categorical(column, self.categories["value_str"])
+            elif tag == "datetime":
+                values[mask] = decode_datetime(
+                    column, self.tz["value_datetime"]
+                ).to_numpy(dtype=object)
+            else:
+                values[mask] = column.tolist()
+
+        return values
+
+    def frame(self, rows: np.ndarray) -> pd.DataFrame:
+        """
+        Get the clinical data of some rows as DataFrame.
+
+        Args:
+            rows: Row positions
+
+        Returns: Clinical data (columns variable_name, value, datetime, datetime_end, pseudo_fallnr)
+
+        """
+        return pd.DataFrame(
+            {
+                "variable_name": decode_categorical(
+                    self._take("variable_name", rows), self.categories["variable_name"]
+                ),
+                "value": self._values(rows),
+                "datetime": decode_datetime(
+                    self._take("datetime", rows), self.tz["datetime"]
+                ),
+                "datetime_end": decode_datetime(
+                    self._take("datetime_end", rows), self.tz["datetime_end"]
+                ),
+                "pseudo_fallnr": decode_categorical(
+                    self._take("pseudo_fallnr", rows), self.categories["pseudo_fallnr"]
+                ),
+            }
+        )
+
+    def _arrow_dictionary(self, col: str, rows: np.ndarray) -> pa.DictionaryArray:
+        """
+        Get a categorical column of some rows as Arrow dictionary array (with only the categories that occur).
+
+        Args:
+            col: Column name
+            rows: Row positions
+
+        Returns: Dictionary array (null for missing values)
+
+        """
+        store_codes = self._take(col, rows)
+        used, codes = np.unique(store_codes, return_inverse=True)
+        missing = used < 0
+        # -1 (missing) sorts first, the codes of the categories that occur are shifted accordingly
+        codes = codes.astype(np.int32) - int(missing.any())
+        return pa.DictionaryArray.from_arrays(
+            pa.array(codes, mask=store_codes < 0),
+            pa.array(self.categories[col][used[~missing]]),
+        )
+
+    def _arrow_datetime(self, col: str, rows: np.ndarray, mask: np.ndarray) -> pa.Array:
+        """
+        Get a datetime column of some rows as Arrow timestamp array.
+
+        Args:
+            col: Column name
+            rows: Row positions
+            mask: Rows without value
+
+        Returns: Timestamp array
+
+        """
+        return pa.array(self._take(col, rows), mask=mask).cast(
+            pa.timestamp("ns", tz=self.tz[col])
+        )
+
+    def table(self, rows: np.ndarray) -> pa.Table:
+        """
+        Get the clinical data of some rows in the Arrow transport format (see transport module).
+
+        Args:
+            rows: Row positions
+
+        Returns: Arrow table
+
+        """
+        tags = self._take("value_type", rows)
+
+        arrays = {
+            "variable_name": self._arrow_dictionary("variable_name", rows),
+            "value_type": pa.DictionaryArray.from_arrays(
+                pa.array(tags.astype(np.int32)), pa.array(VALUE_TYPES)
+            ),
+        }
+        for code, tag in enumerate(VALUE_TYPES):
+            col = f"value_{tag}"
+            mask = tags != code
+            if tag == "str":
+                arrays[col] = pa.array(self.categories[col], type=pa.string()).take(
+                    pa.array(self._take(col, rows), mask=mask)
+                )
+            elif tag == "datetime":
+                arrays[col] = self._arrow_datetime(col, rows, mask)
+            else:
+                arrays[col] = pa.array(
+                    self._take(col, rows), mask=mask, type=VALUE_ARROW_TYPES[tag]
+                )
+        for col in ["datetime", "datetime_end"]:
+            arrays[col] = self._arrow_datetime(col, rows, self._take(col, rows) == NAT)
+        arrays["pseudo_fallnr"] = self._arrow_dictionary("pseudo_fallnr", rows)
+
+        return pa.Table.from_arrays(list(arrays.values()), names=list(arrays.keys()))
+
+
+def snapshot_source(path: Path) -> Dict[str, Any]:
+    """
+    Describe a clinical data file, so that snapshots of outdated data can be detected.
+
+    Args:
+        path: Clinical data file
+
+    Returns: Name, size and modification time of the file
+
+    """
+    stat = path.stat()
+    return {"name": path.name, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def read_snapshot_source(path: Path) -> Optional[Dict[str, Any]]:
+    """
+    Get the description of the data a snapshot was built from.
+
+    Args:
+        path: Snapshot directory
+
+    Returns: Description of the data (see snapshot_source), None if there is no valid snapshot
+
+    """
+    try:
+        meta = json.loads((path / SNAPSHOT_META).read_text())
+    except (OSError, ValueError):
+        return None
+
+    if meta.get("format") != SNAPSHOT_FORMAT:
+        return None
+
+    return meta.get("source")
@@ -0,0 +1,159 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Columnar binary (Apache Arrow IPC) transport of clinical data.
+
+Clinical data is sent as an Arrow IPC stream instead of JSON if the client accepts the media type
+"application/vnd.apache.arrow.stream". The mixed "value" column is split into one typed column per value type
+("value_float", "value_int", "value_bool", "value_str", "value_datetime") and a "value_type" column that specifies which
+of the typed columns holds the value of a row, so that all dtypes (in particular datetimes) are kept intact.
+"""
+
+import datetime
+import io
+import json
+import numbers
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from fastapi.encoders import jsonable_encoder
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+VALUE_TYPES = ["float", "int", "bool", "str", "datetime"]
+VALUE_ARROW_TYPES = {
+    "float": pa.float64(),
+    "int": pa.int64(),
+    "bool": pa.bool_(),
+    "str": pa.string(),
+}
+
+
+def accepts_arrow(accept: Optional[str]) -> bool:
+    """
+    Determines whether a client accepts Arrow IPC stream responses.
+
+    Args:
+        accept: Accept header of the request
+
+    Returns: True if the Arrow IPC stream media type is accepted
+
+    """
+    if accept is None:
+        return False
+    return any(
+        media_range.split(";")[0].strip() == ARROW_MEDIA_TYPE
+        for media_range in accept.split(",")
+    )
+
+
+def value_type(t: type) -> str:
+    """
+    Get the value type name of a Python type.
+
+    Args:
+        t: Type of a value
+
+    Returns: Value type name (one of VALUE_TYPES), types without specific representation are treated as "str"
+
+    """
+    if issubclass(t, (bool, np.bool_)):
+        return "bool"
+    if issubclass(t, numbers.Integral):
+        return "int"
+    if issubclass(t, numbers.Real):
+        return "float"
+    if issubclass(t, (datetime.datetime, np.datetime64)):
+        return "datetime"
+    return "str"
+
+
+def to_arrow(table: pa.Table) -> bytes:
+    """
+    Serialize clinical data to an Arrow IPC stream.
+
+    Args:
+        table: Clinical data in Arrow transport format
+
+    Returns: Arrow IPC stream
+
+    """
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression="zstd")
+    with pa.ipc.new_stream(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+
+    return sink.getvalue().to_pybytes()
+
+
+def iter_arrow_stream(chunks: Iterable[pa.Table]) -> Iterator[bytes]:
+    """
+    Serialize clinical data to an Arrow IPC stream chunk by chunk.
+
+    Each chunk is sent as a separate record batch as soon as it is serialized, i.e. only one chunk needs to be held in
+    memory at a time. At least one chunk (which may be empty) must be given.
+
+    Args:
+        chunks: Clinical data in Arrow transport format in chunks of rows
+
+    Returns: Arrow IPC stream, one part at a time
+
+    """
+    sink = io.BytesIO()
+    options = pa.ipc.IpcWriteOptions(compression="zstd")
+    writer = None
+
+    def flush() -> bytes:
+        """
+        Take the bytes written to the sink so far.
+
+        Returns: Bytes written since the last flush
+
+        """
+        content = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return content
+
+    for table in chunks:
+        if writer is None:
+            writer = pa.ipc.new_stream(sink, table.schema, options=options)
+        writer.write_table(table)
+        yield flush()
+
+    if writer is not None:
+        writer.close()
+        yield flush()
+
+
+def iter_ndjson(chunks: Iterable[pd.DataFrame]) -> Iterator[bytes]:
+    """
+    Serialize clinical data to newline delimited JSON (one record per line) chunk by chunk.
+
+    Args:
+        chunks: Clinical data in chunks of rows
+
+    Returns: Newline delimited JSON, one chunk at a time
+
+    """
+    for chunk in chunks:
+        # encoded like the JSON (dict of lists) responses
+        records = jsonable_encoder(chunk.fillna("").to_dict(orient="records"))
+        if records:
+            yield "".join(json.dumps(record) + "\n" for record in records).encode()
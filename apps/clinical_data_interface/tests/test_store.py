@@ -0,0 +1,217 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+APP_PATH = Path(__file__).parents[1] / "app"
+ARROW = {"Accept": "application/vnd.apache.arrow.stream"}
+VARIABLES = ["sO2", "ward", "ventilated", "age"]
+
+
+@pytest.fixture
+def clinical_data():
+    t = pd.Timestamp("2021-03-01 12:00", tz="Europe/Berlin")
+    h = pd.Timedelta(hours=1)
+    return pd.DataFrame(
+        {
+            "variable_name": ["sO2", "ward", "sO2", "ventilated", "age", "sO2"],
+            "value": [91.5, "ICU", 88.0, True, 64, 90.0],
+            "datetime": [t, t, t + h, t, t, t + 2 * h],
+            "datetime_end": pd.Series([pd.NaT] * 6, dtype="datetime64[ns, UTC]"),
+            "pseudo_fallnr": ["P1", "P1", "P2", "P2", "P3", "P1"],
+        }
+    )
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.syspath_prepend(str(APP_PATH))
+    import store
+
+    return store
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, store, clinical_data):
+    monkeypatch.setenv("CEOSYS_BASE_PATH", str(tmp_path))
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+
+    import main
+
+    # chunks of two rows, to get more than one chunk in the streams
+    monkeypatch.setattr(main.settings, "stream_batch_size", 2)
+    monkeypatch.setitem(
+        main.data, "patients", store.PatientDataStore.from_frame(clinical_data)
+    )
+    return TestClient(main.app)
+
+
+def records(df):
+    """
+    Rows (patient, variable, value, datetime) of a frame in a comparable form.
+    """
+    return sorted(
+        zip(
+            df["pseudo_fallnr"],
+            df["variable_name"],
+            df["value"],
+            pd.to_datetime(df["datetime"], utc=True),
+        ),
+        key=lambda row: row[:2] + (row[3],),
+    )
+
+
+def decode_arrow(content):
+    table = pa.ipc.open_stream(content).read_all()
+    df = table.select(["pseudo_fallnr", "variable_name", "datetime"]).to_pandas()
+    value_type = table.column("value_type").to_pylist()
+    df["value"] = [
+        table.column(f"value_{tag}")[i].as_py() for i, tag in enumerate(value_type)
+    ]
+    return df.astype({"pseudo_fallnr": object, "variable_name": object})
+
+
+def decode_ndjson(content):
+    return pd.DataFrame([json.loads(line) for line in content.splitlines()])
+
+
+def test_endpoints_return_same_rows(client, clinical_data):
+    expected = records(clinical_data)
+
+    r = client.post("/patients/", json=VARIABLES)
+    assert records(pd.DataFrame(r.json())) == expected
+    r = client.post("/patients/", json=VARIABLES, headers=ARROW)
+    assert records(decode_arrow(r.content)) == expected
+
+    r = client.post("/patients/stream", json=VARIABLES)
+    assert records(decode_ndjson(r.content)) == expected
+    r = client.post("/patients/stream", json=VARIABLES, headers=ARROW)
+    assert records(decode_arrow(r.content)) == expected
+
+    expected = [row for row in expected if row[0] == "P1"]
+    r = client.post("/patient/P1", json=VARIABLES)
+    assert records(pd.DataFrame(r.json())) == expected
+    r = client.post("/patient/P1", json=VARIABLES, headers=ARROW)
+    assert records(decode_arrow(r.content)) == expected
+
+
+def test_ingest_changes(client):
+    assert client.get("/version").json() == {"version": 0}
+    r = client.post(
+        "/patients/changes", params={"since": 0}, json=VARIABLES, headers=ARROW
+    )
+    assert len(decode_arrow(r.content)) == 0
+
+    observations = [
+        {
+            "pseudo_fallnr": "P2",
+            "variable_name": "sO2",
+            "datetime": "2021-03-02T12:00:00+01:00",
+            "value": 93.0,
+        },
+        {
+            "pseudo_fallnr": "P4",
+            "variable_name": "ward",
+            "datetime": "2021-03-02T12:00:00+01:00",
+            "value": "ICU",
+        },
+    ]
+    assert client.post("/ingest", json=observations).json() == {
+        "version": 1,
+        "ingested": 2,
+    }
+    assert client.get("/version").json() == {"version": 1}
+
+    # all values of the changed patients
+    r = client.post("/patients/changes", params={"since": 0}, json=VARIABLES)
+    changed = pd.DataFrame(r.json())
+    assert sorted(changed["pseudo_fallnr"].unique()) == ["P2", "P4"]
+    assert sorted(changed.loc[changed["pseudo_fallnr"] == "P2", "variable_name"]) == [
+        "sO2",
+        "sO2",
+        "ventilated",
+    ]
+    r = client.post(
+        "/patients/changes", params={"since": 0}, json=VARIABLES, headers=ARROW
+    )
+    assert records(decode_arrow(r.content)) == records(changed)
+
+    r = client.post("/patients/changes", params={"since": 1}, json=VARIABLES)
+    assert len(pd.DataFrame(r.json())) == 0
+    r = client.post("/patients/changes", params={"since": 2}, json=VARIABLES)
+    assert r.status_code == 409
+
+
+def test_missing_categories(store, clinical_data):
+    clinical_data.loc[0, "pseudo_fallnr"] = None
+    patient_data = store.PatientDataStore.from_frame(clinical_data)
+    rows = patient_data.rows(["sO2"])
+
+    df = patient_data.frame(rows)
+    assert df["pseudo_fallnr"].isna().sum() == 1
+    assert sorted(df["pseudo_fallnr"].dropna()) == ["P1", "P2"]
+
+    table = patient_data.table(rows)
+    assert table.column("pseudo_fallnr").null_count == 1
+    assert sorted(table.column("pseudo_fallnr").drop_null().to_pylist()) == [
+        "P1",
+        "P2",
+    ]
+    assert np.array_equal(
+        pd.isna(table.column("pseudo_fallnr").to_pandas()), df["pseudo_fallnr"].isna()
+    )
+
+
+def test_ingest_value_types(client):
+    observations = [
+        {
+            "pseudo_fallnr": "P4",
+            "variable_name": variable,
+            "datetime": "2021-03-02T12:00:00+01:00",
+            "value": value,
+        }
+        for variable, value in [
+            ("ward", "5"),
+            ("age", 5),
+            ("sO2", 5.5),
+            ("ventilated", True),
+            ("admission", "2021-03-01T08:00:00Z"),
+        ]
+    ]
+    client.post("/ingest", json=observations)
+
+    for headers, decode in [
+        ({}, lambda content: pd.DataFrame(json.loads(content))),
+        (ARROW, decode_arrow),
+    ]:
+        r = client.post("/patient/P4", json=VARIABLES + ["admission"], headers=headers)
+        values = decode(r.content).set_index("variable_name")["value"]
+        assert values["ward"] == "5"
+        assert values["age"] == 5 and not isinstance(values["age"], bool)
+        assert values["sO2"] == 5.5
+        assert values["ventilated"] is True
+        assert pd.to_datetime(values["admission"], utc=True) == pd.Timestamp(
+            "2021-03-01T08:00:00Z"
+        )
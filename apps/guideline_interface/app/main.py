@@ -18,16 +18,40 @@
 Guideline Interface - FastAPI interface
 """
 
+import asyncio
+import base64
+import hashlib
 import os
 import re
-from typing import List, Dict, Union
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    List,
+    Dict,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
 
-import requests
 from pathlib import Path
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 import json
-from fhir.resources.bundle import Bundle
+import httpx
 from pydantic import BaseSettings
+from http_client import ServiceClients
+
+try:
+    from watchfiles import awatch
+except ImportError:  # changes of the FHIR directory are detected by polling
+    awatch = None
 
 
 class Settings(BaseSettings):
@@ -40,6 +64,15 @@ class Settings(BaseSettings):
     magicapp_email: str
     magicapp_password: str
     magicapp_server: str
+    request_timeout: float = 30
+    request_retries: int = 3
+    recommendation_cache_size: int = 128
+    recommendation_cache_ttl: float = 300
+    magicapp_token_ttl: float = 3600
+    batch_concurrency: int = 16
+    recommendation_prefetch: bool = True
+    recommendation_refresh_interval: float = 240
+    fhir_poll_interval: float = 5
 
     class Config:
         """
@@ -49,8 +82,26 @@ class Settings(BaseSettings):
         env_file = ".env"
 
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
 app = FastAPI()
+app.add_middleware(GZipMiddleware, minimum_size=1000)
 settings = Settings()
+clients = ServiceClients(
+    timeout=settings.request_timeout, retries=settings.request_retries
+)
+
+
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    """
+    Stop the background refresh of the guideline recommendations and close the connections of the HTTP clients.
+
+    Returns: None
+
+    """
+    await refresher.stop()
+    await clients.aclose()
 
 
 class GuidelineException(Exception):
@@ -77,69 +128,432 @@ class GuidelineServerLoginException(GuidelineException):
     pass
 
 
-def get_file_list(path: Union[str, Path], pattern: str) -> List[str]:
+class CachedRecommendation(NamedTuple):
     """
-    Returns all files in a paths that match a pattern.
+    Cached guideline recommendation
+    """
+
+    body: bytes
+    etag: str
+    expires: float
+
+
+def content_etag(body: bytes) -> str:
+    """
+    Get the strong entity tag of a response body (hash of the content).
 
     Args:
-        path: Search path
-        pattern: File name pattern
+        body: Response body
 
-    Returns: List of all files that match the pattern.
+    Returns: Entity tag (quoted)
 
     """
-    res = [os.path.join(path, f) for f in os.listdir(path) if re.search(pattern, f)]
-    return res
+    return '"' + hashlib.sha256(body).hexdigest() + '"'
 
 
-def get_guideline_recommendation_from_magicapp(recommendation_id: int) -> Dict:
+def etag_matches(if_none_match: str, etag: str) -> bool:
     """
-    Retrieve a guideline recommendation from MAGICapp server (https://app.magicapp.org/) by its identifier.
+    Check whether an If-None-Match header matches an entity tag (weak comparison, see RFC 7232).
+
+    Args:
+        if_none_match: Value of the If-None-Match header (list of entity tags or "*")
+        etag: Entity tag of the current guideline recommendation
+
+    Returns: True if the client has the current guideline recommendation
+
+    """
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in [
+        tag[2:] if tag.startswith("W/") else tag for tag in tags
+    ]
 
-    For the time being, guideline recommendations are saved in the "rational" field of the MAGICapp interface, as
-    currently no specific field for machine-readable versions of the guidelines exists in MAGICapp.
+
+class RecommendationCache:
+    """
+    In-memory cache of the guideline recommendations (rendered as JSON).
+
+    Guideline recommendations are cached for a limited time (after which they are fetched again from the MAGICapp
+    server or local storage). If more guideline recommendations are cached than allowed, the least recently used ones
+    are evicted first.
 
     Args:
-        recommendation_id: Guideline recommendation identifier
+        maxsize: Maximal number of cached guideline recommendations
+        ttl: Time in seconds a guideline recommendation is cached
+    """
 
-    Returns: Guideline recommendation in FHIR format
+    def __init__(self, maxsize: int = 128, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, CachedRecommendation]" = OrderedDict()
+
+    def get(self, recommendation_id: int) -> Optional[CachedRecommendation]:
+        """
+        Get a guideline recommendation from the cache.
+
+        Args:
+            recommendation_id: Guideline recommendation identifier
+
+        Returns: Cached guideline recommendation, None if it is not cached or expired
+
+        """
+        entry = self._entries.get(recommendation_id)
+        if entry is None:
+            return None
+        if entry.expires <= time.monotonic():
+            del self._entries[recommendation_id]
+            return None
+        self._entries.move_to_end(recommendation_id)
+
+        return entry
+
+    def put(self, recommendation_id: int, guideline: Dict) -> CachedRecommendation:
+        """
+        Add a guideline recommendation to the cache.
+
+        Args:
+            recommendation_id: Guideline recommendation identifier
+            guideline: Guideline recommendation in FHIR format
+
+        Returns: Cached guideline recommendation
+
+        """
+        body = JSONResponse(guideline).body
+        entry = CachedRecommendation(
+            body, content_etag(body), time.monotonic() + self.ttl
+        )
+        self._entries[recommendation_id] = entry
+        self._entries.move_to_end(recommendation_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+        return entry
+
+    def remove(self, recommendation_id: int) -> None:
+        """
+        Remove a guideline recommendation from the cache.
+
+        Args:
+            recommendation_id: Guideline recommendation identifier
+
+        Returns: None
+
+        """
+        self._entries.pop(recommendation_id, None)
+
+    def clear(self) -> None:
+        """
+        Remove all guideline recommendations from the cache.
+
+        Returns: None
+
+        """
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        """
+        Get number of cached guideline recommendations.
+
+        Returns: number of cached guideline recommendations
+
+        """
+        return len(self._entries)
+
+
+recommendation_cache = RecommendationCache(
+    settings.recommendation_cache_size, settings.recommendation_cache_ttl
+)
+
+
+def token_expiry(token: str) -> Optional[float]:
+    """
+    Get the expiry time of a JSON Web Token (without verifying the token).
 
+    Args:
+        token: Bearer token
+
+    Returns: Expiry time (UNIX timestamp), None if the token is not a JSON Web Token with an expiry time
+
+    """
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(
+            base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4))
+        )
+        return float(claims["exp"])
+    except (IndexError, ValueError, TypeError, KeyError):
+        return None
+
+
+class MagicappTokenManager:
+    """
+    Login token for the MAGICapp server, shared between all requests.
+
+    The token is cached and only renewed if it expired (expiry time of the token if it is a JSON Web Token, otherwise
+    after "ttl" seconds) or was rejected by the server. Logins are serialized by a lock, i.e. concurrent requests that
+    need a new token wait for a single login.
+
+    Args:
+        ttl: Time in seconds a token is used if it does not specify its expiry time
+        margin: Time in seconds before its expiry time after which a token is renewed
     """
 
-    def get_login_token() -> Dict:
+    def __init__(self, ttl: float = 3600, margin: float = 30):
+        self.ttl = ttl
+        self.margin = margin
+        self._token: Optional[str] = None
+        self._expires = 0.0
+        self._lock = asyncio.Lock()
+
+    def _valid(self) -> bool:
+        return self._token is not None and time.time() < self._expires
+
+    async def get(self) -> str:
         """
-        Get login token for MAGICapp server.
+        Get the current token, logging in if there is no valid token.
 
-        Returns: Authorization header to be used in requests.
+        Returns: Bearer token
 
         """
+        if not self._valid():
+            async with self._lock:
+                if not self._valid():
+                    await self._login()
+
+        return self._token  # type: ignore
+
+    async def refresh(self, rejected: str) -> str:
+        """
+        Renew a token that was rejected by the server (unless it was already renewed by a concurrent request).
+
+        Args:
+            rejected: Token that was rejected
+
+        Returns: Bearer token
+
+        """
+        async with self._lock:
+            if self._token == rejected or not self._valid():
+                await self._login()
+
+        return self._token  # type: ignore
+
+    async def _login(self) -> None:
         auth = {
             "email": settings.magicapp_email,
             "password": settings.magicapp_password,
         }
         url = settings.magicapp_server + "/auth/login"
-        r = requests.post(url, data=auth)
+        r = await clients.async_client.post(url, data=auth)
 
         if r.status_code != 200:
             msg = "Could not login"
             if "error" in r.json():
                 msg += f' ({r.json()["error"]})'
-            GuidelineServerLoginException(msg)
+            raise GuidelineServerLoginException(msg)
 
         token = r.json()["token"]
-        headers = {"Authorization": f"Bearer {token}"}
+        expires = token_expiry(token)
+        if expires is None:
+            expires = time.time() + self.ttl
+
+        self._token = token
+        self._expires = expires - self.margin
+
+    def clear(self) -> None:
+        """
+        Discard the current token.
+
+        Returns: None
+
+        """
+        self._token = None
+        self._expires = 0.0
+
+
+def bearer(token: str) -> Dict:
+    """
+    Get the authorization header for a bearer token.
+
+    Args:
+        token: Bearer token
+
+    Returns: Authorization header to be used in requests.
+
+    """
+    return {"Authorization": f"Bearer {token}"}
+
+
+magicapp_tokens = MagicappTokenManager(settings.magicapp_token_ttl)
+
+
+def get_file_list(path: Union[str, Path], pattern: str) -> List[str]:
+    """
+    Returns all files in a paths that match a pattern.
+
+    Args:
+        path: Search path
+        pattern: File name pattern
+
+    Returns: List of all files that match the pattern.
+
+    """
+    res = [os.path.join(path, f) for f in os.listdir(path) if re.search(pattern, f)]
+    return res
+
+
+RECOMMENDATION_FILE_PATTERN = r"Recommendation_MA(\d+)\.fhir\.json$"
+
+
+class RecommendationIndex:
+    """
+    In-memory listing of the guideline recommendations in local storage (identifier, title and text).
+
+    The index is built on first use and then only updated for files that were added, changed (by modification time and
+    size) or removed since the last listing. Only the first entry of each bundle is read (from the raw JSON, the
+    bundles are not validated). Files that cannot be read are left out of the index. Updates read files with blocking
+    calls, they are run in a worker thread when called from the event loop (and serialized by a lock).
+
+    Args:
+        path: Directory with the guideline recommendations (FHIR bundles)
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._entries: Dict[str, Tuple[Tuple[int, int], Dict]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def read_entry(fname: str, recommendation_id: str) -> Dict:
+        """
+        Read the listing entry of a guideline recommendation.
+
+        Args:
+            fname: File name of the guideline recommendation
+            recommendation_id: Guideline recommendation identifier
+
+        Returns: Identifier, title and text of the guideline recommendation
+
+        """
+        with open(fname) as f:
+            resource = json.load(f)["entry"][0]["resource"]
+
+        return {
+            "id": recommendation_id,
+            "title": resource.get("title"),
+            "text": resource["text"]["div"],
+        }
+
+    def update(self) -> None:
+        """
+        Update the index for files that were added, changed or removed.
+
+        Returns: None
+
+        """
+        with self._lock:
+            entries = {}
+
+            for fname in get_file_list(self.path, RECOMMENDATION_FILE_PATTERN):
+                try:
+                    st = os.stat(fname)
+                except FileNotFoundError:
+                    continue
+                version = (st.st_mtime_ns, st.st_size)
+
+                cached = self._entries.get(fname)
+                if cached is None or cached[0] != version:
+                    id = re.search(RECOMMENDATION_FILE_PATTERN, fname).group(1)  # type: ignore
+                    try:
+                        cached = (version, self.read_entry(fname, id))
+                    except (OSError, ValueError, LookupError, TypeError) as e:
+                        # e.g. a file that is still being written, read again on the next update
+                        print(
+                            f"Could not read guideline recommendation {fname} ({str(e)})"
+                        )
+                        continue
+                entries[fname] = cached
+
+            self._entries = entries
+
+    def list(self) -> List[Dict]:
+        """
+        List the guideline recommendations, updating the index for changed files.
+
+        Returns: Identifier, title and text of the available guideline recommendations
+
+        """
+        self.update()
+
+        return [entry for _, entry in self._entries.values()]
+
+    def versions(self) -> Dict[str, Tuple[int, int]]:
+        """
+        Get the versions of the indexed files (as of the last update).
+
+        Returns: Modification time and size of the file by guideline recommendation identifier
+
+        """
+        return {entry["id"]: version for version, entry in self._entries.values()}
 
-        return headers
+    def __len__(self) -> int:
+        """
+        Get number of indexed guideline recommendations.
+
+        Returns: number of indexed guideline recommendations
+
+        """
+        return len(self._entries)
+
+
+recommendation_index = RecommendationIndex(Path(settings.ceosys_base_path) / "FHIR")
+
+
+async def get_guideline_recommendation_from_magicapp(recommendation_id: int) -> Dict:
+    """
+    Retrieve a guideline recommendation from MAGICapp server (https://app.magicapp.org/) by its identifier.
+
+    For the time being, guideline recommendations are saved in the "rational" field of the MAGICapp interface, as
+    currently no specific field for machine-readable versions of the guidelines exists in MAGICapp. The login token is
+    shared between requests (see MagicappTokenManager).
+
+    Args:
+        recommendation_id: Guideline recommendation identifier
+
+    Returns: Guideline recommendation in FHIR format
 
-    auth_header = get_login_token()
-    r = requests.get(
+    Raises:
+        RecommendationNotFoundException: If the server can not be reached, does not return the guideline
+            recommendation or returns an unexpected response
+
+    """
+    url = (
         settings.magicapp_server
-        + f"/api/v1/recommendations/{recommendation_id}/rational",
-        headers=auth_header,
-    )
-    m = re.match(
-        r"recommendations-ceosys-api:[^\{]+({.*})", r.json()["text"], re.MULTILINE
+        + f"/api/v1/recommendations/{recommendation_id}/rational"
     )
+    try:
+        token = await magicapp_tokens.get()
+        r = await clients.async_client.get(url, headers=bearer(token))
+        if r.status_code == 401:
+            token = await magicapp_tokens.refresh(token)
+            r = await clients.async_client.get(url, headers=bearer(token))
+    except httpx.HTTPError as e:
+        raise RecommendationNotFoundException(
+            f"Could not retrieve guideline recommendation ({e!r})"
+        ) from e
+
+    if r.status_code != 200:
+        raise RecommendationNotFoundException(
+            f"Could not retrieve guideline recommendation (status {r.status_code})"
+        )
+
+    try:
+        text = r.json()["text"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise RecommendationNotFoundException(
+            "Unexpected response of the guideline server"
+        ) from e
+
+    m = re.match(r"recommendations-ceosys-api:[^\{]+({.*})", str(text), re.MULTILINE)
 
     if not m:
         raise RecommendationNotFoundException(
@@ -181,7 +595,7 @@ def get_guideline_recommendation_from_file(recommendation_id: int) -> Dict:
     return guideline
 
 
-def get_guideline_recommendation(recommendation_id: int) -> Dict:
+async def get_guideline_recommendation(recommendation_id: int) -> Dict:
     """
     Retrieve a guideline recommendation by its identifier.
 
@@ -198,7 +612,9 @@ def get_guideline_recommendation(recommendation_id: int) -> Dict:
             print(
                 f"Reading guideline recommendation {recommendation_id} from MAGICapp server"
             )
-            guideline = get_guideline_recommendation_from_magicapp(recommendation_id)
+            guideline = await get_guideline_recommendation_from_magicapp(
+                recommendation_id
+            )
             print("Read guideline from server")
             return guideline
         except GuidelineException as e:
@@ -213,7 +629,9 @@ def get_guideline_recommendation(recommendation_id: int) -> Dict:
         )
 
     try:
-        return get_guideline_recommendation_from_file(recommendation_id)
+        return await asyncio.to_thread(
+            get_guideline_recommendation_from_file, recommendation_id
+        )
     except GuidelineException as e:
         print(
             f"Guideline recommendation {recommendation_id} not found locally ({str(e)}"
@@ -222,6 +640,230 @@ def get_guideline_recommendation(recommendation_id: int) -> Dict:
     raise RecommendationNotFoundException()
 
 
+async def get_cached_recommendation(
+    recommendation_id: int, reload: bool = False
+) -> CachedRecommendation:
+    """
+    Get a guideline recommendation from the recommendation cache, retrieving it if it is not cached.
+
+    Args:
+        recommendation_id: Guideline recommendation identifier
+        reload: Retrieve the guideline recommendation even if it is cached
+
+    Returns: Cached guideline recommendation
+
+    Raises:
+        GuidelineException: If the guideline recommendation was not found
+
+    """
+    entry = None if reload else recommendation_cache.get(recommendation_id)
+
+    if entry is None:
+        guideline = await get_guideline_recommendation(recommendation_id)
+        entry = recommendation_cache.put(recommendation_id, guideline)
+
+    return entry
+
+
+async def fetch_recommendations(
+    recommendation_ids: List[int], reload: bool = False
+) -> AsyncIterator[Tuple[int, CachedRecommendation]]:
+    """
+    Retrieve guideline recommendations concurrently (up to BATCH_CONCURRENCY at the same time).
+
+    Args:
+        recommendation_ids: Guideline recommendation identifiers
+        reload: Retrieve the guideline recommendations even if they are cached
+
+    Returns: Guideline recommendations (with their identifier) in the order they were retrieved, guideline
+        recommendations that were not found are skipped
+
+    """
+    semaphore = asyncio.Semaphore(settings.batch_concurrency)
+
+    async def fetch(
+        recommendation_id: int,
+    ) -> Tuple[int, Optional[CachedRecommendation]]:
+        async with semaphore:
+            try:
+                return recommendation_id, await get_cached_recommendation(
+                    recommendation_id, reload
+                )
+            except GuidelineException:
+                return recommendation_id, None
+
+    for future in asyncio.as_completed(
+        [
+            fetch(recommendation_id)
+            for recommendation_id in dict.fromkeys(recommendation_ids)
+        ]
+    ):
+        recommendation_id, entry = await future
+        if entry is not None:
+            yield recommendation_id, entry
+
+
+class RecommendationRefresher:
+    """
+    Keeps the recommendation cache up to date in the background.
+
+    All guideline recommendations are loaded into the recommendation cache at startup. Afterwards, guideline
+    recommendations whose file was added, changed or removed are reloaded as soon as the change is detected (with
+    inotify if the watchfiles package is installed, otherwise by polling the FHIR directory every FHIR_POLL_INTERVAL
+    seconds) and all guideline recommendations are reloaded (e.g. from the MAGICapp server) every
+    RECOMMENDATION_REFRESH_INTERVAL seconds, which should be shorter than RECOMMENDATION_CACHE_TTL. The version is
+    increased whenever a guideline recommendation was added, changed or removed.
+
+    Args:
+        refresh_interval: Time in seconds between reloads of all guideline recommendations
+        poll_interval: Time in seconds between checks of the FHIR directory (if changes are detected by polling)
+    """
+
+    def __init__(self, refresh_interval: float = 240, poll_interval: float = 5):
+        self.refresh_interval = refresh_interval
+        self.poll_interval = poll_interval
+        self.version = 0
+        self._files: Dict[str, Tuple[int, int]] = {}
+        self._etags: Dict[int, str] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def reload(self, recommendation_ids: Iterable[int]) -> None:
+        """
+        Reload guideline recommendations into the recommendation cache.
+
+        Args:
+            recommendation_ids: Guideline recommendation identifiers
+
+        Returns: None
+
+        """
+        recommendation_ids = list(recommendation_ids)
+        etags = {
+            recommendation_id: entry.etag
+            async for recommendation_id, entry in fetch_recommendations(
+                recommendation_ids, reload=True
+            )
+        }
+
+        changed = False
+        for recommendation_id in recommendation_ids:
+            etag = etags.get(recommendation_id)
+            if etag is None:
+                recommendation_cache.remove(recommendation_id)
+            if self._etags.get(recommendation_id) != etag:
+                changed = True
+                if etag is None:
+                    self._etags.pop(recommendation_id, None)
+                else:
+                    self._etags[recommendation_id] = etag
+
+        if changed:
+            self.version += 1
+
+    async def check_files(self) -> None:
+        """
+        Reload the guideline recommendations whose file was added, changed or removed.
+
+        Returns: None
+
+        """
+        async with self._lock:
+            await asyncio.to_thread(recommendation_index.update)
+            files = recommendation_index.versions()
+            modified = {
+                int(recommendation_id)
+                for recommendation_id in set(files) | set(self._files)
+                if files.get(recommendation_id) != self._files.get(recommendation_id)
+            }
+            self._files = files
+
+            if modified:
+                await self.reload(modified)
+
+    async def refresh(self) -> None:
+        """
+        Reload all guideline recommendations.
+
+        Returns: None
+
+        """
+        async with self._lock:
+            await asyncio.to_thread(recommendation_index.update)
+            self._files = recommendation_index.versions()
+
+            await self.reload(set(map(int, self._files)) | set(self._etags))
+
+    async def _watch(self) -> None:
+        if awatch is not None:
+            async for _ in awatch(recommendation_index.path):
+                await self._run_step(self.check_files)
+        else:
+            while True:
+                await asyncio.sleep(self.poll_interval)
+                await self._run_step(self.check_files)
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self._run_step(self.refresh)
+
+    async def _run(self) -> None:
+        await self._run_step(self.refresh)
+        await asyncio.gather(self._watch(), self._poll())
+
+    @staticmethod
+    async def _run_step(step: Callable[[], Awaitable[None]]) -> None:
+        try:
+            await step()
+        except (
+            Exception
+        ) as e:  # keep refreshing after failures (e.g. a partially written file)
+            print(f"Refreshing guideline recommendations failed ({str(e)})")
+
+    def start(self) -> None:
+        """
+        Start the background refresh.
+
+        Returns: None
+
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stop the background refresh.
+
+        Returns: None
+
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+refresher = RecommendationRefresher(
+    settings.recommendation_refresh_interval, settings.fhir_poll_interval
+)
+
+
+@app.on_event("startup")
+async def start_refresher() -> None:
+    """
+    Start the background refresh of the guideline recommendations (if RECOMMENDATION_PREFETCH is set).
+
+    Returns: None
+
+    """
+    if settings.recommendation_prefetch:
+        refresher.start()
+
+
 @app.get("/")
 async def root() -> Dict:
     """
@@ -238,40 +880,99 @@ async def list_guidelines() -> List[Dict]:
     """
     Get a list of available guideline recommendations.
 
+    The list is served from the recommendation index, which only reads files that changed since the last call (in a
+    worker thread, to not block the event loop).
+
     Returns: List of available guideline recommendations
 
     """
-    pattern = r"Recommendation_MA(\d+)\.fhir\.json$"
-
-    guidelines = []
-
-    for fname in get_file_list(Path(settings.ceosys_base_path) / "FHIR", pattern):
-        id = re.search(pattern, fname).group(1)  # type: ignore
-        bundle = Bundle.parse_file(fname)
-        title = bundle.entry[0].resource.title
-        text = bundle.entry[0].resource.text.div
-
-        guidelines.append({"id": id, "title": title, "text": text})
+    return await asyncio.to_thread(recommendation_index.list)
 
-    return guidelines
 
-
-@app.get("/recommendation/get/{recommendation_id}")
-async def read_guideline(recommendation_id: int) -> Dict:
+@app.get("/recommendation/get/{recommendation_id}", response_model=None)
+async def read_guideline(
+    recommendation_id: int, if_none_match: Optional[str] = Header(None)
+) -> Response:
     """
     Get a specific guideline recommendation
 
+    Guideline recommendations are served from the recommendation cache. The response carries an ETag (hash of the
+    content), clients that send it in If-None-Match get an empty 304 response if the guideline recommendation is
+    unchanged.
+
     Args:
         recommendation_id: Guideline recommendation identifier
+        if_none_match: Entity tags of the guideline recommendation known to the client
 
     Returns: Guideline recommendation in FHIR format
 
     """
     try:
-        guideline = get_guideline_recommendation(recommendation_id)
+        entry = await get_cached_recommendation(recommendation_id)
     except GuidelineException as e:
         raise HTTPException(
             status_code=404, detail=f"Guideline recommendation not found ({str(e)}"
         )
 
-    return guideline
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if if_none_match is not None and etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+@app.post("/recommendation/batch", response_model=None)
+async def read_guidelines(
+    recommendation_ids: List[int], accept: Optional[str] = Header(None)
+) -> Response:
+    """
+    Get several guideline recommendations at once.
+
+    The guideline recommendations are retrieved concurrently. By default, they are returned as a single JSON object
+    (by guideline recommendation identifier, in the requested order). If newline delimited JSON is requested by the
+    Accept header, each guideline recommendation is sent as soon as it was retrieved as a line
+    {"id": ..., "recommendation": ...}. Guideline recommendations that were not found are omitted.
+
+    Args:
+        recommendation_ids: Guideline recommendation identifiers
+        accept: Accept header
+
+    Returns: Guideline recommendations in FHIR format
+
+    """
+    if accept is not None and NDJSON_MEDIA_TYPE in accept:
+
+        async def lines() -> AsyncIterator[bytes]:
+            async for recommendation_id, entry in fetch_recommendations(
+                recommendation_ids
+            ):
+                yield b'{"id":%d,"recommendation":%s}\n' % (
+                    recommendation_id,
+                    entry.body,
+                )
+
+        return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
+    entries = {
+        recommendation_id: entry
+        async for recommendation_id, entry in fetch_recommendations(recommendation_ids)
+    }
+    body = b",".join(
+        b'"%d":%s' % (recommendation_id, entries[recommendation_id].body)
+        for recommendation_id in dict.fromkeys(recommendation_ids)
+        if recommendation_id in entries
+    )
+
+    return Response(content=b"{" + body + b"}", media_type="application/json")
+
+
+@app.get("/recommendation/version")
+async def get_version() -> Dict:
+    """
+    Get the version of the guideline recommendations (increases whenever a guideline recommendation was added, changed
+    or removed, see RecommendationRefresher).
+
+    Returns: Version
+
+    """
+    return {"version": refresher.version}
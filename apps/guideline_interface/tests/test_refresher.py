@@ -0,0 +1,114 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+
+import asyncio
+import json
+import threading
+from pathlib import Path
+
+import pytest
+
+APP_PATH = Path(__file__).parents[1] / "app"
+
+
+@pytest.fixture
+def main(tmp_path, monkeypatch):
+    for name, value in [
+        ("CEOSYS_BASE_PATH", str(tmp_path)),
+        ("MAGICAPP_USE", "0"),
+        ("MAGICAPP_EMAIL", "user@example.org"),
+        ("MAGICAPP_PASSWORD", "password"),
+        ("MAGICAPP_SERVER", "http://magicapp"),
+    ]:
+        monkeypatch.setenv(name, value)
+    monkeypatch.syspath_prepend(str(APP_PATH))
+    pytest.importorskip("fastapi")
+
+    import main
+
+    (tmp_path / "FHIR").mkdir()
+    monkeypatch.setattr(main.settings, "ceosys_base_path", str(tmp_path))
+    monkeypatch.setattr(
+        main, "recommendation_index", main.RecommendationIndex(tmp_path / "FHIR")
+    )
+    main.recommendation_cache.clear()
+    return main
+
+
+def write_recommendation(path, recommendation_id, title):
+    bundle = {
+        "resourceType": "Bundle",
+        "entry": [{"resource": {"title": title, "text": {"div": f"<p>{title}</p>"}}}],
+    }
+    with open(
+        path / "FHIR" / f"Recommendation_MA{recommendation_id}.fhir.json", "w"
+    ) as f:
+        json.dump(bundle, f)
+
+
+def cached_title(main, recommendation_id):
+    entry = main.recommendation_cache.get(recommendation_id)
+    if entry is None:
+        return None
+    return json.loads(entry.body)["entry"][0]["resource"]["title"]
+
+
+def test_check_files(main, tmp_path):
+    write_recommendation(tmp_path, 1, "first")
+    write_recommendation(tmp_path, 2, "second")
+    refresher = main.RecommendationRefresher(240, 5)
+
+    async def check():
+        await refresher.refresh()
+        assert cached_title(main, 1) == "first"
+        assert cached_title(main, 2) == "second"
+        version = refresher.version
+
+        await refresher.check_files()
+        assert refresher.version == version
+
+        write_recommendation(tmp_path, 1, "first (changed)")
+        (tmp_path / "FHIR" / "Recommendation_MA2.fhir.json").unlink()
+        await refresher.check_files()
+        assert cached_title(main, 1) == "first (changed)"
+        assert cached_title(main, 2) is None
+        assert refresher.version == version + 1
+
+    asyncio.run(check())
+    assert [entry["title"] for entry in main.recommendation_index.list()] == [
+        "first (changed)"
+    ]
+
+
+def test_index_update_in_worker_thread(main, tmp_path, monkeypatch):
+    write_recommendation(tmp_path, 1, "first")
+    threads = []
+    update = main.recommendation_index.update
+
+    def record_update():
+        threads.append(threading.current_thread())
+        update()
+
+    monkeypatch.setattr(main.recommendation_index, "update", record_update)
+
+    async def check():
+        await main.RecommendationRefresher(240, 5).check_files()
+        return await main.list_guidelines()
+
+    assert [entry["title"] for entry in asyncio.run(check())] == ["first"]
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
@@ -0,0 +1,164 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+"""
+In-process cache of the results of the guideline recommendation adherence evaluation.
+
+Results that were read from the result datasets (DataFrames) or rendered from them (JSON responses) are kept in memory
+together with the version (inode, modification time and size) of the result files they were built from. An entry is
+only served as long as the files have the same version, i.e. the cache is invalidated automatically when the adherence
+evaluator writes new results (which replaces the files). The memory of the cached entries is bounded, least recently
+used entries are evicted first.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Tuple
+
+import pandas as pd
+
+Version = Tuple[Any, ...]
+MISSING = object()
+
+
+def entry_size(value: Any) -> int:
+    """
+    Estimate the memory used by a cached value.
+
+    Args:
+        value: DataFrame, bytes, object with a memory_usage method (in bytes) or other object
+
+    Returns: Size in bytes
+
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if hasattr(value, "memory_usage"):
+        return int(value.memory_usage())
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """
+    Cache of values built from result files, validated by the version of the files.
+
+    Args:
+        maxsize: Maximal memory of the cached values in bytes (values larger than this are not cached)
+    """
+
+    def __init__(self, maxsize: int = 256 * 2**20):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Tuple[Version, Any, int]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: Version, load: Callable[[], Any]) -> Any:
+        """
+        Get a value from the cache, loading (and caching) it if it is not cached for the given version.
+
+        Args:
+            key: Key of the value
+            version: Version of the files the value is built from
+            load: Function that builds the value
+
+        Returns: Cached or loaded value
+
+        """
+        value = self.lookup(key, version, MISSING)
+        if value is MISSING:
+            value = load()
+            self.put(key, version, value)
+
+        return value
+
+    def lookup(self, key: Hashable, version: Version, default: Any = None) -> Any:
+        """
+        Get a value from the cache without loading it (e.g. for values that are loaded asynchronously).
+
+        Args:
+            key: Key of the value
+            version: Version of the files the value is built from
+            default: Value returned if the value is not cached for the given version
+
+        Returns: Cached value or default
+
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Hashable, version: Version, value: Any) -> None:
+        """
+        Add a value to the cache (replacing the value of the key).
+
+        Args:
+            key: Key of the value
+            version: Version of the files the value is built from
+            value: Value
+
+        Returns: None
+
+        """
+        size = entry_size(value)
+        with self._lock:
+            self._remove(key)
+            if size > self.maxsize:
+                return
+            self._entries[key] = (version, value, size)
+            self._size += size
+            while self._size > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[2]
+
+    def clear(self) -> None:
+        """
+        Remove all values from the cache.
+
+        Returns: None
+
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    @property
+    def size(self) -> int:
+        """
+        Get the memory of the cached values.
+
+        Returns: Size in bytes
+
+        """
+        return self._size
+
+    def __len__(self) -> int:
+        """
+        Get number of cached values.
+
+        Returns: number of cached values
+
+        """
+        return len(self._entries)
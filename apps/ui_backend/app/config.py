@@ -34,6 +34,10 @@ class Settings(BaseSettings):
     ceosys_data_path: str
     guideline_server: str
     patientdata_server: str
+    result_cache_size: int = 256
+    ward_cache_ttl: int = 60
+    request_timeout: float = 30
+    request_retries: int = 3
 
     class Config:
         """
@@ -0,0 +1,208 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Pooled HTTP client for the requests to other services.
+
+All requests of a service to other services (guideline interface, clinical data interface, MAGICapp) go through the
+client of a single ServiceClients instance per process, so that connections are kept alive and reused instead of
+opening a new connection per request. The client
+
+- uses timeouts for all requests,
+- retries requests that failed to connect, whose connection was dropped by the server (e.g. an expired keep-alive
+  connection) or that were answered with 502, 503 or 504 with exponential backoff (only idempotent requests, i.e.
+  requests with an idempotent method or read-only POST requests whose path is explicitly allowed) and
+- accepts gzip and deflate compressed responses (which are decompressed transparently).
+
+The client is asynchronous, as all requests are sent from async FastAPI endpoints (which must not block the event
+loop).
+"""
+
+import asyncio
+import random
+import threading
+from fnmatch import fnmatchcase
+from typing import Optional, Sequence
+
+import httpx
+
+RETRY_STATUS_CODES = {502, 503, 504}
+RETRY_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+def retryable(request: httpx.Request, read_only_posts: Sequence[str]) -> bool:
+    """
+    Check whether a request may be sent again, i.e. whether it is idempotent.
+
+    Args:
+        request: Request
+        read_only_posts: Path patterns (fnmatch) of POST requests that do not change any state on the server
+
+    Returns: True if the request may be retried
+
+    """
+    if request.method in IDEMPOTENT_METHODS:
+        return True
+
+    return request.method == "POST" and any(
+        fnmatchcase(request.url.path, pattern) for pattern in read_only_posts
+    )
+
+
+def backoff_delay(attempt: int, backoff: float) -> float:
+    """
+    Get the delay before retrying a request (exponential backoff with full jitter).
+
+    Args:
+        attempt: Number of the failed attempt (starting at 0)
+        backoff: Base delay in seconds
+
+    Returns: Delay in seconds
+
+    """
+    return random.uniform(0, backoff * 2**attempt)  # nosec - not used for security
+
+
+class AsyncRetryTransport(httpx.AsyncBaseTransport):
+    """
+    Asynchronous transport that retries failed idempotent requests with exponential backoff.
+
+    Args:
+        transport: Transport that sends the requests
+        retries: Maximal number of retries per request
+        backoff: Base delay in seconds between retries
+        read_only_posts: Path patterns (fnmatch) of POST requests that may be retried
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        retries: int,
+        backoff: float,
+        read_only_posts: Sequence[str] = (),
+    ):
+        self.transport = transport
+        self.retries = retries
+        self.backoff = backoff
+        self.read_only_posts = read_only_posts
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """
+        Send a request, retrying idempotent requests on connection errors and temporarily unavailable servers.
+
+        Args:
+            request: Request
+
+        Returns: Response
+
+        """
+        if not retryable(request, self.read_only_posts):
+            return await self.transport.handle_async_request(request)
+
+        attempt = 0
+        while True:
+            try:
+                response = await self.transport.handle_async_request(request)
+            except RETRY_EXCEPTIONS:
+                if attempt >= self.retries:
+                    raise
+            else:
+                if (
+                    response.status_code not in RETRY_STATUS_CODES
+                    or attempt >= self.retries
+                ):
+                    return response
+                await response.aclose()
+            await asyncio.sleep(backoff_delay(attempt, self.backoff))
+            attempt += 1
+
+    async def aclose(self) -> None:
+        """
+        Close the connections of the transport.
+
+        Returns: None
+
+        """
+        await self.transport.aclose()
+
+
+class ServiceClients:
+    """
+    Pooled asynchronous HTTP client (created on first use, once for all threads).
+
+    Args:
+        timeout: Timeout in seconds for connecting, reading, writing and acquiring a connection from the pool
+        connect_timeout: Timeout in seconds for connecting (defaults to timeout)
+        retries: Maximal number of retries per request
+        backoff: Base delay in seconds between retries
+        max_connections: Maximal number of connections per client
+        max_keepalive_connections: Maximal number of idle connections kept alive per client
+        read_only_posts: Path patterns (fnmatch) of POST requests that may be retried (e.g. queries that are sent as
+            POST because of their size), other POST requests are never retried
+    """
+
+    def __init__(
+        self,
+        timeout: float = 30.0,
+        connect_timeout: Optional[float] = 5.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        read_only_posts: Sequence[str] = (),
+    ):
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self.retries = retries
+        self.backoff = backoff
+        self.read_only_posts = read_only_posts
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """
+        Get the asynchronous client.
+
+        Returns: HTTP client
+
+        """
+        if self._async_client is None:
+            with self._lock:
+                if self._async_client is None:
+                    transport = httpx.AsyncHTTPTransport(limits=self.limits)
+                    self._async_client = httpx.AsyncClient(
+                        transport=AsyncRetryTransport(
+                            transport, self.retries, self.backoff, self.read_only_posts
+                        ),
+                        timeout=self.timeout,
+                    )
+        return self._async_client
+
+    async def aclose(self) -> None:
+        """
+        Close the connections of the client.
+
+        Returns: None
+
+        """
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
@@ -19,17 +19,25 @@ User Interface Backend - FastAPI interface
 """
 
 import os
-from pathlib import Path
+import time
+from contextvars import ContextVar
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Union
+from typing import Any, Callable, Hashable, Optional, List, Dict, Tuple, Union
+import numpy as np
 import pandas as pd
-import requests
-from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi import Depends, FastAPI, HTTPException, Query, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from pydantic import BaseModel, BaseSettings
 from config import settings
+from transport import ACCEPT_HEADER, decode_response
+from results import ResultIndex, read_result, result_version, result_versions
+from cache import MISSING, ResultCache
+from http_client import ServiceClients
 import yaml
 
 
@@ -89,7 +97,25 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 app = FastAPI()
+app.add_middleware(GZipMiddleware, minimum_size=1000)
 user_db = load_user_db()
+result_cache = ResultCache(settings.result_cache_size * 2**20)
+clients = ServiceClients(
+    timeout=settings.request_timeout,
+    retries=settings.request_retries,
+    read_only_posts=["/patient/*"],
+)
+
+
+@app.on_event("shutdown")
+async def close_clients() -> None:
+    """
+    Close the connections of the HTTP clients.
+
+    Returns: None
+
+    """
+    await clients.aclose()
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -265,7 +291,96 @@ async def root() -> Dict:
     return {"message": "UI Backend Server"}
 
 
-def get_recommendation_results_summary(recommendation_id: str) -> pd.DataFrame:
+# attempts to read results that are not replaced by the adherence evaluator while they are read
+RESULT_READ_ATTEMPTS = 3
+
+# recommendation, versions of the result files and values loaded from them, of the outermost cached() call
+result_read: ContextVar[Optional[Tuple[str, Dict[str, Tuple[int, ...]], List]]] = (
+    ContextVar("result_read", default=None)
+)
+
+
+def cached(
+    key: Hashable,
+    names: List[str],
+    recommendation_id: str,
+    load: Callable[[], Any],
+) -> Any:
+    """
+    Get a value built from results of a guideline recommendation from the result cache.
+
+    The cached value is only used as long as the result files were not replaced by the adherence evaluator. Cached
+    values are shared between requests and must not be modified.
+
+    The versions of the result files are taken once (by the outermost call, nested calls in "load" use the same
+    versions), so that values built from several results (e.g. summary and details) are cached under one combined
+    version. Loaded values are only cached if none of the result files was replaced while they were read, otherwise
+    they are read again.
+
+    Args:
+        key: Cache key of the value
+        names: Names of the results the value is built from
+        recommendation_id: Guideline recommendation identifier.
+        load: Function that builds the value
+
+    Returns: Cached or loaded value
+
+    Raises:
+        HTTPException: If there are no results of the guideline recommendation (404) or the results were replaced
+            while they were read in all attempts (503)
+
+    """
+    read = result_read.get()
+    if read is not None and read[0] == recommendation_id:
+        # loading a value of the outermost call: cached by the outermost call, under the versions it observed
+        _, versions, loaded = read
+        for name in names:
+            if name not in versions:
+                versions[name] = result_version(
+                    settings.ceosys_data_path, name, recommendation_id
+                )
+        version = tuple(versions[name] for name in names)
+        value = result_cache.lookup(key, version, MISSING)
+        if value is MISSING:
+            value = load()
+            loaded.append((key, version, value))
+        return value
+
+    try:
+        for _ in range(RESULT_READ_ATTEMPTS):
+            versions = result_versions(
+                settings.ceosys_data_path, names, recommendation_id
+            )
+            version = tuple(versions[name] for name in names)
+            value = result_cache.lookup(key, version, MISSING)
+            if value is not MISSING:
+                return value
+
+            loaded = []
+            token = result_read.set((recommendation_id, versions, loaded))
+            try:
+                value = load()
+            finally:
+                result_read.reset(token)
+
+            if (
+                result_versions(settings.ceosys_data_path, versions, recommendation_id)
+                == versions
+            ):
+                for entry in loaded + [(key, version, value)]:
+                    result_cache.put(*entry)
+                return value
+    except FileNotFoundError:
+        raise HTTPException(404, "Guideline recommendation not found")
+
+    raise HTTPException(
+        503, "Results of the guideline recommendation are being updated"
+    )
+
+
+def get_recommendation_results_summary(
+    recommendation_id: str, columns: Optional[List[str]] = None
+) -> pd.DataFrame:
     """
     Retrieves the summary of the guideline recommendation adherence evaluation.
 
@@ -274,25 +389,35 @@ def get_recommendation_results_summary(recommendation_id: str) -> pd.DataFrame:
 
     Args:
         recommendation_id: Guideline recommendation identifier.
+        columns: Columns to read (None: all columns)
 
     Returns: Summary of the guideline recommendation adherence evaluation
 
     """
-    try:
-        r = (
-            pd.read_pickle(
-                Path(settings.ceosys_data_path)
-                / f"guideline_recommendation_{recommendation_id}_results_summary.pkl"
-            )
-            .fillna("nan")
-            .reset_index()
+    return cached(
+        (
+            "results_summary",
+            recommendation_id,
+            None if columns is None else tuple(columns),
+        ),
+        ["results_summary"],
+        recommendation_id,
+        lambda: read_result(
+            settings.ceosys_data_path,
+            "results_summary",
+            recommendation_id,
+            columns=columns,
         )
-    except FileNotFoundError:
-        raise HTTPException(404, "Guideline recommendation not found")
-    return r
+        .fillna("nan")
+        .reset_index(),
+    )
 
 
-def get_recommendation_results_details(recommendation_id: str) -> pd.DataFrame:
+def get_recommendation_results_details(
+    recommendation_id: str,
+    columns: Optional[List[str]] = None,
+    patients: Optional[List[str]] = None,
+) -> pd.DataFrame:
     """
     Retrieves the details of the guideline recommendation adherence evaluation.
 
@@ -300,22 +425,31 @@ def get_recommendation_results_details(recommendation_id: str) -> pd.DataFrame:
 
     Args:
         recommendation_id: Guideline recommendation identifier.
+        columns: Columns to read (None: all columns)
+        patients: Patients to read (None: all patients)
 
     Returns: Details of the guideline recommendation adherence evaluation.
 
     """
-    try:
-        r = (
-            pd.read_pickle(
-                Path(settings.ceosys_data_path)
-                / f"guideline_recommendation_{recommendation_id}_results_detail.pkl"
-            )
-            .fillna("nan")
-            .reset_index()
+    return cached(
+        (
+            "results_detail",
+            recommendation_id,
+            None if columns is None else tuple(columns),
+            None if patients is None else tuple(patients),
+        ),
+        ["results_detail"],
+        recommendation_id,
+        lambda: read_result(
+            settings.ceosys_data_path,
+            "results_detail",
+            recommendation_id,
+            columns=columns,
+            patients=patients,
         )
-    except FileNotFoundError:
-        raise HTTPException(404, "Guideline recommendation not found")
-    return r
+        .fillna("nan")
+        .reset_index(),
+    )
 
 
 def get_recommendation_variables(recommendation_id: str) -> pd.DataFrame:
@@ -329,24 +463,85 @@ def get_recommendation_variables(recommendation_id: str) -> pd.DataFrame:
     Returns: List of clinical variables names
 
     """
-    try:
-        r = pd.read_pickle(
-            Path(settings.ceosys_data_path)
-            / f"guideline_recommendation_{recommendation_id}_variable_names.pkl"
-        )
-    except FileNotFoundError:
-        raise HTTPException(404, "Guideline recommendation not found")
-    return r
+    return cached(
+        ("variable_names", recommendation_id),
+        ["variable_names"],
+        recommendation_id,
+        lambda: read_result(
+            settings.ceosys_data_path, "variable_names", recommendation_id
+        ),
+    )
+
+
+def get_result_index(recommendation_id: str) -> ResultIndex:
+    """
+    Get the index of the results of a guideline recommendation (for paginated and filtered access).
+
+    Args:
+        recommendation_id: Guideline recommendation identifier.
+
+    Returns: Index of the summary and details of the guideline recommendation adherence evaluation
+
+    """
+    return cached(
+        ("index", recommendation_id),
+        ["results_summary", "results_detail"],
+        recommendation_id,
+        lambda: ResultIndex(
+            get_recommendation_results_summary(recommendation_id),
+            get_recommendation_results_details(recommendation_id),
+        ),
+    )
+
+
+async def get_patient_list() -> pd.DataFrame:
+    """
+    Get the current (last) ward, birth date and admission date of the patients from the clinical data interface.
+
+    Returns: Current patients (one row per patient, index pseudo_fallnr)
+
+    """
+    r = await clients.async_client.get(
+        settings.patientdata_server + "/patients/list", headers=ACCEPT_HEADER
+    )
+    df = decode_response(r).fillna("")
+    df = (
+        df.sort_values(by=["pseudo_fallnr", "variable_name", "datetime"])
+        .groupby(["pseudo_fallnr", "variable_name"])
+        .nth(-1)["value"]
+        .unstack("variable_name")
+    )
+    return df
 
 
-def get_recommendation_ids() -> Dict:
+async def get_wards() -> pd.Series:
+    """
+    Get the current ward of the patients.
+
+    The wards are cached for WARD_CACHE_TTL seconds.
+
+    Returns: Ward by patient
+
+    """
+    version = (int(time.time() // settings.ward_cache_ttl),)
+    wards = result_cache.lookup(("wards",), version)
+    if wards is None:
+        wards = (await get_patient_list())["ward"].astype(str)
+        result_cache.put(("wards",), version, wards)
+
+    return wards
+
+
+async def get_recommendation_ids() -> Dict:
     """
     Retrieve all available guideline recommendation identifier from the guideline interface.
 
     Returns: List of available guideline recommendation identifier
 
     """
-    r = requests.get(settings.guideline_server + "/recommendation/list")
+    r = await clients.async_client.get(
+        settings.guideline_server + "/recommendation/list"
+    )
     return r.json()
 
 
@@ -360,15 +555,15 @@ def get_patients_from_recommendation(recommendation_id: str) -> List:
     Returns: List of patients
 
     """
-    ret = (
-        get_recommendation_results_summary(recommendation_id)
-        .reset_index()["pseudo_fallnr"]
-        .unique()
-    )
+    ret = get_recommendation_results_summary(recommendation_id, columns=[])[
+        "pseudo_fallnr"
+    ].unique()
     return list(ret)
 
 
-def request_patient_data(patient_id: str, variable_name: List[str]) -> pd.DataFrame:
+async def request_patient_data(
+    patient_id: str, variable_name: List[str]
+) -> pd.DataFrame:
     """
     Get clinical data for a specific patient.
 
@@ -379,11 +574,13 @@ def request_patient_data(patient_id: str, variable_name: List[str]) -> pd.DataFr
     Returns: List of all available values for the requested variables for the specified patient.
 
     """
-    r = requests.post(
-        settings.patientdata_server + f"/patient/{patient_id}", json=variable_name
+    r = await clients.async_client.post(
+        settings.patientdata_server + f"/patient/{patient_id}",
+        json=variable_name,
+        headers=ACCEPT_HEADER,
     )
 
-    df = pd.DataFrame(r.json())
+    df = decode_response(r).fillna("")
 
     return df
 
@@ -401,7 +598,7 @@ async def get_recommendation_list(
     Returns: List of available guideline recommendation identifier
 
     """
-    return get_recommendation_ids()
+    return await get_recommendation_ids()
 
 
 @app.get("/recommendation/variables/{recommendation_id}")
@@ -421,13 +618,15 @@ async def get_recommendation_variable_names(
     return get_recommendation_variables(recommendation_id).to_dict(orient="records")
 
 
-@app.get("/recommendation/get/{recommendation_id}")
+@app.get("/recommendation/get/{recommendation_id}", response_model=None)
 async def get_recommendation_results(
     recommendation_id: str, current_user: User = Depends(get_current_active_user)
-) -> Dict:
+) -> Response:
     """
     Get results (summary + detailed) of the guideline recommendation evaluation on clinical data.
 
+    The JSON response is rendered once per version of the results and served from the result cache.
+
     Args:
         recommendation_id: Guideline recommendation identifier.
         current_user: Authenticated user
@@ -435,12 +634,85 @@ async def get_recommendation_results(
     Returns: Results (summary + detailed) of the guideline recommendation evaluation
 
     """
-    df_summary = get_recommendation_results_summary(recommendation_id)
-    df_detail = get_recommendation_results_details(recommendation_id)
+
+    def render() -> bytes:
+        """
+        Render the results as JSON.
+
+        Returns: JSON response body
+
+        """
+        df_summary = get_recommendation_results_summary(recommendation_id)
+        df_detail = get_recommendation_results_details(recommendation_id)
+        content = {
+            "summary": df_summary.to_dict(orient="records"),
+            "detail": df_detail.to_dict(orient="records"),
+        }
+        return JSONResponse(jsonable_encoder(content)).body
+
+    body = cached(
+        ("json", recommendation_id),
+        ["results_summary", "results_detail"],
+        recommendation_id,
+        render,
+    )
+
+    return Response(content=body, media_type="application/json")
+
+
+@app.get("/recommendation/results/{recommendation_id}")
+async def get_recommendation_results_page(
+    recommendation_id: str,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    columns: Optional[List[str]] = Query(None),
+    pseudo_fallnr: Optional[List[str]] = Query(None),
+    valid_treatment: Optional[bool] = None,
+    ward: Optional[List[str]] = Query(None),
+    current_user: User = Depends(get_current_active_user),
+) -> Dict:
+    """
+    Get a page of the results (summary + detailed) of the guideline recommendation evaluation on clinical data.
+
+    Pages contain the summary and all detail rows of up to "limit" patients (in the order of pseudo_fallnr). The
+    patients are filtered on the indexed results, only the returned page is serialized.
+
+    Args:
+        recommendation_id: Guideline recommendation identifier.
+        limit: Maximal number of patients on the page
+        cursor: Cursor of the page (next_cursor of the previous page, None for the first page)
+        columns: Columns to return (of the summary and the details, pseudo_fallnr is always returned; None: all)
+        pseudo_fallnr: Only return these patients (None: all)
+        valid_treatment: Only return patients whose treatment is (True) / is not (False) adherent (None: all)
+        ward: Only return patients currently on these wards (None: all)
+        current_user: Authenticated user
+
+    Returns: Results (summary + detailed) of the patients on the page and the cursor of the next page (None for the
+        last page)
+
+    """
+    index = get_result_index(recommendation_id)
+
+    mask = np.ones(len(index.patients), dtype=bool)
+    if pseudo_fallnr is not None:
+        mask &= np.isin(index.patients, pseudo_fallnr)
+    if valid_treatment is not None:
+        mask &= (index.summary["valid_treatment"] == valid_treatment).to_numpy()
+    if ward is not None:
+        wards = (await get_wards()).reindex(index.patients)
+        mask &= wards.isin(ward).to_numpy()
+
+    df_summary, df_detail, next_cursor = index.page(mask, cursor, limit)
+
+    if columns is not None:
+        selected = ["pseudo_fallnr"] + [c for c in columns if c != "pseudo_fallnr"]
+        df_summary = df_summary[[c for c in selected if c in df_summary]]
+        df_detail = df_detail[[c for c in selected if c in df_detail]]
 
     return {
         "summary": df_summary.to_dict(orient="records"),
         "detail": df_detail.to_dict(orient="records"),
+        "next_cursor": next_cursor,
     }
 
 
@@ -455,15 +727,7 @@ async def list_patients(current_user: User = Depends(get_current_active_user)) -
     Returns: Current patients
 
     """
-    r = requests.get(settings.patientdata_server + "/patients/list")
-    df = pd.DataFrame(r.json())
-    df = (
-        df.sort_values(by=["pseudo_fallnr", "variable_name", "datetime"])
-        .groupby(["pseudo_fallnr", "variable_name"])
-        .nth(-1)["value"]
-        .unstack("variable_name")
-    )
-    return df.reset_index().to_dict(orient="records")
+    return (await get_patient_list()).reset_index().to_dict(orient="records")
 
 
 @app.get("/patient/list/{recommendation_id}")
@@ -503,6 +767,6 @@ async def get_patient_info(
     variables = list(
         get_recommendation_variables(recommendation_id)["variable_name"].unique()
     )
-    df = request_patient_data(patient_id, variables)
+    df = await request_patient_data(patient_id, variables)
 
     return df.to_dict(orient="records")
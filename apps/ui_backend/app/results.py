@@ -0,0 +1,243 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Reader of the columnar (Apache Parquet) results of the guideline recommendation adherence evaluation.
+
+The adherence evaluator stores each result ("results_summary", "results_detail", "variable_names") as a Parquet dataset
+partitioned by recommendation_id ("<path>/results/<name>/recommendation_id=<id>/part-0.parquet"). Only the requested
+columns and the row groups of the requested patients (pseudo_fallnr) are read. The mixed "value" column is stored as one
+typed column per value type and a "value_type" column, as in the Arrow transport of the clinical data (see transport).
+"""
+
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from transport import VALUE_TYPES, decode_arrow_table
+
+RESULTS_DIR = "results"
+RESULTS_FILE = "part-0.parquet"
+INDEX_COLUMN = "pseudo_fallnr"
+
+
+def partition_path(path: Path, name: str, recommendation_id: str) -> Path:
+    """
+    Get the path of the partition of a guideline recommendation in a result dataset.
+
+    Args:
+        path: Data path
+        name: Name of the result ("results_summary", "results_detail" or "variable_names")
+        recommendation_id: Guideline recommendation identifier
+
+    Returns: Partition directory
+
+    """
+    return Path(path) / RESULTS_DIR / name / f"recommendation_id={recommendation_id}"
+
+
+def result_version(path: Path, name: str, recommendation_id: str) -> Tuple[int, ...]:
+    """
+    Get the version of the partition of a guideline recommendation in a result dataset.
+
+    The adherence evaluator replaces the partition file whenever it writes new results, so the version changes with
+    every write.
+
+    Args:
+        path: Data path
+        name: Name of the result ("results_summary", "results_detail" or "variable_names")
+        recommendation_id: Guideline recommendation identifier
+
+    Returns: Inode, modification time (ns) and size of the partition file
+
+    Raises:
+        FileNotFoundError: If there is no result of the guideline recommendation
+
+    """
+    stat = (partition_path(path, name, recommendation_id) / RESULTS_FILE).stat()
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def result_versions(
+    path: Path, names: Iterable[str], recommendation_id: str
+) -> Dict[str, Tuple[int, ...]]:
+    """
+    Get the versions of the partitions of a guideline recommendation in several result datasets.
+
+    Args:
+        path: Data path
+        names: Names of the results
+        recommendation_id: Guideline recommendation identifier
+
+    Returns: Version of each result (see result_version)
+
+    Raises:
+        FileNotFoundError: If there is no result of the guideline recommendation
+
+    """
+    return {name: result_version(path, name, recommendation_id) for name in names}
+
+
+def decode_table(table: pa.Table) -> pd.DataFrame:
+    """
+    Convert an Arrow table of a result to a result frame.
+
+    Args:
+        table: Arrow table (as written by the adherence evaluator)
+
+    Returns: Result frame
+
+    """
+    if "value_type" in table.column_names:
+        df = decode_arrow_table(table)
+    else:
+        df = table.to_pandas()
+
+    if INDEX_COLUMN in df:
+        df = df.set_index(INDEX_COLUMN)
+
+    return df
+
+
+def read_result(
+    path: Path,
+    name: str,
+    recommendation_id: str,
+    columns: Optional[List[str]] = None,
+    patients: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Read the partition of a guideline recommendation from a result dataset.
+
+    Args:
+        path: Data path
+        name: Name of the result ("results_summary", "results_detail" or "variable_names")
+        recommendation_id: Guideline recommendation identifier
+        columns: Columns to read (None: all columns), the index pseudo_fallnr is always read
+        patients: Patients (pseudo_fallnr) to read (None: all patients)
+
+    Returns: Result frame
+
+    Raises:
+        FileNotFoundError: If there is no result of the guideline recommendation
+
+    """
+    file = partition_path(path, name, recommendation_id) / RESULTS_FILE
+    schema = pq.read_schema(file)
+
+    if columns is not None:
+        columns = [c for c in columns if c != INDEX_COLUMN]
+        if INDEX_COLUMN in schema.names:
+            columns.insert(0, INDEX_COLUMN)
+        if "value" in columns:
+            columns.remove("value")
+            columns += ["value_type"] + [f"value_{tag}" for tag in VALUE_TYPES]
+
+    filters = None
+    if patients is not None:
+        filters = [(INDEX_COLUMN, "in", list(patients))]
+
+    return decode_table(pq.read_table(file, columns=columns, filters=filters))
+
+
+class ResultIndex:
+    """
+    Index of the results of a guideline recommendation for paginated and filtered access.
+
+    Patients are filtered on the summary (one row per patient) and the detail rows of the selected patients are taken
+    from the row range of each patient in the detail (which is sorted by patient), i.e. only the rows of the returned
+    page are copied and serialized.
+
+    Args:
+        summary: Summary of the results (one row per patient, with the column pseudo_fallnr)
+        detail: Details of the results (with the column pseudo_fallnr)
+    """
+
+    summary: pd.DataFrame
+    detail: pd.DataFrame
+    patients: np.ndarray
+    _starts: np.ndarray
+    _ends: np.ndarray
+
+    def __init__(self, summary: pd.DataFrame, detail: pd.DataFrame):
+        if not summary[INDEX_COLUMN].is_monotonic_increasing:
+            summary = summary.sort_values(INDEX_COLUMN, kind="stable")
+        if not detail[INDEX_COLUMN].is_monotonic_increasing:
+            detail = detail.sort_values(INDEX_COLUMN, kind="stable")
+
+        self.summary = summary.reset_index(drop=True)
+        self.detail = detail.reset_index(drop=True)
+        self.patients = self.summary[INDEX_COLUMN].to_numpy(dtype=object)
+
+        detail_patients = self.detail[INDEX_COLUMN].to_numpy(dtype=object)
+        self._starts = np.searchsorted(detail_patients, self.patients, side="left")
+        self._ends = np.searchsorted(detail_patients, self.patients, side="right")
+
+    def memory_usage(self) -> int:
+        """
+        Get the memory used by the index.
+
+        Returns: Size in bytes
+
+        """
+        return int(
+            self.summary.memory_usage(index=True, deep=True).sum()
+            + self.detail.memory_usage(index=True, deep=True).sum()
+            + self._starts.nbytes
+            + self._ends.nbytes
+        )
+
+    def page(
+        self,
+        mask: Optional[np.ndarray] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+    ) -> Tuple[pd.DataFrame, pd.DataFrame, Optional[str]]:
+        """
+        Get a page of the results of the selected patients.
+
+        Args:
+            mask: Selected patients (boolean array aligned with the summary, None: all patients)
+            cursor: Patient (pseudo_fallnr) after which the page starts (None: first page)
+            limit: Maximal number of patients on the page
+
+        Returns: Summary and details of the patients on the page and the cursor of the next page (None for the last
+            page)
+
+        """
+        start = 0
+        if cursor is not None:
+            start = int(np.searchsorted(self.patients, cursor, side="right"))
+
+        candidates = np.arange(start, len(self.patients))
+        if mask is not None:
+            candidates = candidates[mask[start:]]
+
+        rows = candidates[:limit]
+        next_cursor = None
+        if len(candidates) > limit:
+            next_cursor = str(self.patients[rows[-1]])
+
+        lengths = self._ends[rows] - self._starts[rows]
+        detail_rows = np.repeat(
+            self._starts[rows] - np.cumsum(lengths) + lengths, lengths
+        )
+        detail_rows += np.arange(lengths.sum())
+
+        return self.summary.take(rows), self.detail.take(detail_rows), next_cursor
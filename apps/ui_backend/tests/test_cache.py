@@ -0,0 +1,170 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+
+APP_PATH = Path(__file__).parents[1] / "app"
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.syspath_prepend(str(APP_PATH))
+    import cache
+
+    return cache
+
+
+@pytest.fixture
+def results(write_result):
+    summary = pd.DataFrame(
+        {"pseudo_fallnr": ["P1", "P2"], "valid_treatment": [True, False]}
+    )
+    detail = pd.DataFrame(
+        {
+            "pseudo_fallnr": ["P1", "P1", "P2"],
+            "variable_name": ["sO2", "age", "sO2"],
+            "value": [91.5, 64.0, 88.0],
+        }
+    )
+    write_result("results_summary", "1", summary)
+    write_result("results_detail", "1", detail)
+    return summary, detail
+
+
+def test_lru_eviction(cache):
+    result_cache = cache.ResultCache(maxsize=30)
+    for key in "abc":
+        result_cache.put(key, (1,), key.encode() * 10)
+    assert result_cache.lookup("a", (1,)) == b"a" * 10
+
+    # the least recently used value is evicted
+    result_cache.put("d", (1,), b"d" * 10)
+    assert result_cache.lookup("b", (1,)) is None
+    assert [result_cache.lookup(key, (1,)) for key in "acd"] == [
+        b"a" * 10,
+        b"c" * 10,
+        b"d" * 10,
+    ]
+    assert (len(result_cache), result_cache.size) == (3, 30)
+
+    # a larger value evicts as many values as needed
+    result_cache.put("e", (1,), b"e" * 25)
+    assert [result_cache.lookup(key, (1,)) for key in "acde"] == [
+        None,
+        None,
+        None,
+        b"e" * 25,
+    ]
+    assert (len(result_cache), result_cache.size) == (1, 25)
+
+
+def test_oversize_not_cached(cache):
+    result_cache = cache.ResultCache(maxsize=30)
+    result_cache.put("a", (1,), b"a" * 10)
+    result_cache.put("b", (1,), b"b" * 31)
+    assert result_cache.lookup("b", (1,)) is None
+    assert result_cache.lookup("a", (1,)) == b"a" * 10
+
+    # replacing a value with an oversize value removes it
+    result_cache.put("a", (2,), b"a" * 31)
+    assert result_cache.lookup("a", (1,)) is None
+    assert (len(result_cache), result_cache.size) == (0, 0)
+
+
+def test_version_mismatch(cache):
+    result_cache = cache.ResultCache()
+    assert result_cache.get("a", (1,), lambda: "v1") == "v1"
+    assert result_cache.get("a", (1,), lambda: "v2") == "v1"
+    assert result_cache.lookup("a", (2,), "missing") == "missing"
+    assert result_cache.get("a", (2,), lambda: "v2") == "v2"
+    assert result_cache.lookup("a", (1,), "missing") == "missing"
+    assert len(result_cache) == 1
+
+
+def test_invalidated_on_write(main, results, write_result):
+    summary, detail = results
+    cached = main.get_recommendation_results_summary("1")
+    assert cached["pseudo_fallnr"].tolist() == ["P1", "P2"]
+    assert main.get_recommendation_results_summary("1") is cached
+
+    summary = pd.concat([summary, summary.iloc[:1].assign(pseudo_fallnr="P3")])
+    write_result("results_summary", "1", summary)
+    assert main.get_recommendation_results_summary("1")["pseudo_fallnr"].tolist() == [
+        "P1",
+        "P2",
+        "P3",
+    ]
+
+    # a value built from several results is invalidated by a write of any of them
+    index = main.get_result_index("1")
+    assert main.get_result_index("1") is index
+    write_result("results_detail", "1", detail.iloc[:1])
+    assert main.get_result_index("1").detail["variable_name"].tolist() == ["sO2"]
+
+
+def test_replaced_while_read(main, results, write_result):
+    summary, detail = results
+    new_summary = summary.assign(valid_treatment=True)
+    loads = []
+
+    def load():
+        """
+        Build an index, the adherence evaluator writes a new summary during the first load.
+        """
+        index = main.ResultIndex(
+            main.get_recommendation_results_summary("1"),
+            main.get_recommendation_results_details("1"),
+        )
+        if not loads:
+            write_result("results_summary", "1", new_summary)
+        loads.append(index)
+        return index
+
+    names = ["results_summary", "results_detail"]
+    index = main.cached("index", names, "1", load)
+    assert len(loads) == 2
+    assert index.summary["valid_treatment"].tolist() == [True, True]
+
+    # the index and the summary were cached for the new file
+    assert main.cached("index", names, "1", load) is index
+    summary = main.get_recommendation_results_summary("1")
+    assert main.get_recommendation_results_summary("1") is summary
+    assert summary["valid_treatment"].tolist() == [True, True]
+    assert len(loads) == 2
+
+
+def test_always_replaced(main, results, write_result):
+    summary, _ = results
+
+    def load():
+        write_result("results_summary", "1", summary)
+        return main.get_recommendation_results_summary("1")
+
+    with pytest.raises(HTTPException) as e:
+        main.cached("summary", ["results_summary"], "1", load)
+    assert e.value.status_code == 503
+    assert len(main.result_cache) == 0
+
+
+def test_not_found(main):
+    with pytest.raises(HTTPException) as e:
+        main.get_recommendation_results_summary("1")
+    assert e.value.status_code == 404
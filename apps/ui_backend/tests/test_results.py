@@ -0,0 +1,176 @@
+#  This file is part of CEOsys Recommendation Checker.
+#
+#  Copyright (c) 2021 CEOsys project team <https://covid-evidenz.de>.
+#
+#  CEOsys Recommendation Checker is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CEOsys Recommendation Checker is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CEOsys Recommendation Checker.  If not, see <https://www.gnu.org/licenses/>.
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+APP_PATH = Path(__file__).parents[1] / "app"
+PATIENTS = ["P1", "P2", "P3", "P4", "P5"]
+WARDS = pd.DataFrame(
+    {"ward": ["ICU", "IMC", "ICU", "ICU"]},
+    index=pd.Index(["P1", "P2", "P4", "P5"], name="pseudo_fallnr"),
+)
+
+
+@pytest.fixture
+def results(monkeypatch):
+    monkeypatch.syspath_prepend(str(APP_PATH))
+    import results
+
+    return results
+
+
+@pytest.fixture
+def frames():
+    summary = pd.DataFrame(
+        {
+            "pseudo_fallnr": PATIENTS,
+            "valid_treatment": [True, False, True, True, False],
+        }
+    )
+    # P3 has no detail rows, the details are not sorted by patient
+    detail = pd.DataFrame(
+        {
+            "pseudo_fallnr": ["P2", "P1", "P1", "P4", "P5", "P5", "P2"],
+            "variable_name": ["sO2", "sO2", "age", "sO2", "sO2", "age", "age"],
+            "value": [88.0, 91.5, 64.0, 93.0, 90.0, 71.0, 58.0],
+        }
+    )
+    return summary, detail
+
+
+def pages(page, **kwargs):
+    """
+    Follow the cursors of a paginated result, collecting the patients of the summary and details of each page.
+    """
+    collected = []
+    cursor = None
+    while True:
+        summary, detail, cursor = page(cursor=cursor, **kwargs)
+        collected.append((list(summary), list(detail)))
+        if cursor is None:
+            return collected
+
+
+def test_page_cursor(results, frames):
+    summary, detail = frames
+    index = results.ResultIndex(summary, detail)
+
+    def page(**kwargs):
+        summary, detail, cursor = index.page(**kwargs)
+        assert detail.columns.tolist() == ["pseudo_fallnr", "variable_name", "value"]
+        return summary["pseudo_fallnr"], detail["pseudo_fallnr"], cursor
+
+    assert pages(page, limit=2) == [
+        (["P1", "P2"], ["P1", "P1", "P2", "P2"]),
+        (["P3", "P4"], ["P4"]),
+        (["P5"], ["P5", "P5"]),
+    ]
+    # no cursor after a last page that is full
+    assert pages(page, limit=5) == [(PATIENTS, sorted(detail["pseudo_fallnr"]))]
+
+    mask = summary["valid_treatment"].to_numpy()
+    assert pages(page, mask=mask, limit=2) == [
+        (["P1", "P3"], ["P1", "P1"]),
+        (["P4"], ["P4"]),
+    ]
+    # values of a patient stay in the order of the details
+    _, detail_page, _ = index.page(limit=1)
+    assert detail_page["variable_name"].tolist() == ["sO2", "age"]
+
+
+def test_empty_page(results, frames):
+    index = results.ResultIndex(*frames)
+    for kwargs in [
+        {"mask": np.zeros(len(PATIENTS), dtype=bool)},
+        {"cursor": "P5"},
+        {"cursor": "P6"},
+    ]:
+        summary, detail, cursor = index.page(limit=2, **kwargs)
+        assert (len(summary), len(detail), cursor) == (0, 0, None)
+        assert detail.columns.tolist() == frames[1].columns.tolist()
+
+    index = results.ResultIndex(frames[0].iloc[:0], frames[1].iloc[:0])
+    summary, detail, cursor = index.page()
+    assert (len(summary), len(detail), cursor) == (0, 0, None)
+
+
+@pytest.fixture
+def client(main, frames, write_result, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    for name, df in zip(["results_summary", "results_detail"], frames):
+        write_result(name, "1", df)
+
+    async def get_patient_list():
+        return WARDS
+
+    monkeypatch.setattr(main, "get_patient_list", get_patient_list)
+    monkeypatch.setitem(
+        main.app.dependency_overrides,
+        main.get_current_active_user,
+        lambda: main.User(username="test"),
+    )
+    return TestClient(main.app)
+
+
+def test_results_page(client):
+    def page(**params):
+        r = client.get("/recommendation/results/1", params=params)
+        assert r.status_code == 200
+        content = r.json()
+        return (
+            [row["pseudo_fallnr"] for row in content["summary"]],
+            [row["pseudo_fallnr"] for row in content["detail"]],
+            content["next_cursor"],
+        )
+
+    assert pages(page, limit=2) == [
+        (["P1", "P2"], ["P1", "P1", "P2", "P2"]),
+        (["P3", "P4"], ["P4"]),
+        (["P5"], ["P5", "P5"]),
+    ]
+
+    # P3 has no ward
+    assert pages(page, limit=2, ward="ICU") == [
+        (["P1", "P4"], ["P1", "P1", "P4"]),
+        (["P5"], ["P5", "P5"]),
+    ]
+    assert pages(page, limit=2, ward=["IMC", "ICU"], valid_treatment=False) == [
+        (["P2", "P5"], ["P2", "P2", "P5", "P5"]),
+    ]
+    assert pages(page, ward="ER") == [([], [])]
+
+    r = client.get(
+        "/recommendation/results/1",
+        params={"limit": 1, "cursor": "P4", "columns": ["value"], "ward": "ICU"},
+    )
+    assert r.json() == {
+        "summary": [{"pseudo_fallnr": "P5"}],
+        "detail": [
+            {"pseudo_fallnr": "P5", "value": 90.0},
+            {"pseudo_fallnr": "P5", "value": 71.0},
+        ],
+        "next_cursor": None,
+    }
+
+
+def test_results_page_not_found(client):
+    assert client.get("/recommendation/results/2").status_code == 404